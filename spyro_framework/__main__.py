@@ -0,0 +1,5 @@
+import sys
+
+from spyro_framework.cli import main
+
+sys.exit(main())
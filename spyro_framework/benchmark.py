@@ -0,0 +1,458 @@
+def _case_folders(root):
+    """Checked-in case folders with an .eof file, including base."""
+    import os
+
+    return sorted(
+        name
+        for name in os.listdir(root)
+        if os.path.isfile(os.path.join(root, name, name + ".eof"))
+    )
+
+
+def _copy_base(root, work_dir):
+    """Copies the base folder to work_dir, with a Pyrotec.ini if missing."""
+    import os
+    import shutil
+
+    base_folder = os.path.join(work_dir, "base")
+    if not os.path.isdir(base_folder):
+        shutil.copytree(os.path.join(root, "base"), base_folder)
+    pyrotec_ini = os.path.join(base_folder, "Pyrotec.ini")
+    if not os.path.isfile(pyrotec_ini):
+        open(pyrotec_ini, "w").close()
+    return base_folder
+
+
+def _load_samples(root, work_dir):
+    """Lab samples and converter, cached in work_dir and not in the repo."""
+    import os
+
+    from spyro_framework.samples import LabSampleWorkbook
+    from spyro_framework.spyro import read_naphtha_spyro_converter
+
+    feed_comp = LabSampleWorkbook(
+        os.path.join(root, "Samples Naphtha2.xlsx"),
+        cache_dir=os.path.join(work_dir, "samples"),
+        skiprows=8,
+        parse_dates=True,
+        na_values=["<0.50"],
+    )
+    naphtha_converter = read_naphtha_spyro_converter(
+        os.path.join(root, "naphtha_converter_TRAlab_Spyro.xlsx"),
+        processing_dir=work_dir,
+    )
+    return dict(feed_comp), naphtha_converter
+
+
+def _transformed_feeds(root, work_dir):
+    from spyro_framework.spyro import FeedComposition
+
+    feed_comp, naphtha_converter = _load_samples(root, work_dir)
+    feeds = {}
+    for feed_name, feed_pitagor in feed_comp.items():
+        feeds[feed_name] = FeedComposition()
+        feeds[feed_name].set_feed_composition(feed_pitagor, naphtha_converter)
+        feeds[feed_name].transform_naphtha_feed(check_piona=False)
+    return feeds
+
+
+def setup_readers(root, work_dir, scale):
+    """read_effluent, read_general and read_firebox on the case folders."""
+    from spyro_framework.spyro import (
+        EffluentComposition,
+        FireboxData,
+        SpyroGeneralOutput,
+    )
+
+    case_folders = _case_folders(root)
+    benchmarks = {}
+    for name, reader_class, method in [
+        ("read_effluent", EffluentComposition, "read_effluent"),
+        ("read_general", SpyroGeneralOutput, "read_general"),
+        ("read_firebox", FireboxData, "read_firebox"),
+    ]:
+
+        def run(reader_class=reader_class, method=method):
+            for file_name in case_folders:
+                getattr(reader_class(), method)(root, file_name)
+
+        benchmarks[name] = (run, len(case_folders))
+    return benchmarks
+
+
+def setup_harvest(root, work_dir, scale):
+    """read_spyro_output on the case folders and on synthetic cases."""
+    import os
+
+    from spyro_framework.spyro import SpyroData
+
+    benchmarks = {}
+    case_folders = _case_folders(root)
+
+    def run_checked_in():
+        for file_name in case_folders:
+            SpyroData(file_name, root).read_spyro_output()
+
+    benchmarks["read_spyro_output"] = (run_checked_in, len(case_folders))
+
+    if scale:
+        from spyro_framework.standin import generate_corpus
+
+        corpus_folder = os.path.join(work_dir, "corpus")
+        generate_corpus(
+            corpus_folder,
+            scale,
+            base_folder=_copy_base(root, work_dir),
+            max_workers=1,
+        )
+        synthetic_cases = _case_folders(corpus_folder)
+
+        def run_synthetic():
+            for file_name in synthetic_cases:
+                SpyroData(file_name, corpus_folder).read_spyro_output()
+
+        benchmarks["read_spyro_output[synthetic]"] = (
+            run_synthetic,
+            len(synthetic_cases),
+        )
+    return benchmarks
+
+
+def setup_feeds(root, work_dir, scale):
+    """transform_naphtha_feed and piona_processor per lab sample, and the
+    FeedCompositionBatch counterparts on the samples and on scale copies."""
+    from spyro_framework.spyro import FeedComposition, FeedCompositionBatch
+
+    feed_comp, naphtha_converter = _load_samples(root, work_dir)
+    feeds = _transformed_feeds(root, work_dir)
+
+    def run_transform():
+        for feed_pitagor in feed_comp.values():
+            feed = FeedComposition()
+            feed.set_feed_composition(feed_pitagor, naphtha_converter)
+            feed.transform_naphtha_feed(check_piona=False)
+
+    def run_piona():
+        for feed in feeds.values():
+            feed.piona_processor()
+
+    def run_batch(samples=feed_comp):
+        feed_batch = FeedCompositionBatch()
+        feed_batch.set_feed_compositions(samples, naphtha_converter)
+        feed_batch.transform_naphtha_feeds()
+        feed_batch.piona_processor()
+
+    benchmarks = {
+        "transform_naphtha_feed": (run_transform, len(feed_comp)),
+        "piona_processor": (run_piona, len(feeds)),
+        "transform_naphtha_feeds": (run_batch, len(feed_comp)),
+    }
+    if scale:
+        names = list(feed_comp)
+        samples = {
+            "{}_{}".format(names[i % len(names)], i): feed_comp[
+                names[i % len(names)]
+            ]
+            for i in range(scale)
+        }
+        benchmarks["transform_naphtha_feeds[synthetic]"] = (
+            lambda: run_batch(samples),
+            scale,
+        )
+    return benchmarks
+
+
+def setup_cases(root, work_dir, scale):
+    """create_naphtha_line and write_spyro per lab sample."""
+    from spyro_framework.spyro import SpyroData
+
+    _copy_base(root, work_dir)
+    feeds = _transformed_feeds(root, work_dir)
+    spyro_cases = []
+    for feed_name, feed in feeds.items():
+        spyro_data = SpyroData(feed_name, work_dir)
+        spyro_data.feed_composition = feed
+        spyro_cases.append(spyro_data)
+
+    def run_naphtha_line():
+        for spyro_data in spyro_cases:
+            spyro_data.create_naphtha_line()
+
+    def run_write(spyro_cases=spyro_cases):
+        for spyro_data in spyro_cases:
+            spyro_data.write_spyro()
+
+    benchmarks = {
+        "create_naphtha_line": (run_naphtha_line, len(spyro_cases)),
+        "write_spyro": (run_write, len(spyro_cases)),
+    }
+    if scale:
+        synthetic_cases = []
+        for i in range(scale):
+            spyro_data = SpyroData("synth_{:06d}".format(i), work_dir)
+            spyro_data.feed_composition = spyro_cases[
+                i % len(spyro_cases)
+            ].feed_composition
+            spyro_data.convergence.target_value = 50 + i % 10
+            synthetic_cases.append(spyro_data)
+        benchmarks["write_spyro[synthetic]"] = (
+            lambda: run_write(synthetic_cases),
+            scale,
+        )
+    return benchmarks
+
+
+# Benchmark groups, every setup returns a dictionary with the benchmark name
+# as key and a (callable, number of cases per call) tuple as value
+BENCHMARK_SETUPS = [setup_readers, setup_harvest, setup_feeds, setup_cases]
+
+
+def time_benchmark(func, min_repeat=5, min_time=0.2, max_repeat=1000):
+    """time_benchmark.
+
+    Parameters
+    ----------
+    func : callable
+        benchmark without arguments
+    min_repeat : int
+        minimum number of timed calls
+    min_time : float
+        minimum total time of the timed calls in seconds
+    max_repeat : int
+        maximum number of timed calls
+
+    Returns
+    -------
+    dict
+        repeat, median, mean and min time per call in seconds and the peak
+        memory of one call in bytes
+    """
+    import statistics
+    import time
+    import tracemalloc
+
+    func()  # warm up caches and imports
+    times = []
+    total = 0.0
+    while len(times) < max_repeat and (
+        len(times) < min_repeat or total < min_time
+    ):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+        total += times[-1]
+
+    # Memory is measured in a separate call, tracemalloc slows down the code
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeat": len(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "min": min(times),
+        "peak_memory": peak_memory,
+    }
+
+
+def run_benchmarks(
+    root=".", scale=0, select=None, min_repeat=5, min_time=0.2, verbose=True
+):
+    """run_benchmarks.
+    Runs the benchmarks against the checked-in case folders and lab samples
+    and, with scale, against synthetic inputs of that size. All files are
+    written to a temporary folder.
+
+    Parameters
+    ----------
+    root : str
+        repository folder with base, the case folders and the excel files
+    scale : int
+        number of synthetic cases and samples, 0 to skip them
+    select : str, optional
+        only run the benchmarks whose name contains this string
+    min_repeat : int
+        minimum number of timed calls per benchmark
+    min_time : float
+        minimum total time per benchmark in seconds
+    verbose : bool
+        print every benchmark when it is finished
+
+    Returns
+    -------
+    DataFrame
+        benchmark name as index and the columns cases (per call), repeat,
+        median, mean and min (s per call), latency (s per case),
+        cases_per_s and peak_memory (bytes)
+    """
+    import contextlib
+    import io
+    import os
+    import tempfile
+
+    import pandas as pd
+
+    root = os.path.abspath(root)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="spyro_bench_") as work_dir:
+        for setup in BENCHMARK_SETUPS:
+            # The readers and writers print progress and warnings per case
+            with contextlib.redirect_stdout(io.StringIO()):
+                benchmarks = setup(root, work_dir, scale)
+            for name, (func, n_cases) in benchmarks.items():
+                if select is not None and select not in name:
+                    continue
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timing = time_benchmark(func, min_repeat, min_time)
+                timing["cases"] = n_cases
+                timing["latency"] = timing["median"] / n_cases
+                timing["cases_per_s"] = n_cases / timing["median"]
+                results[name] = timing
+                if verbose:
+                    print(
+                        "{:40s} {:10.1f} us/case {:10.1f} cases/s "
+                        "{:8.2f} MB".format(
+                            name,
+                            timing["latency"] * 1e6,
+                            timing["cases_per_s"],
+                            timing["peak_memory"] / 1024**2,
+                        )
+                    )
+    return pd.DataFrame.from_dict(results, orient="index")[
+        [
+            "cases",
+            "repeat",
+            "median",
+            "mean",
+            "min",
+            "latency",
+            "cases_per_s",
+            "peak_memory",
+        ]
+    ]
+
+
+def save_baseline(results, baseline_location):
+    """Stores benchmark results as json baseline."""
+    import json
+    import os
+    import platform
+    import time
+
+    baseline_dir = os.path.dirname(baseline_location)
+    if baseline_dir and not os.path.isdir(baseline_dir):
+        os.makedirs(baseline_dir)
+    baseline = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "results": results.to_dict(orient="index"),
+    }
+    with open(baseline_location, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=1)
+
+
+def compare_baseline(results, baseline_location, tolerance=0.25):
+    """compare_baseline.
+
+    Parameters
+    ----------
+    results : DataFrame
+        output of run_benchmarks
+    baseline_location : str
+        json file written by save_baseline
+    tolerance : float
+        allowed relative slow down of the latency and growth of the peak
+        memory
+
+    Returns
+    -------
+    DataFrame
+        latency and peak memory ratio to the baseline and a regression
+        column which is True when one of them exceeds 1 + tolerance
+    """
+    import json
+
+    import pandas as pd
+
+    with open(baseline_location, "r") as baseline_file:
+        baseline = pd.DataFrame.from_dict(
+            json.load(baseline_file)["results"], orient="index"
+        )
+    common = results.index.intersection(baseline.index)
+    comparison = pd.DataFrame(
+        {
+            "latency": results.loc[common, "latency"],
+            "baseline_latency": baseline.loc[common, "latency"],
+            "latency_ratio": results.loc[common, "latency"]
+            / baseline.loc[common, "latency"],
+            "memory_ratio": results.loc[common, "peak_memory"]
+            / baseline.loc[common, "peak_memory"].clip(lower=1),
+        }
+    )
+    comparison["regression"] = (
+        comparison[["latency_ratio", "memory_ratio"]] > 1 + tolerance
+    ).any(axis=1)
+    return comparison
+
+
+def main(argv=None):
+    """main.
+    Command line entry point:
+
+        python -m spyro_framework.benchmark --scale 1000 --save
+        python -m spyro_framework.benchmark --compare
+
+    Returns exit code 1 when a benchmark regressed against the baseline.
+    """
+    import argparse
+
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(
+        description="Benchmarks of the Spyro parsing, feed and case paths"
+    )
+    parser.add_argument("--root", default=".")
+    parser.add_argument("--scale", type=int, default=0)
+    parser.add_argument("--select", default=None)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument(
+        "--baseline", default="processing_files/benchmark_baseline.json"
+    )
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.root, args.scale, args.select, min_time=args.min_time
+    )
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(results)
+    if args.save:
+        save_baseline(results, args.baseline)
+        print("Baseline saved to {}".format(args.baseline))
+    if args.compare:
+        comparison = compare_baseline(results, args.baseline, args.tolerance)
+        with pd.option_context(
+            "display.width", 200, "display.max_columns", None
+        ):
+            print(comparison)
+        if comparison["regression"].any():
+            print(
+                "[ERROR]\nRegression in: {}".format(
+                    ", ".join(comparison.index[comparison["regression"]])
+                )
+            )
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
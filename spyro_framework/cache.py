@@ -0,0 +1,332 @@
+class SpyroResultCache:
+    def __init__(self, cache_folder, max_size=2 * 1024**3):
+        """Constructor
+
+        Content addressed cache of Spyro output files. The key is the hash
+        of the .dat input and Pyrotec.ini together with the identity of the
+        EFPS executable, so byte identical cases are only simulated once.
+        The access times of cache hits are written to the index file with
+        the next store or by write_changes, which the batch runners call
+        when a batch ends.
+
+        Parameters
+        ----------
+        cache_folder : str
+            Folder where the cached output files are stored
+        max_size : int
+            Maximum size of the cache in bytes, the least recently used
+            entries are removed when it is exceeded. Default 2 GB.
+
+        Objects
+        -------
+        cache_index :
+            dictionary with the cache key as key and a dictionary with the
+            size and last access time of the entry as value
+        """
+        import os
+        import threading
+
+        self.cache_folder = cache_folder
+        self.max_size = max_size
+        # Spyro output files which are stored per case
+        self.output_extensions = [".eof", ".msg", ".OUT"]
+        self.index_file = os.path.join(self.cache_folder, "cache_index.json")
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Access times which are not written to the index file yet
+        self.index_changed = False
+
+        if not os.path.isdir(self.cache_folder):
+            os.makedirs(self.cache_folder)
+        self.cache_index = self.read_index()
+
+    def read_index(self):
+        import json
+        import os
+
+        if not os.path.isfile(self.index_file):
+            return {}
+        with open(self.index_file, "r") as index_file:
+            return json.load(index_file)
+
+    def write_index(self):
+        import json
+        import os
+
+        # Write to a temporary file first so that the index is never
+        # left half written
+        tmp_index_file = self.index_file + ".tmp"
+        with open(tmp_index_file, "w") as index_file:
+            json.dump(self.cache_index, index_file)
+        os.replace(tmp_index_file, self.index_file)
+        self.index_changed = False
+
+    def write_changes(self):
+        """Writes the access times of the cache hits to the index file."""
+        with self.lock:
+            if self.index_changed:
+                self.write_index()
+
+    def get_size(self):
+        return sum(entry["size"] for entry in self.cache_index.values())
+
+    @staticmethod
+    def get_exe_identity(spyro_exe_loc_name):
+        """get_exe_identity.
+
+        Parameters
+        ----------
+        spyro_exe_loc_name : str
+            Full path of the Spyro executable
+
+        Returns
+        -------
+        str
+            Path, size and modification time of the executable. A new EFPS
+            version therefore never serves results of the old one.
+        """
+        import os
+
+        if not os.path.isfile(spyro_exe_loc_name):
+            return os.path.abspath(spyro_exe_loc_name)
+        stat = os.stat(spyro_exe_loc_name)
+        return "{}|{}|{}".format(
+            os.path.abspath(spyro_exe_loc_name), stat.st_size, stat.st_mtime_ns
+        )
+
+    def get_key(
+        self, spyro_data, spyro_input_string=None, from_case_folder=False
+    ):
+        """get_key.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object of the case
+        spyro_input_string : str or bytes, optional
+            .dat content, by default rendered with render_spyro or read from
+            the case folder
+        from_case_folder : bool
+            hash the <case>.dat and Pyrotec.ini in the case folder, i.e. the
+            input which EFPS actually runs, instead of the rendered .dat and
+            the Pyrotec.ini of the base folder. Needed for case folders which
+            are not written by this SpyroData object.
+
+        Returns
+        -------
+        str
+            sha256 hex digest of the .dat content, Pyrotec.ini and the
+            executable
+        """
+        import hashlib
+        import os
+
+        if from_case_folder:
+            input_folder = os.path.join(
+                spyro_data.get_folder_location(), spyro_data.get_file_name()
+            )
+            if spyro_input_string is None:
+                with open(
+                    os.path.join(
+                        input_folder, spyro_data.get_file_name() + ".dat"
+                    ),
+                    "rb",
+                ) as dat_file:
+                    spyro_input_string = dat_file.read()
+        else:
+            input_folder = spyro_data.get_base_folder()
+            if spyro_input_string is None:
+                spyro_input_string = spyro_data.render_spyro()
+        if isinstance(spyro_input_string, str):
+            spyro_input_string = spyro_input_string.encode()
+        key = hashlib.sha256()
+        key.update(spyro_input_string)
+        key.update(b"\0")
+        pyrotec_ini = os.path.join(input_folder, "Pyrotec.ini")
+        if os.path.isfile(pyrotec_ini):
+            with open(pyrotec_ini, "rb") as ini_file:
+                key.update(ini_file.read())
+        else:
+            key.update(b"no Pyrotec.ini")
+        key.update(b"\0")
+        key.update(
+            self.get_exe_identity(spyro_data.spyro_exe_loc_name).encode()
+        )
+        return key.hexdigest()
+
+    def contains(self, key):
+        return key in self.cache_index
+
+    def materialize(self, key, spyro_data):
+        """materialize.
+        Copies the cached output files into the case folder with the case
+        file name, as if Spyro had been run in that folder.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the case
+        spyro_data :
+            SpyroData object of the case
+
+        Returns
+        -------
+        bool
+            True on a cache hit, False otherwise
+        """
+        import os
+        import shutil
+        import time
+
+        case_folder = os.path.join(
+            spyro_data.get_folder_location(), spyro_data.get_file_name()
+        )
+        with self.lock:
+            if key not in self.cache_index:
+                self.misses += 1
+                return False
+            # The access time is written with the next store or by
+            # write_changes, not on every hit
+            self.cache_index[key]["last_access"] = time.time()
+            self.index_changed = True
+        # Copy outside the lock so that hits run concurrently
+        os.makedirs(case_folder, exist_ok=True)
+        try:
+            for extension in self.output_extensions:
+                src = os.path.join(
+                    self.cache_folder, key, "result" + extension
+                )
+                if os.path.isfile(src):
+                    shutil.copyfile(
+                        src,
+                        os.path.join(
+                            case_folder, spyro_data.get_file_name() + extension
+                        ),
+                    )
+        except FileNotFoundError:
+            pass
+        with self.lock:
+            # An entry which was evicted during the copy may be incomplete
+            if key not in self.cache_index:
+                self.misses += 1
+                return False
+            self.hits += 1
+        return True
+
+    @staticmethod
+    def is_valid_output(spyro_data):
+        """is_valid_output.
+        A run with returncode 0 can still have garbage output, e.g. the
+        .eof of NI82 after a security error. The output is valid when the
+        .msg and .OUT contain no failure (see check_case_output) and the
+        effluent of the .eof parses.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object of the case
+
+        Returns
+        -------
+        bool
+        """
+        from spyro_framework.spyro import EffluentComposition
+        from spyro_framework.watchdog import check_case_output
+
+        folder_location = spyro_data.get_folder_location()
+        file_name = spyro_data.get_file_name()
+        if check_case_output(folder_location, file_name, mark=False):
+            return False
+        try:
+            EffluentComposition().read_effluent(folder_location, file_name)
+        except Exception:
+            return False
+        return True
+
+    def store(self, key, spyro_data):
+        """store.
+        Stores the output files of a finished case and removes the least
+        recently used entries when the cache exceeds max_size. Invalid
+        output is not stored, see is_valid_output.
+
+        Parameters
+        ----------
+        key : str
+            Cache key of the case
+        spyro_data :
+            SpyroData object of the case
+
+        Returns
+        -------
+        bool
+            True when the output is in the cache
+        """
+        import os
+        import shutil
+        import tempfile
+        import time
+
+        if not self.is_valid_output(spyro_data):
+            return False
+        case_folder = os.path.join(
+            spyro_data.get_folder_location(), spyro_data.get_file_name()
+        )
+        entry_folder = os.path.join(self.cache_folder, key)
+        # Copy into a temporary folder of its own which is renamed when
+        # complete, so a concurrent materialize never sees a partial entry
+        # and two threads storing the same key do not share a folder
+        tmp_entry_folder = tempfile.mkdtemp(
+            prefix=key + ".tmp", dir=self.cache_folder
+        )
+        size = 0
+        for extension in self.output_extensions:
+            src = os.path.join(
+                case_folder, spyro_data.get_file_name() + extension
+            )
+            if os.path.isfile(src):
+                dst = os.path.join(tmp_entry_folder, "result" + extension)
+                shutil.copyfile(src, dst)
+                size += os.path.getsize(dst)
+
+        with self.lock:
+            if key in self.cache_index:
+                shutil.rmtree(tmp_entry_folder, ignore_errors=True)
+                return True
+            if os.path.exists(entry_folder):
+                shutil.rmtree(entry_folder, ignore_errors=True)
+            os.rename(tmp_entry_folder, entry_folder)
+            self.cache_index[key] = {"size": size, "last_access": time.time()}
+            self.evict()
+            self.write_index()
+        return True
+
+    def evict(self):
+        """Removes least recently used entries until max_size is met."""
+        import os
+        import shutil
+
+        total_size = self.get_size()
+        lru_keys = sorted(
+            self.cache_index,
+            key=lambda key: self.cache_index[key]["last_access"],
+        )
+        for key in lru_keys:
+            if total_size <= self.max_size:
+                break
+            total_size -= self.cache_index.pop(key)["size"]
+            shutil.rmtree(
+                os.path.join(self.cache_folder, key), ignore_errors=True
+            )
+
+    def clear(self):
+        import os
+        import shutil
+
+        with self.lock:
+            for key in self.cache_index:
+                shutil.rmtree(
+                    os.path.join(self.cache_folder, key), ignore_errors=True
+                )
+            self.cache_index = {}
+            self.write_index()
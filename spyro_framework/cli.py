@@ -0,0 +1,529 @@
+# Sections which summarize can read, see read_summary
+SUMMARY_SECTIONS = ["effluent", "general"]
+
+
+def find_cases(
+    folder_location, file_names=None, exclude=None, extension=".eof"
+):
+    """find_cases.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    file_names : list, optional
+        names of the cases, default every folder with a
+        <name>/<name><extension> file
+    exclude : list, optional
+        folder names which are not cases, default the base folder
+    extension : str
+        file which marks a case folder, .eof for cases which ran and .dat
+        for rendered cases
+
+    Returns
+    -------
+    list
+        sorted case names
+    """
+    import os
+
+    if file_names:
+        return list(file_names)
+    if exclude is None:
+        exclude = ["base"]
+    file_names = []
+    with os.scandir(folder_location) as entries:
+        for entry in entries:
+            if entry.is_dir() and entry.name not in exclude:
+                if os.path.isfile(
+                    os.path.join(entry.path, entry.name + extension)
+                ):
+                    file_names.append(entry.name)
+    return sorted(file_names)
+
+
+def read_summary(
+    folder_location,
+    file_names,
+    sections=None,
+    category="wt",
+    components=None,
+    dtype="float64",
+):
+    """read_summary.
+    Parse-only harvest of many cases with the standard library and NumPy:
+    no SpyroData objects and no pandas are created.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    file_names : list
+        names of the cases
+    sections : list, optional
+        effluent and/or general, default both
+    category : str
+        effluent category, e.g. wt, vol, RC4 or misc
+    components : list, optional
+        effluent components to keep, default all of the category
+    dtype : str
+        dtype of the effluent table, float32 or float64
+
+    Returns
+    -------
+    columns : list
+        column names, effluent components first and then the original
+        SPYROGENERAL names
+    rows : list
+        (case name, list of values) tuples, None for missing values
+    failed : list
+        (case name, reason) tuples of the cases which could not be parsed or
+        which are marked as failed by the RunWatchdog
+    """
+    from spyro_framework.effluent import EffluentTable
+    from spyro_framework.spyro import EofSectionReader
+    from spyro_framework.watchdog import get_case_failure
+
+    if sections is None:
+        sections = SUMMARY_SECTIONS
+    table = EffluentTable(dtype=dtype, capacity=max(len(file_names), 1))
+    general = {}
+    general_names = {}
+    failed = []
+    for file_name in file_names:
+        failure = get_case_failure(folder_location, file_name)
+        if failure is not None:
+            failed.append(
+                (file_name, "marked failed: {}".format(failure["reason"]))
+            )
+            continue
+        try:
+            with EofSectionReader(folder_location, file_name) as eof_reader:
+                if "effluent" in sections:
+                    table.read_case(folder_location, file_name, eof_reader)
+                if "general" in sections:
+                    tokens = eof_reader.get_section("SPYROGENERAL").split()
+                    general[file_name] = dict(
+                        zip(tokens[::2], [float(v) for v in tokens[1::2]])
+                    )
+                    general_names.update(dict.fromkeys(tokens[::2]))
+        except Exception as error:
+            failed.append(
+                (file_name, "{}: {}".format(type(error).__name__, error))
+            )
+
+    columns = []
+    effluent = {}
+    if "effluent" in sections and len(table):
+        names = list(table.get_names(category))
+        positions = list(range(len(names)))
+        if components is not None:
+            positions = [
+                names.index(component)
+                for component in components
+                if component in names
+            ]
+        columns += [names[position] for position in positions]
+        values = table.get_values(category)[:, positions].tolist()
+        effluent = dict(zip(table.get_run_names(), values))
+    columns += list(general_names)
+
+    rows = []
+    for file_name in file_names:
+        if file_name not in effluent and file_name not in general:
+            continue
+        row = effluent.get(
+            file_name, [None] * (len(columns) - len(general_names))
+        )
+        row = [None if value != value else value for value in row]
+        row += [general.get(file_name, {}).get(name) for name in general_names]
+        rows.append((file_name, row))
+    return columns, rows, failed
+
+
+def write_summary(columns, rows, output, output_format="csv"):
+    """Writes the output of read_summary as csv or json lines."""
+    import csv
+    import json
+
+    if output_format == "json":
+        for file_name, row in rows:
+            record = {"file_name": file_name}
+            record.update(zip(columns, row))
+            output.write(json.dumps(record) + "\n")
+        return
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(["file_name"] + columns)
+    for file_name, row in rows:
+        writer.writerow(
+            [file_name] + ["" if value is None else value for value in row]
+        )
+
+
+def parse_parameters(assignments):
+    """parse_parameters.
+
+    Parameters
+    ----------
+    assignments : list
+        NAME=VALUE or KEYWORD.NAME=VALUE strings, e.g. CONVAL=1.3 or
+        GEOM.TEMPO=840
+
+    Returns
+    -------
+    dict
+        parameters as expected by SpyroDatTemplate.render
+    """
+    parameters = {}
+    for assignment in assignments or []:
+        name, separator, value = assignment.partition("=")
+        if not separator:
+            raise ValueError(
+                "Parameter {} is not NAME=VALUE".format(assignment)
+            )
+        name = name.strip()
+        if "." in name:
+            name = tuple(name.split(".", 1))
+        parameters[name] = value.strip()
+    return parameters
+
+
+def read_feed_file(feed_location):
+    """read_feed_file.
+
+    Parameters
+    ----------
+    feed_location : str
+        json file with a {component: weight percent} dictionary or csv file
+        with a component and a weight percent column, without header
+
+    Returns
+    -------
+    dict
+        SPYRO component name as key and weight percent as value
+    """
+    import csv
+    import json
+
+    with open(feed_location, "r") as feed_file:
+        if feed_location.endswith(".json"):
+            return {
+                name: float(value)
+                for name, value in json.load(feed_file).items()
+            }
+        return {
+            row[0].strip(): float(row[1])
+            for row in csv.reader(feed_file)
+            if len(row) >= 2
+        }
+
+
+def render_cases(
+    folder_location,
+    file_names,
+    base_folder="base",
+    parameters=None,
+    feed_composition=None,
+    output=None,
+    link_mode="copy",
+    max_workers=1,
+):
+    """render_cases.
+    Renders case folders from the base .dat file, like write_spyro but
+    without SpyroData objects.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder where the case folders are created
+    file_names : list
+        names of the cases
+    base_folder : str
+        folder with base.dat and Pyrotec.ini, relative to folder_location
+    parameters : dict, optional
+        .dat parameters, see SpyroDatTemplate.render
+    feed_composition : dict, optional
+        new KEYW=&NAME block, default the feed of base.dat
+    output : file, optional
+        write the rendered .dat to this file instead of case folders
+    link_mode : str
+        how Pyrotec.ini is put into the case folders, see
+        staging.ASSET_LINK_MODES
+    max_workers : int
+        number of case folders written at the same time
+    """
+    import os
+    from concurrent.futures import ThreadPoolExecutor
+
+    from spyro_framework.staging import link_asset
+    from spyro_framework.template import load_dat_template
+
+    base_folder = os.path.join(folder_location, base_folder)
+    template = load_dat_template(os.path.join(base_folder, "base.dat"))
+    if output is not None:
+        for file_name in file_names:
+            output.write(template.render(parameters, feed_composition))
+        return
+
+    def write_case(file_name):
+        case_folder = os.path.join(folder_location, file_name)
+        os.makedirs(case_folder, exist_ok=True)
+        link_asset(
+            os.path.join(base_folder, "Pyrotec.ini"),
+            os.path.join(case_folder, "Pyrotec.ini"),
+            link_mode,
+        )
+        template.write(
+            os.path.join(case_folder, "{}.dat".format(file_name)),
+            parameters,
+            feed_composition,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as pool:
+        # list() raises the first error of the cases
+        list(pool.map(write_case, file_names))
+
+
+def run_cases(
+    folder_location,
+    file_names,
+    spyro_exe_loc_name=None,
+    max_workers=4,
+    timeout=None,
+    on_result=None,
+    scratch_root=None,
+):
+    """run_cases.
+    Runs existing case folders with run_spyro_batch_async, without
+    harvesting.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    file_names : list
+        names of the cases
+    spyro_exe_loc_name : str, optional
+        path of the EFPS executable, default the one of SpyroData
+    max_workers : int
+        number of cases running at the same time
+    timeout : float, optional
+        seconds after which a running case is killed
+    on_result : callable, optional
+        called with every SpyroRunResult as soon as the case is finished
+    scratch_root : str, optional
+        run the cases in a ScratchStaging folder created in this folder,
+        e.g. /dev/shm, the case folders are copied back at the end
+
+    Returns
+    -------
+    results
+        list of SpyroRunResult objects in order of completion
+    """
+    import asyncio
+    import os
+
+    from spyro_framework.executor import run_spyro_batch_async
+    from spyro_framework.spyro import SpyroData
+    from spyro_framework.staging import ScratchStaging
+
+    spyro_cases = []
+    for file_name in file_names:
+        spyro_data = SpyroData(file_name, folder_location)
+        if spyro_exe_loc_name is not None:
+            spyro_data.set_spyro_exe_name(os.path.basename(spyro_exe_loc_name))
+            spyro_data.set_spyro_exe_location(
+                os.path.dirname(os.path.abspath(spyro_exe_loc_name))
+            )
+        spyro_cases.append(spyro_data)
+    if scratch_root is None:
+        return asyncio.run(
+            run_spyro_batch_async(
+                spyro_cases,
+                max_concurrent=max_workers,
+                timeout=timeout,
+                on_result=on_result,
+                harvest=False,
+            )
+        )
+    with ScratchStaging(scratch_root) as staging:
+        return asyncio.run(
+            run_spyro_batch_async(
+                spyro_cases,
+                max_concurrent=max_workers,
+                timeout=timeout,
+                on_result=on_result,
+                harvest=False,
+                staging=staging,
+            )
+        )
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="spyro", description="Spyro case tools"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summarize = subparsers.add_parser(
+        "summarize", help="parse .eof files into a csv or json table"
+    )
+    summarize.add_argument("folder", help="folder with the case folders")
+    summarize.add_argument("cases", nargs="*", help="default all cases")
+    summarize.add_argument(
+        "--sections",
+        nargs="+",
+        choices=SUMMARY_SECTIONS,
+        default=["effluent"],
+    )
+    summarize.add_argument("--category", default="wt")
+    summarize.add_argument("--components", nargs="+", default=None)
+    summarize.add_argument("--format", choices=["csv", "json"], default="csv")
+    summarize.add_argument("--output", default=None, help="default stdout")
+    summarize.add_argument(
+        "--dtype", choices=["float32", "float64"], default="float64"
+    )
+
+    harvest = subparsers.add_parser(
+        "harvest", help="harvest new and changed cases into a result store"
+    )
+    harvest.add_argument("folder", help="folder with the case folders")
+    harvest.add_argument("store", help="folder of the result store")
+    harvest.add_argument("--batch", default="harvest")
+    harvest.add_argument("--exclude", nargs="+", default=None)
+    harvest.add_argument("--flush-every", type=int, default=50)
+
+    render = subparsers.add_parser(
+        "render", help="render case folders from the base .dat file"
+    )
+    render.add_argument("folder", help="folder with the case folders")
+    render.add_argument("cases", nargs="+")
+    render.add_argument("--base-folder", default="base")
+    render.add_argument(
+        "--set",
+        dest="parameters",
+        action="append",
+        default=[],
+        metavar="[KEYWORD.]NAME=VALUE",
+    )
+    render.add_argument("--feed", default=None, help="json or csv feed file")
+    render.add_argument(
+        "--stdout", action="store_true", help="print instead of writing"
+    )
+    render.add_argument(
+        "--link",
+        choices=["copy", "hardlink", "symlink", "auto"],
+        default="copy",
+        help="how Pyrotec.ini is put into the case folders",
+    )
+    render.add_argument("--workers", type=int, default=1)
+
+    run = subparsers.add_parser("run", help="run existing case folders")
+    run.add_argument("folder", help="folder with the case folders")
+    run.add_argument("cases", nargs="*", help="default all .dat cases")
+    run.add_argument("--exe", default=None, help="EFPS executable")
+    run.add_argument("--workers", type=int, default=4)
+    run.add_argument("--timeout", type=float, default=None)
+    run.add_argument(
+        "--scratch",
+        default=None,
+        help="run in a local scratch folder created here, e.g. /dev/shm",
+    )
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point, see python -m spyro_framework -h."""
+    import sys
+
+    args = build_parser().parse_args(argv)
+
+    if args.command == "summarize":
+        file_names = find_cases(args.folder, args.cases)
+        columns, rows, failed = read_summary(
+            args.folder,
+            file_names,
+            sections=args.sections,
+            category=args.category,
+            components=args.components,
+            dtype=args.dtype,
+        )
+        if args.output is None:
+            write_summary(columns, rows, sys.stdout, args.format)
+        else:
+            with open(args.output, "w", newline="") as output:
+                write_summary(columns, rows, output, args.format)
+        for file_name, reason in failed:
+            print("{}: {}".format(file_name, reason), file=sys.stderr)
+        return 1 if failed else 0
+
+    if args.command == "harvest":
+        from spyro_framework.harvest import harvest_incremental
+        from spyro_framework.store import SpyroResultStore
+
+        summary = harvest_incremental(
+            args.folder,
+            SpyroResultStore(args.store),
+            batch=args.batch,
+            exclude=args.exclude,
+            flush_every=args.flush_every,
+        )
+        print(
+            "harvested {} failed {} removed {} unchanged {}".format(
+                len(summary["harvested"]),
+                len(summary["failed"]),
+                len(summary["removed"]),
+                summary["unchanged"],
+            )
+        )
+        for file_name, reason in summary["failed"]:
+            print("{}: {}".format(file_name, reason), file=sys.stderr)
+        return 1 if summary["failed"] else 0
+
+    if args.command == "render":
+        feed_composition = None
+        if args.feed is not None:
+            feed_composition = read_feed_file(args.feed)
+        render_cases(
+            args.folder,
+            args.cases,
+            base_folder=args.base_folder,
+            parameters=parse_parameters(args.parameters),
+            feed_composition=feed_composition,
+            output=sys.stdout if args.stdout else None,
+            link_mode=args.link,
+            max_workers=args.workers,
+        )
+        return 0
+
+    if args.command == "run":
+
+        def print_result(result):
+            print(
+                "{} {} {:.2f}s{}".format(
+                    result.get_file_name(),
+                    result.get_status(),
+                    result.duration,
+                    "" if result.reason is None else " " + result.reason,
+                ),
+                flush=True,
+            )
+
+        results = run_cases(
+            args.folder,
+            find_cases(args.folder, args.cases, extension=".dat"),
+            spyro_exe_loc_name=args.exe,
+            max_workers=args.workers,
+            timeout=args.timeout,
+            on_result=print_result,
+            scratch_root=args.scratch,
+        )
+        return 0 if all(result.succeeded() for result in results) else 1
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,355 @@
+# Effluent categories in row order, see EffluentTable
+EFFLUENT_CATEGORIES = ["wt", "vol", "RC4-pygas", "H/C ratio", "MW", "misc"]
+# Raw C4 components which form the RC4 part of RC4-pygas
+RAW_C4_COMPONENTS = [
+    "C4H4",
+    "BUTAD",
+    "B1",
+    "B2C",
+    "B2T",
+    "IB",
+    "NBUTA",
+    "IBUTA",
+]
+
+
+def split_effluent_name(raw_name):
+    """split_effluent_name.
+    Same categories as EffluentComposition.read_effluent.
+
+    Parameters
+    ----------
+    raw_name : str
+        original Spyro name, e.g. WC2H4
+
+    Returns
+    -------
+    tuple
+        category and component name, e.g. ("wt", "C2H4")
+    """
+    if raw_name[0] == "W":
+        return "wt", raw_name[1:]
+    elif raw_name[0] == "V":
+        return "vol", raw_name[1:]
+    elif raw_name[0] == "R":
+        return "RC4-pygas", raw_name[1:]
+    elif raw_name[0:2] == "HC":
+        return "H/C ratio", raw_name[2:]
+    elif raw_name[0:2] == "MW":
+        return "MW", raw_name[2:]
+    return "misc", raw_name
+
+
+class ComponentVocabulary:
+    def __init__(self):
+        """Constructor
+
+        Interned component names shared by EffluentTable objects. Identical
+        lists of names map to one and the same pandas Index, so 100k runs
+        share a handful of index objects instead of owning one each.
+
+        Objects
+        -------
+        names :
+            dictionary with the interned tuple of names as key and value
+        indexes :
+            dictionary with a tuple of names as key and the shared Index as
+            value, only created when pandas views are requested
+        """
+        self.names = {}
+        self.indexes = {}
+
+    def get_names(self, names):
+        """Returns the interned tuple of names, without importing pandas."""
+        names = tuple(names)
+        return self.names.setdefault(names, names)
+
+    def get_index(self, names):
+        import pandas as pd
+
+        names = self.get_names(names)
+        index = self.indexes.get(names)
+        if index is None:
+            index = pd.Index(names, dtype="object")
+            self.indexes[names] = index
+        return index
+
+
+# Vocabulary used by all tables without an explicit one
+_default_vocabulary = ComponentVocabulary()
+
+
+class EffluentTable:
+    def __init__(self, vocabulary=None, dtype="float64", capacity=1024):
+        """Constructor
+
+        Compact effluent compositions of many runs: one float row per run in
+        a single 2-D array and one shared column layout in which every
+        effluent category (wt, vol, RC4-pygas, ...) is a contiguous range.
+        Series and DataFrames are views on that array, created on demand.
+
+        Parameters
+        ----------
+        vocabulary : ComponentVocabulary, optional
+            shared component vocabulary, default a module wide one
+        dtype : str
+            float32 halves the memory, default float64
+        capacity : int
+            number of rows allocated at the start, doubled when full
+
+        Objects
+        -------
+        columns :
+            list with the original Spyro names (WC2H4, ...) in row order
+        categories :
+            dictionary with the category as key and the (start, stop) column
+            range as value, RC4 and Pygas are sub ranges of RC4-pygas
+        values :
+            array with one row per run, NaN for components a run did not
+            report
+        """
+        import numpy as np
+
+        self.vocabulary = (
+            vocabulary if vocabulary is not None else _default_vocabulary
+        )
+        self.dtype = np.dtype(dtype)
+        self.columns = []
+        self.column_positions = {}
+        self.categories = {}
+        self.category_names = {}
+        self.values = np.empty((capacity, 0), dtype=self.dtype)
+        self.run_names = []
+        self.run_positions = {}
+        # Tuple of raw names in .eof order -> column of every name
+        self.key_orders = {}
+
+    def __len__(self):
+        return len(self.run_names)
+
+    def get_run_names(self):
+        return self.run_names
+
+    def get_columns(self):
+        return self.columns
+
+    def get_names(self, category="wt"):
+        """Component names of a category, e.g. C2H4 for WC2H4."""
+        return self.category_names[category]
+
+    def get_values(self, category="wt"):
+        """Array view with one row per run of a category, no pandas."""
+        start, stop = self.categories[category]
+        return self.values[: len(self.run_names), start:stop]
+
+    def set_layout(self, raw_names):
+        """set_layout.
+        Groups the known and the new raw names per category. Existing rows
+        are moved to the new layout, which only happens when a run reports
+        a component that no earlier run reported.
+
+        Parameters
+        ----------
+        raw_names : list
+            original Spyro names in .eof order
+        """
+        import numpy as np
+
+        grouped = {category: [] for category in EFFLUENT_CATEGORIES}
+        for raw_name in list(self.columns) + [
+            raw_name
+            for raw_name in raw_names
+            if raw_name not in self.column_positions
+        ]:
+            grouped[split_effluent_name(raw_name)[0]].append(raw_name)
+        # Raw C4 components first, so RC4 and Pygas are ranges as well
+        raw_c4 = ["R" + name for name in RAW_C4_COMPONENTS]
+        grouped["RC4-pygas"] = [
+            raw_name for raw_name in raw_c4 if raw_name in grouped["RC4-pygas"]
+        ] + [
+            raw_name
+            for raw_name in grouped["RC4-pygas"]
+            if raw_name not in raw_c4
+        ]
+
+        columns = []
+        self.categories = {}
+        for category in EFFLUENT_CATEGORIES:
+            start = len(columns)
+            columns += grouped[category]
+            self.categories[category] = (start, len(columns))
+        start = self.categories["RC4-pygas"][0]
+        n_raw_c4 = len(
+            [name for name in grouped["RC4-pygas"] if name in raw_c4]
+        )
+        self.categories["RC4"] = (start, start + n_raw_c4)
+        self.categories["Pygas"] = (
+            start + n_raw_c4,
+            self.categories["RC4-pygas"][1],
+        )
+
+        values = np.full(
+            (self.values.shape[0], len(columns)), np.nan, dtype=self.dtype
+        )
+        if self.columns:
+            positions = {raw_name: i for i, raw_name in enumerate(columns)}
+            values[:, [positions[name] for name in self.columns]] = self.values
+        self.values = values
+        self.columns = columns
+        self.column_positions = {
+            raw_name: i for i, raw_name in enumerate(columns)
+        }
+        self.category_names = {
+            category: self.vocabulary.get_names(
+                split_effluent_name(raw_name)[1]
+                for raw_name in columns[start:stop]
+            )
+            for category, (start, stop) in self.categories.items()
+        }
+        self.key_orders = {}
+
+    def add(self, file_name, raw_names, raw_values):
+        """add.
+
+        Parameters
+        ----------
+        file_name : str
+            name of the run, an existing run is overwritten
+        raw_names : list
+            original Spyro names, e.g. WC2H4
+        raw_values : array
+            values in the order of raw_names
+        """
+        import numpy as np
+
+        key = tuple(raw_names)
+        columns = self.key_orders.get(key)
+        if columns is None:
+            if any(name not in self.column_positions for name in raw_names):
+                self.set_layout(raw_names)
+            columns = np.array(
+                [self.column_positions[name] for name in raw_names],
+                dtype=np.intp,
+            )
+            self.key_orders[key] = columns
+
+        row = self.run_positions.get(file_name)
+        if row is None:
+            row = len(self.run_names)
+            if row == self.values.shape[0]:
+                grown = np.full(
+                    (max(2 * row, 1), self.values.shape[1]),
+                    np.nan,
+                    dtype=self.dtype,
+                )
+                grown[:row] = self.values
+                self.values = grown
+            self.run_names.append(file_name)
+            self.run_positions[file_name] = row
+        self.values[row] = np.nan
+        self.values[row, columns] = raw_values
+
+    def add_section(self, file_name, effluent_str):
+        """Adds the body of an [EFFLUENT] section without pandas."""
+        import numpy as np
+
+        tokens = effluent_str.split()
+        self.add(file_name, tokens[::2], np.array(tokens[1::2], dtype=float))
+
+    def read_case(self, folder_location, file_name, eof_document=None):
+        """read_case.
+        Reads the effluent of a case straight into the table.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder with the case folders
+        file_name : str
+            name of the case
+        eof_document : EofDocument or EofSectionReader, optional
+            already opened .eof file, default an EofSectionReader which only
+            decodes the [EFFLUENT] section
+        """
+        from spyro_framework.spyro import EofSectionReader
+
+        if eof_document is None:
+            with EofSectionReader(folder_location, file_name) as eof_reader:
+                effluent_str = eof_reader.get_section("EFFLUENT")
+        else:
+            effluent_str = eof_document.get_section("EFFLUENT")
+        self.add_section(file_name, effluent_str)
+
+    def add_effluent_raw(self, file_name, effluent_raw):
+        """Adds EffluentComposition.get_effluent_raw of a run."""
+        self.add(file_name, list(effluent_raw.index), effluent_raw.to_numpy())
+
+    def get_row(self, run):
+        if isinstance(run, str):
+            return self.run_positions[run]
+        return run
+
+    def get_series(self, run, category="wt"):
+        """get_series.
+
+        Parameters
+        ----------
+        run : str or int
+            run name or row number
+        category : str
+            wt, vol, RC4-pygas, RC4, Pygas, H/C ratio, MW or misc
+
+        Returns
+        -------
+        Series
+            view on the row of the run, component names as index
+        """
+        import pandas as pd
+
+        start, stop = self.categories[category]
+        return pd.Series(
+            self.values[self.get_row(run), start:stop],
+            index=self.vocabulary.get_index(self.category_names[category]),
+            copy=False,
+        )
+
+    def get_effluent(self, run):
+        """Dictionary with the same keys as EffluentComposition.effluent."""
+        return {
+            category: self.get_series(run, category)
+            for category in [
+                "wt",
+                "vol",
+                "RC4",
+                "RC4-pygas",
+                "Pygas",
+                "H/C ratio",
+                "MW",
+                "misc",
+            ]
+        }
+
+    def get_frame(self, category="wt"):
+        """get_frame.
+
+        Parameters
+        ----------
+        category : str
+            wt, vol, RC4-pygas, RC4, Pygas, H/C ratio, MW or misc
+
+        Returns
+        -------
+        DataFrame
+            view with the run names as index and the components as columns
+        """
+        import pandas as pd
+
+        return pd.DataFrame(
+            self.get_values(category),
+            index=pd.Index(self.run_names, name="file_name"),
+            columns=self.vocabulary.get_index(self.category_names[category]),
+            copy=False,
+        )
+
+    def get_memory_usage(self):
+        """Bytes used by the values of the runs, without spare capacity."""
+        return len(self.run_names) * self.values.shape[1] * self.dtype.itemsize
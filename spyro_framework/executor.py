@@ -0,0 +1,605 @@
+class SpyroRunResult:
+    def __init__(self, spyro_data):
+        """Constructor
+
+        Container with the outcome of one Spyro case run by the batch
+        executor.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object of the case
+
+        Objects
+        -------
+        status :
+            string with the outcome of the run: pending, finished, cached or
+        failed
+        reason :
+            string with the reason of the failure, None if finished
+        returncode :
+            integer with the exit code of the Spyro process
+        duration :
+            float with the wall clock time of the case in seconds
+        cache_key :
+            string with the SpyroResultCache key, None without cache
+        failure_code :
+            string with the reason code of the RunWatchdog (e.g. security,
+            nonconvergence or timeout), None without a detected failure
+        """
+        self.spyro_data = spyro_data
+        self.file_name = spyro_data.get_file_name()
+        self.status = "pending"
+        self.reason = None
+        self.returncode = None
+        self.duration = 0.0
+        self.cache_key = None
+        self.failure_code = None
+
+    def get_file_name(self):
+        return self.file_name
+
+    def get_status(self):
+        return self.status
+
+    def succeeded(self):
+        return self.status in ["finished", "cached"]
+
+    def __repr__(self):
+        return "SpyroRunResult({}, status={}, reason={})".format(
+            self.file_name, self.status, self.reason
+        )
+
+
+def run_spyro_case(
+    spyro_data,
+    write=False,
+    harvest=True,
+    verbose=False,
+    cache=None,
+    watchdog=False,
+    staging=None,
+):
+    """run_spyro_case.
+    Writes (optional), runs and harvests (optional) a single Spyro case.
+    Exceptions are not raised but stored in the returned result so that one
+    failing case does not stop a batch.
+
+    Parameters
+    ----------
+    spyro_data :
+        SpyroData object of the case
+    write :
+        boolean to write the case folder with write_spyro before running
+    harvest :
+        boolean to read the .eof output with read_spyro_output after a
+        successful run
+    verbose :
+        boolean to print the Spyro output and errors
+    cache :
+        SpyroResultCache, on a hit the cached output files are copied into
+        the case folder and EFPS is not run
+    watchdog :
+        boolean to tail the .msg and .OUT files with a RunWatchdog, a run
+        with a fatal message is killed, marked as failed and not harvested
+    staging :
+        ScratchStaging, the case is written, run and harvested in the local
+        scratch folder and copied back by ScratchStaging.sync
+
+    Returns
+    -------
+    result
+        SpyroRunResult with the outcome of the case
+    """
+    import time
+
+    result = SpyroRunResult(spyro_data)
+    start = time.perf_counter()
+    try:
+        if staging is not None:
+            staging.stage(spyro_data, copy_inputs=not write)
+        if write:
+            spyro_data.write_spyro()
+        if cache is not None:
+            result.cache_key = cache.get_key(
+                spyro_data, from_case_folder=not write
+            )
+        if cache is not None and cache.materialize(
+            result.cache_key, spyro_data
+        ):
+            if harvest:
+                spyro_data.read_spyro_output()
+            result.status = "cached"
+        else:
+            if watchdog:
+                from spyro_framework.watchdog import run_spyro_watched
+
+                result.returncode, result.failure_code = run_spyro_watched(
+                    spyro_data
+                )
+                if verbose:
+                    print(spyro_data.spyro_stdout)
+                    print(spyro_data.spyro_stderr)
+            else:
+                result.returncode = spyro_data.run_spyro(verbose=verbose)
+            if result.failure_code is not None:
+                result.status = "failed"
+                result.reason = "watchdog {}".format(result.failure_code)
+            elif result.returncode != 0:
+                result.status = "failed"
+                result.reason = "returncode {}".format(result.returncode)
+            else:
+                if cache is not None:
+                    cache.store(result.cache_key, spyro_data)
+                if harvest:
+                    spyro_data.read_spyro_output()
+                result.status = "finished"
+    except Exception as error:
+        result.status = "failed"
+        result.reason = "{}: {}".format(type(error).__name__, error)
+    result.duration = time.perf_counter() - start
+
+    return result
+
+
+def run_spyro_batch(
+    spyro_cases,
+    max_workers=4,
+    write=False,
+    harvest=True,
+    verbose=False,
+    cache=None,
+    watchdog=False,
+    staging=None,
+):
+    """run_spyro_batch.
+    Runs a list of Spyro cases concurrently. Every case runs EFPS in its own
+    case folder (passed as working directory to the subprocess), so no
+    process-global os.chdir is needed. Results are yielded as soon as each
+    case finishes, not in the order of spyro_cases.
+
+    The executable is taken from every SpyroData object
+    (set_spyro_exe_location / set_spyro_exe_name), a local stand-in script
+    that accepts the .dat file name as only argument can be used for testing.
+
+    With a cache, cases with identical input are only simulated once per
+    batch: duplicates wait for the first case and are then served from the
+    cache.
+
+    Parameters
+    ----------
+    spyro_cases :
+        list of SpyroData objects
+    max_workers :
+        integer with the number of cases running at the same time
+    write :
+        boolean to write the case folders with write_spyro before running
+    harvest :
+        boolean to read the .eof output of successful runs
+    verbose :
+        boolean to print the Spyro output and errors
+    cache :
+        SpyroResultCache used to skip cases which were simulated before
+    watchdog :
+        boolean to kill and mark doomed runs early, see run_spyro_case
+    staging :
+        ScratchStaging, the cases run in the local scratch folder and are
+        copied back in bulk when the batch ends
+
+    Yields
+    ------
+    result
+        SpyroRunResult of every case in order of completion
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+    from spyro_framework.metrics import start_batch
+
+    spyro_cases = list(spyro_cases)
+    progress = start_batch(len(spyro_cases), name="run_spyro_batch")
+    # Cases with the same cache key as an earlier case in the batch
+    duplicates = {}
+    # (SpyroData, cache key) of the cases which are submitted right away,
+    # the key is None without cache or when it could not be computed
+    unique_cases = []
+    for spyro_data in spyro_cases:
+        key = None
+        if cache is not None:
+            try:
+                key = cache.get_key(spyro_data, from_case_folder=not write)
+            except Exception:
+                # The case fails in run_spyro_case with the reason
+                key = None
+        if key is not None and key in duplicates:
+            duplicates[key].append(spyro_data)
+            continue
+        if key is not None:
+            duplicates[key] = []
+        unique_cases.append((spyro_data, key))
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # Future -> cache key of its case, the duplicates are released
+            # with this key, also when the case fails before its own key is
+            # known
+            pending = {
+                pool.submit(
+                    run_spyro_case,
+                    spyro_data,
+                    write,
+                    harvest,
+                    verbose,
+                    cache,
+                    watchdog,
+                    staging,
+                ): key
+                for spyro_data, key in unique_cases
+            }
+            try:
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        key = pending.pop(future)
+                        result = future.result()
+                        for spyro_data in duplicates.pop(key, []):
+                            pending[
+                                pool.submit(
+                                    run_spyro_case,
+                                    spyro_data,
+                                    write,
+                                    harvest,
+                                    verbose,
+                                    cache,
+                                    watchdog,
+                                    staging,
+                                )
+                            ] = None
+                        if progress is not None:
+                            progress.update(
+                                result.succeeded(),
+                                result.file_name,
+                                result.status,
+                            )
+                        yield result
+            finally:
+                # Cases which did not start yet are dropped when the caller
+                # stops iterating
+                for future in pending:
+                    future.cancel()
+    finally:
+        if cache is not None:
+            cache.write_changes()
+        # Copy the cases of this batch back, also when the caller stops
+        # iterating
+        if staging is not None:
+            staging.sync(spyro_cases)
+
+
+def _kill_process(process):
+    """Kills a Spyro process and, on posix, its whole process group."""
+    import os
+    import signal
+
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+
+async def _stream_lines(stream, stream_name, lines, file_name, on_output):
+    """Reads a subprocess stream line by line until EOF."""
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        line = line.decode(errors="replace").rstrip("\r\n")
+        lines.append(line)
+        if on_output is not None:
+            on_output(file_name, stream_name, line)
+
+
+async def run_spyro_case_async(
+    spyro_data,
+    timeout=None,
+    on_output=None,
+    write=False,
+    harvest=True,
+    cache=None,
+    watchdog=False,
+    staging=None,
+):
+    """run_spyro_case_async.
+    Asyncio counterpart of run_spyro_case. The stdout and stderr of EFPS are
+    streamed line by line while the simulation runs and the process is
+    killed when it exceeds the timeout or when the task is cancelled.
+
+    Parameters
+    ----------
+    spyro_data :
+        SpyroData object of the case
+    timeout :
+        float with the maximum wall clock time of the Spyro process in
+        seconds, None for no limit
+    on_output :
+        callable(file_name, stream_name, line) called for every output line,
+        stream_name is either stdout or stderr
+    write :
+        boolean to write the case folder with write_spyro before running
+    harvest :
+        boolean to read the .eof output after a successful run
+    cache :
+        SpyroResultCache, on a hit EFPS is not run
+    watchdog :
+        boolean to tail the .msg and .OUT files with a RunWatchdog, a run
+        with a fatal message is killed, marked as failed and not harvested
+    staging :
+        ScratchStaging, the case is written, run and harvested in the local
+        scratch folder and copied back by ScratchStaging.sync
+
+    Returns
+    -------
+    result
+        SpyroRunResult with the outcome of the case
+    """
+    import asyncio
+    import os
+    import time
+
+    from spyro_framework.metrics import count, span
+
+    result = SpyroRunResult(spyro_data)
+    start = time.perf_counter()
+    stdout_lines = []
+    stderr_lines = []
+    process = None
+    tasks = []
+    try:
+        if staging is not None:
+            await asyncio.to_thread(
+                staging.stage, spyro_data, copy_inputs=not write
+            )
+        if write:
+            await asyncio.to_thread(spyro_data.write_spyro)
+        if cache is not None:
+            result.cache_key = await asyncio.to_thread(
+                cache.get_key, spyro_data, from_case_folder=not write
+            )
+            if await asyncio.to_thread(
+                cache.materialize, result.cache_key, spyro_data
+            ):
+                if harvest:
+                    await asyncio.to_thread(spyro_data.read_spyro_output)
+                result.status = "cached"
+                return result
+        run_watchdog = None
+        if watchdog:
+            from spyro_framework.watchdog import RunWatchdog
+
+            run_watchdog = RunWatchdog(
+                spyro_data.get_folder_location(), spyro_data.get_file_name()
+            )
+        process = await asyncio.create_subprocess_exec(
+            spyro_data.spyro_exe_loc_name,
+            spyro_data.get_file_name() + ".dat",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=os.path.join(
+                spyro_data.get_folder_location(), spyro_data.get_file_name()
+            ),
+            # Own process group so that a kill also reaches child processes
+            start_new_session=os.name == "posix",
+        )
+        tasks = [
+            asyncio.ensure_future(
+                _stream_lines(
+                    process.stdout,
+                    "stdout",
+                    stdout_lines,
+                    result.file_name,
+                    on_output,
+                )
+            ),
+            asyncio.ensure_future(
+                _stream_lines(
+                    process.stderr,
+                    "stderr",
+                    stderr_lines,
+                    result.file_name,
+                    on_output,
+                )
+            ),
+            asyncio.ensure_future(process.wait()),
+        ]
+        with span("efps_run", result.file_name):
+            if run_watchdog is None:
+                _, pending = await asyncio.wait(tasks, timeout=timeout)
+            else:
+                deadline = None
+                if timeout is not None:
+                    deadline = time.perf_counter() + timeout
+                while True:
+                    wait_time = run_watchdog.poll_interval
+                    if deadline is not None:
+                        wait_time = min(
+                            wait_time, max(deadline - time.perf_counter(), 0)
+                        )
+                    _, pending = await asyncio.wait(tasks, timeout=wait_time)
+                    if not pending or run_watchdog.poll() is not None:
+                        break
+                    if (
+                        deadline is not None
+                        and time.perf_counter() >= deadline
+                    ):
+                        break
+        if run_watchdog is not None and not pending:
+            run_watchdog.poll(final=True)
+            run_watchdog.check_lines(stdout_lines + stderr_lines)
+        if run_watchdog is not None and run_watchdog.reason_code is not None:
+            result.status = "failed"
+            result.failure_code = run_watchdog.reason_code
+            result.reason = "watchdog {}".format(result.failure_code)
+            run_watchdog.mark_failed()
+            count(
+                "watchdog_{}".format(result.failure_code),
+                case=result.file_name,
+            )
+        elif pending:
+            result.status = "failed"
+            result.reason = "timeout after {} s".format(timeout)
+            if run_watchdog is not None:
+                result.failure_code = "timeout"
+                run_watchdog.mark_failed("timeout")
+        else:
+            result.returncode = process.returncode
+            if result.returncode != 0:
+                result.status = "failed"
+                result.reason = "returncode {}".format(result.returncode)
+            else:
+                if cache is not None:
+                    await asyncio.to_thread(
+                        cache.store, result.cache_key, spyro_data
+                    )
+                if harvest:
+                    await asyncio.to_thread(spyro_data.read_spyro_output)
+                result.status = "finished"
+    except asyncio.CancelledError:
+        result.status = "failed"
+        result.reason = "cancelled"
+        raise
+    except Exception as error:
+        result.status = "failed"
+        result.reason = "{}: {}".format(type(error).__name__, error)
+    finally:
+        if process is not None and process.returncode is None:
+            _kill_process(process)
+            # Give the killed process a moment to close its pipes
+            await asyncio.wait(tasks, timeout=5)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if process is not None:
+            result.returncode = process.returncode
+        spyro_data.spyro_stdout = "\n".join(stdout_lines)
+        spyro_data.spyro_stderr = "\n".join(stderr_lines)
+        spyro_data.spyro_returncode = result.returncode
+        result.duration = time.perf_counter() - start
+
+    return result
+
+
+async def run_spyro_batch_async(
+    spyro_cases,
+    max_concurrent=16,
+    timeout=None,
+    on_output=None,
+    on_result=None,
+    write=False,
+    harvest=True,
+    cache=None,
+    watchdog=False,
+    staging=None,
+):
+    """run_spyro_batch_async.
+    Runs a list of Spyro cases from a single event loop with at most
+    max_concurrent EFPS processes at the same time. Cancelling the task
+    which awaits this coroutine cancels the whole batch and kills all
+    running EFPS processes.
+
+    Parameters
+    ----------
+    spyro_cases :
+        list of SpyroData objects
+    max_concurrent :
+        integer with the number of EFPS processes running at the same time
+    timeout :
+        float with the maximum wall clock time per case in seconds
+    on_output :
+        callable(file_name, stream_name, line) called for every output line
+    on_result :
+        callable(result) called as soon as a case is finished
+    write :
+        boolean to write the case folders with write_spyro before running
+    harvest :
+        boolean to read the .eof output of successful runs
+    cache :
+        SpyroResultCache, identical cases in the batch wait for the first one
+        and are then served from the cache
+    watchdog :
+        boolean to kill and mark doomed runs early, see
+        run_spyro_case_async
+    staging :
+        ScratchStaging, the cases run in the local scratch folder and are
+        copied back in bulk when the batch ends
+
+    Returns
+    -------
+    results
+        list of SpyroRunResult objects in order of completion
+    """
+    import asyncio
+
+    from spyro_framework.metrics import start_batch
+
+    spyro_cases = list(spyro_cases)
+    progress = start_batch(len(spyro_cases), name="run_spyro_batch_async")
+    semaphore = asyncio.Semaphore(max_concurrent)
+    # Task of the first case for every cache key in the batch
+    first_cases = {}
+
+    async def run_bounded(spyro_data):
+        key = None
+        if cache is not None:
+            try:
+                # Hashing reads files, keep it off the event loop
+                key = await asyncio.to_thread(
+                    cache.get_key, spyro_data, from_case_folder=not write
+                )
+            except Exception:
+                # The case fails in run_spyro_case_async with the reason
+                key = None
+        if key is not None:
+            if key in first_cases:
+                await asyncio.wait([first_cases[key]])
+            else:
+                first_cases[key] = asyncio.current_task()
+        async with semaphore:
+            return await run_spyro_case_async(
+                spyro_data,
+                timeout=timeout,
+                on_output=on_output,
+                write=write,
+                harvest=harvest,
+                cache=cache,
+                watchdog=watchdog,
+                staging=staging,
+            )
+
+    tasks = [
+        asyncio.ensure_future(run_bounded(spyro_data))
+        for spyro_data in spyro_cases
+    ]
+    results = []
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            results.append(result)
+            if progress is not None:
+                progress.update(
+                    result.succeeded(), result.file_name, result.status
+                )
+            if on_result is not None:
+                on_result(result)
+    finally:
+        # On cancellation (or an error in a callback) stop all other cases
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if cache is not None:
+            await asyncio.to_thread(cache.write_changes)
+        if staging is not None:
+            await asyncio.to_thread(staging.sync, spyro_cases)
+
+    return results
@@ -0,0 +1,338 @@
+class HarvestManifest:
+    def __init__(self, manifest_location):
+        """Constructor
+
+        Record of the case files which were harvested before. For every case
+        the size, modification time and sha256 hash of its .dat and .eof
+        files are kept, so a new harvest only parses the cases which were
+        added or changed since the previous one.
+
+        Parameters
+        ----------
+        manifest_location : str
+            Path of the manifest (json) file, created on the first save
+
+        Objects
+        -------
+        cases :
+            dictionary with the case name as key and a dictionary with the
+            file extension as key and its size, mtime_ns and sha256 as value,
+            plus the reason of the failure (failure) of a case which was
+            marked as failed by the RunWatchdog
+        """
+        self.manifest_location = manifest_location
+        # Case files which define whether a case changed
+        self.tracked_extensions = [".dat", ".eof"]
+        self.cases = self.read_manifest()
+
+    def read_manifest(self):
+        import json
+        import os
+
+        if not os.path.isfile(self.manifest_location):
+            return {}
+        with open(self.manifest_location, "r") as manifest_file:
+            return json.load(manifest_file)
+
+    def save(self):
+        import json
+        import os
+
+        # Write to a temporary file first so that an interrupted harvest
+        # never leaves a half written manifest
+        tmp_manifest_location = self.manifest_location + ".tmp"
+        with open(tmp_manifest_location, "w") as manifest_file:
+            json.dump(self.cases, manifest_file)
+        os.replace(tmp_manifest_location, self.manifest_location)
+
+    def get_case_names(self):
+        return list(self.cases)
+
+    def get_failure(self, file_name):
+        """Reason of the failure of a recorded case, None if it is fine."""
+        return self.cases.get(file_name, {}).get("failure")
+
+    def get_file_stats(self, folder_location, file_name):
+        """get_file_stats.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder with the case folders
+        file_name : str
+            name of the case
+
+        Returns
+        -------
+        dict
+            file extension as key and a dictionary with size and mtime_ns as
+            value, None if the case has no .eof file (not run yet)
+        """
+        import os
+
+        stats = {}
+        for extension in self.tracked_extensions:
+            try:
+                stat = os.stat(
+                    os.path.join(
+                        folder_location, file_name, file_name + extension
+                    )
+                )
+            except FileNotFoundError:
+                continue
+            stats[extension] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+        if ".eof" not in stats:
+            return None
+        return stats
+
+    def is_changed(self, folder_location, file_name, stats):
+        """is_changed.
+        A case is changed when it is new, when one of its files appeared,
+        disappeared or changed size, or when a modification time changed and
+        the hash of the file differs. Only touched files are hashed.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder with the case folders
+        file_name : str
+            name of the case
+        stats : dict
+            output of get_file_stats, the hashes of the files which were
+            hashed are added to it
+
+        Returns
+        -------
+        bool
+        """
+        import os
+
+        from spyro_framework.spyro import get_file_hash
+
+        known = self.cases.get(file_name)
+        if known is None:
+            return True
+        failure = known.get("failure")
+        known = {
+            extension: stat
+            for extension, stat in known.items()
+            if extension != "failure"
+        }
+        if set(known) != set(stats):
+            return True
+        changed = False
+        for extension, stat in stats.items():
+            if stat["size"] != known[extension]["size"]:
+                return True
+            if stat["mtime_ns"] == known[extension]["mtime_ns"]:
+                stat["sha256"] = known[extension]["sha256"]
+                continue
+            stat["sha256"] = get_file_hash(
+                os.path.join(folder_location, file_name, file_name + extension)
+            )
+            if stat["sha256"] != known[extension]["sha256"]:
+                changed = True
+        if not changed:
+            # Only touched, keep the new modification times so the files
+            # are not hashed again on the next scan
+            self.cases[file_name] = dict(stats)
+            if failure is not None:
+                self.cases[file_name]["failure"] = failure
+        return changed
+
+    def scan(self, folder_location, exclude=None):
+        """scan.
+        Compares the case folders in folder_location with the manifest.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder with the case folders (e.g. NI03, NI26, ...)
+        exclude : list, optional
+            folder names which are not cases, default the base folder
+
+        Returns
+        -------
+        changed : dict
+            case name as key and the new file stats as value for the cases
+            which were added or changed
+        removed : list
+            names of the cases in the manifest without .eof file
+        """
+        import os
+
+        if exclude is None:
+            exclude = ["base"]
+        changed = {}
+        present = set()
+        with os.scandir(folder_location) as entries:
+            for entry in entries:
+                if not entry.is_dir() or entry.name in exclude:
+                    continue
+                stats = self.get_file_stats(folder_location, entry.name)
+                if stats is None:
+                    continue
+                present.add(entry.name)
+                if self.is_changed(folder_location, entry.name, stats):
+                    changed[entry.name] = stats
+        removed = sorted(set(self.cases) - present)
+        return changed, removed
+
+    def update(self, file_name, folder_location, stats, failure=None):
+        """update.
+        Records the files of a harvested case, hashing missing ones.
+
+        Parameters
+        ----------
+        file_name : str
+            name of the case
+        folder_location : str
+            folder with the case folders
+        stats : dict
+            output of get_file_stats
+        failure : str, optional
+            reason of the failure of a case marked as failed, it is only
+            harvested again when its files change
+        """
+        import os
+
+        from spyro_framework.spyro import get_file_hash
+
+        for extension, stat in stats.items():
+            if "sha256" not in stat:
+                stat["sha256"] = get_file_hash(
+                    os.path.join(
+                        folder_location, file_name, file_name + extension
+                    )
+                )
+        self.cases[file_name] = dict(stats)
+        if failure is not None:
+            self.cases[file_name]["failure"] = failure
+
+    def remove(self, file_name):
+        self.cases.pop(file_name, None)
+
+
+def harvest_incremental(
+    folder_location,
+    result_store,
+    manifest=None,
+    batch="harvest",
+    exclude=None,
+    flush_every=50,
+    verbose=False,
+):
+    """harvest_incremental.
+    Harvests the .eof output of all case folders in folder_location into a
+    SpyroResultStore, parsing only the cases which were added or changed
+    since the previous harvest. Re-harvested cases are appended to the same
+    batch, query the store with latest=True to get only their newest rows.
+    Cases which fail to parse are reported and retried on the next harvest,
+    cases which are marked as failed by the RunWatchdog are reported once
+    and retried when their .dat or .eof changes.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    result_store : SpyroResultStore
+        store where the harvested cases are appended
+    manifest : HarvestManifest, optional
+        default _harvest_manifest.json in the store folder
+    batch : str
+        name of the batch (partition) in the store, default harvest
+    exclude : list, optional
+        folder names which are not cases, default the base folder
+    flush_every : int
+        number of cases buffered before a Parquet file is written
+    verbose : bool
+        print the harvested, failed and removed cases
+
+    Returns
+    -------
+    summary
+        dictionary with the lists of harvested, failed (case name and reason)
+        and removed cases, the harvested cases without [FIREBOX] section
+        (no_firebox) and the number of unchanged cases
+    """
+    import os
+
+    from spyro_framework.spyro import SpyroData
+    from spyro_framework.watchdog import get_case_failure
+
+    if manifest is None:
+        manifest = HarvestManifest(
+            os.path.join(result_store.store_folder, "_harvest_manifest.json")
+        )
+    changed, removed = manifest.scan(folder_location, exclude=exclude)
+    n_unchanged = len(
+        [
+            file_name
+            for file_name in manifest.get_case_names()
+            if file_name not in changed and file_name not in removed
+        ]
+    )
+
+    summary = {
+        "harvested": [],
+        "failed": [],
+        "removed": removed,
+        "no_firebox": [],
+    }
+    with result_store.open_batch(batch, flush_every=flush_every) as writer:
+        for file_name in sorted(changed):
+            failure = get_case_failure(folder_location, file_name)
+            if failure is not None:
+                # Doomed run marked by the RunWatchdog, its .eof is garbage.
+                # Recorded so it is only reported again when its files change
+                summary["failed"].append(
+                    (file_name, "marked failed: {}".format(failure["reason"]))
+                )
+                manifest.update(
+                    file_name,
+                    folder_location,
+                    changed[file_name],
+                    failure=failure["reason"],
+                )
+                continue
+            spyro_data = SpyroData(file_name, folder_location)
+            try:
+                # Reported once for the whole harvest instead of per case
+                spyro_data.read_spyro_output(warn=False)
+            except Exception as error:
+                # Not recorded in the manifest, so retried next time
+                summary["failed"].append(
+                    (file_name, "{}: {}".format(type(error).__name__, error))
+                )
+                continue
+            writer.add(spyro_data)
+            if not spyro_data.firebox.firebox_present:
+                summary["no_firebox"].append(file_name)
+            manifest.update(file_name, folder_location, changed[file_name])
+            summary["harvested"].append(file_name)
+    for file_name in removed:
+        manifest.remove(file_name)
+    manifest.save()
+
+    summary["unchanged"] = n_unchanged
+    if summary["no_firebox"]:
+        print(
+            "Warning: [FIREBOX] section not found in {} harvested cases, "
+            "no firebox data was parsed: {}".format(
+                len(summary["no_firebox"]), ", ".join(summary["no_firebox"])
+            )
+        )
+    if verbose:
+        print(
+            "Harvested {} cases, {} failed, {} removed.".format(
+                len(summary["harvested"]),
+                len(summary["failed"]),
+                len(summary["removed"]),
+            )
+        )
+        for file_name, reason in summary["failed"]:
+            print("Failed to harvest {}: {}".format(file_name, reason))
+    return summary
@@ -0,0 +1,345 @@
+# Active MetricsRecorder, None when instrumentation is disabled
+_recorder = None
+
+
+class MetricsRecorder:
+    def __init__(self, jsonl_location=None, callback=None):
+        """Constructor
+
+        Collects timed spans per stage and per case, counters and batch
+        progress of the simulate-and-harvest pipeline. Every event is a
+        dictionary which is appended to a JSON lines file and/or passed to
+        a callback. Activate it with enable_metrics.
+
+        Parameters
+        ----------
+        jsonl_location : str, optional
+            JSON lines file the events are appended to
+        callback : callable, optional
+            called with every event dictionary, e.g. to feed monitoring
+
+        Objects
+        -------
+        counters :
+            dictionary with the counter name as key and its count as value
+        stage_totals :
+            dictionary with the stage as key and a dictionary with the
+            number of spans, errors and total duration in seconds as value
+        """
+        import threading
+
+        self.jsonl_location = jsonl_location
+        self.callback = callback
+        self.counters = {}
+        self.stage_totals = {}
+        self.lock = threading.Lock()
+        self.jsonl_file = None
+        if jsonl_location is not None:
+            self.jsonl_file = open(jsonl_location, "a")
+
+    def get_counters(self):
+        return self.counters
+
+    def get_stage_totals(self):
+        return self.stage_totals
+
+    def emit(self, event):
+        """Writes an event to the JSON lines file and the callback."""
+        import json
+
+        if self.jsonl_file is not None:
+            line = json.dumps(event, default=str)
+            with self.lock:
+                self.jsonl_file.write(line + "\n")
+        if self.callback is not None:
+            self.callback(event)
+
+    def record_span(self, stage, case, start, duration, error=None, **attrs):
+        with self.lock:
+            totals = self.stage_totals.setdefault(
+                stage, {"count": 0, "errors": 0, "duration": 0.0}
+            )
+            totals["count"] += 1
+            totals["duration"] += duration
+            if error is not None:
+                totals["errors"] += 1
+        event = {
+            "type": "span",
+            "stage": stage,
+            "case": case,
+            "start": start,
+            "duration": duration,
+            "status": "ok" if error is None else "error",
+        }
+        if error is not None:
+            event["error"] = error
+        event.update(attrs)
+        self.emit(event)
+
+    def count(self, name, n=1, case=None):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+            value = self.counters[name]
+        self.emit(
+            {"type": "counter", "name": name, "case": case, "value": value}
+        )
+
+    def start_batch(self, total, name="batch"):
+        """Returns a BatchProgress which reports throughput and ETA."""
+        return BatchProgress(self, total, name)
+
+    def get_summary(self):
+        """get_summary.
+
+        Returns
+        -------
+        DataFrame
+            stage as index with the number of spans, errors, total and mean
+            duration in seconds
+        """
+        import pandas as pd
+
+        with self.lock:
+            summary = pd.DataFrame.from_dict(self.stage_totals, orient="index")
+        if not summary.empty:
+            summary["mean"] = summary["duration"] / summary["count"]
+        return summary
+
+    def close(self):
+        if self.jsonl_file is not None:
+            self.jsonl_file.close()
+            self.jsonl_file = None
+
+
+class BatchProgress:
+    def __init__(self, recorder, total, name="batch"):
+        """Constructor
+
+        Progress of a batch of cases with the throughput and the estimated
+        time until the batch is finished.
+
+        Parameters
+        ----------
+        recorder : MetricsRecorder
+            recorder the progress events are sent to
+        total : int
+            number of cases in the batch
+        name : str
+            name of the batch in the events
+        """
+        import time
+
+        self.recorder = recorder
+        self.total = total
+        self.name = name
+        self.done = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+
+    def update(self, succeeded, case=None, status=None):
+        """update.
+        Registers a finished case and emits a progress event.
+
+        Parameters
+        ----------
+        succeeded : bool
+            whether the case succeeded
+        case : str, optional
+            name of the case
+        status : str, optional
+            status of the case, counted as cases_<status>
+
+        Returns
+        -------
+        dict
+            the progress event
+        """
+        import time
+
+        self.done += 1
+        if not succeeded:
+            self.failed += 1
+        self.recorder.count(
+            "cases_{}".format(status or ("ok" if succeeded else "failed")),
+            case=case,
+        )
+        elapsed = time.perf_counter() - self.start
+        throughput = self.done / elapsed if elapsed > 0 else 0.0
+        remaining = self.total - self.done
+        event = {
+            "type": "progress",
+            "batch": self.name,
+            "case": case,
+            "done": self.done,
+            "failed": self.failed,
+            "total": self.total,
+            "elapsed": elapsed,
+            "throughput": throughput,
+            "eta": remaining / throughput if throughput > 0 else None,
+        }
+        self.recorder.emit(event)
+        return event
+
+
+class _Span:
+    """Context manager which times a stage and records it on exit."""
+
+    __slots__ = ("recorder", "stage", "case", "attrs", "start", "wall")
+
+    def __init__(self, recorder, stage, case, attrs):
+        self.recorder = recorder
+        self.stage = stage
+        self.case = case
+        self.attrs = attrs
+
+    def __enter__(self):
+        import time
+
+        self.wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        import time
+
+        duration = time.perf_counter() - self.start
+        error = None
+        if exc_type is not None:
+            error = "{}: {}".format(exc_type.__name__, exc_value)
+        self.recorder.record_span(
+            self.stage, self.case, self.wall, duration, error, **self.attrs
+        )
+        return False
+
+
+class _NullSpan:
+    """Shared no-op span used while instrumentation is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_null_span = _NullSpan()
+
+
+def span(stage, case=None, **attrs):
+    """span.
+    Times a stage of the pipeline:
+
+        with span("efps_run", case="NI03"):
+            ...
+
+    Parameters
+    ----------
+    stage : str
+        name of the stage, e.g. render_dat, efps_run, read_effluent
+    case : str, optional
+        name of the case
+    attrs :
+        extra fields of the span event
+
+    Returns
+    -------
+    context manager
+        a shared no-op object when instrumentation is disabled
+    """
+    if _recorder is None:
+        return _null_span
+    return _Span(_recorder, stage, case, attrs)
+
+
+def timed(stage, case_arg=None):
+    """timed.
+    Decorator which runs a function in a span. When instrumentation is
+    disabled only a single global lookup is added to the call.
+
+    Parameters
+    ----------
+    stage : str
+        name of the stage
+    case_arg : str, optional
+        name of the argument with the case name, or "self" to use
+        self.get_file_name()
+
+    Returns
+    -------
+    decorator
+    """
+    import functools
+    import inspect
+
+    def decorator(func):
+        position = None
+        if case_arg not in [None, "self"]:
+            position = list(inspect.signature(func).parameters).index(case_arg)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return func(*args, **kwargs)
+            case = None
+            if case_arg == "self":
+                case = args[0].get_file_name()
+            elif case_arg in kwargs:
+                case = kwargs[case_arg]
+            elif position is not None and position < len(args):
+                case = args[position]
+            with _Span(_recorder, stage, case, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def count(name, n=1, case=None):
+    """Increments a counter, no-op when instrumentation is disabled."""
+    if _recorder is not None:
+        _recorder.count(name, n, case)
+
+
+def start_batch(total, name="batch"):
+    """Returns a BatchProgress, None when instrumentation is disabled."""
+    if _recorder is None:
+        return None
+    return _recorder.start_batch(total, name)
+
+
+def enable_metrics(jsonl_location=None, callback=None):
+    """enable_metrics.
+
+    Parameters
+    ----------
+    jsonl_location : str, optional
+        JSON lines file the events are appended to
+    callback : callable, optional
+        called with every event dictionary
+
+    Returns
+    -------
+    MetricsRecorder
+        the active recorder
+    """
+    global _recorder
+
+    disable_metrics()
+    _recorder = MetricsRecorder(jsonl_location, callback)
+    return _recorder
+
+
+def disable_metrics():
+    global _recorder
+
+    if _recorder is not None:
+        _recorder.close()
+    _recorder = None
+
+
+def get_metrics():
+    """Returns the active MetricsRecorder or None."""
+    return _recorder
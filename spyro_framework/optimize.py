@@ -0,0 +1,557 @@
+# Default limits of the constrained optimizer, original SPYROGENERAL names
+DEFAULT_CONSTRAINTS = {"MAXSKIN": 1100.0, "COKRATE": 2.0, "PRESSDR": 2.5}
+
+
+def get_profile_constraint(coil_profile, name):
+    """get_profile_constraint.
+    Derives a default limit from the TUBE coil profile, for .eof files
+    which do not report it in [SPYROGENERAL]: MAXSKIN is the maximum TMT,
+    COKRATE the maximum COKER and PRESSDR the inlet minus the outlet PRES.
+
+    Parameters
+    ----------
+    coil_profile : CoilProfileData
+        coil profiles of a harvested case
+    name : str
+        MAXSKIN, COKRATE or PRESSDR
+
+    Returns
+    -------
+    float
+        value of the limit, NaN if it cannot be derived
+    """
+    import numpy as np
+
+    try:
+        if name == "MAXSKIN":
+            return float(np.nanmax(coil_profile.get_column("TMT")))
+        if name == "COKRATE":
+            return float(np.nanmax(coil_profile.get_column("COKER")))
+        if name == "PRESSDR":
+            pressure = coil_profile.get_column("PRES")
+            return float(pressure[0] - pressure[-1])
+    except (KeyError, TypeError, ValueError, IndexError):
+        pass
+    return float("nan")
+
+
+def fit_gaussian_process(x, y, length_scales=None, noises=None):
+    """fit_gaussian_process.
+    Gaussian process regression with a squared exponential kernel in
+    NumPy. The length scale and noise are chosen from a small grid by the
+    marginal likelihood.
+
+    Parameters
+    ----------
+    x : ndarray
+        inputs scaled to the unit cube, one row per observation
+    y : ndarray
+        observations
+    length_scales : list, optional
+        length scales which are tried, default 0.05 up to 1.6
+    noises : list, optional
+        noise variances (relative to the variance of y) which are tried
+
+    Returns
+    -------
+    dict
+        fitted model for predict_gaussian_process
+    """
+    import numpy as np
+
+    if length_scales is None:
+        length_scales = [0.05, 0.1, 0.2, 0.4, 0.8, 1.6]
+    if noises is None:
+        noises = [1e-6, 1e-3, 1e-2, 1e-1]
+    y_mean = y.mean()
+    y_std = y.std() or 1.0
+    y_scaled = (y - y_mean) / y_std
+    sq_distances = ((x[:, None, :] - x[None, :, :]) ** 2).sum(axis=2)
+
+    best = None
+    for length_scale in length_scales:
+        kernel = np.exp(-0.5 * sq_distances / length_scale**2)
+        for noise in noises:
+            try:
+                cholesky = np.linalg.cholesky(kernel + noise * np.eye(len(x)))
+            except np.linalg.LinAlgError:
+                continue
+            alpha = np.linalg.solve(
+                cholesky.T, np.linalg.solve(cholesky, y_scaled)
+            )
+            log_likelihood = (
+                -0.5 * y_scaled @ alpha - np.log(np.diag(cholesky)).sum()
+            )
+            if best is None or log_likelihood > best["log_likelihood"]:
+                best = {
+                    "log_likelihood": log_likelihood,
+                    "length_scale": length_scale,
+                    "noise": noise,
+                    "cholesky": cholesky,
+                    "alpha": alpha,
+                }
+    if best is None:
+        raise ValueError(
+            "no length scale and noise gives a positive definite kernel, "
+            "are the inputs finite?"
+        )
+    best.update({"x": x, "y_mean": y_mean, "y_std": y_std})
+    return best
+
+
+def predict_gaussian_process(model, x):
+    """predict_gaussian_process.
+
+    Parameters
+    ----------
+    model : dict
+        output of fit_gaussian_process
+    x : ndarray
+        inputs scaled to the unit cube
+
+    Returns
+    -------
+    mean : ndarray
+    std : ndarray
+        predicted mean and standard deviation of every input
+    """
+    import numpy as np
+
+    sq_distances = ((x[:, None, :] - model["x"][None, :, :]) ** 2).sum(axis=2)
+    kernel = np.exp(-0.5 * sq_distances / model["length_scale"] ** 2)
+    mean = kernel @ model["alpha"]
+    v = np.linalg.solve(model["cholesky"], kernel.T)
+    variance = np.maximum(1.0 - (v**2).sum(axis=0), 1e-12)
+    return (
+        model["y_mean"] + model["y_std"] * mean,
+        model["y_std"] * np.sqrt(variance),
+    )
+
+
+def normal_cdf(z):
+    """Cumulative distribution function of the standard normal."""
+    import math
+
+    import numpy as np
+
+    return 0.5 * (1.0 + np.vectorize(math.erf)(np.asarray(z) / math.sqrt(2)))
+
+
+class ConstrainedOptimizer:
+    def __init__(
+        self,
+        folder_location,
+        factors,
+        objective=None,
+        constraints=None,
+        fixed=None,
+        q=4,
+        n_initial=None,
+        budget=40,
+        n_candidates=2000,
+        seed=None,
+        history=None,
+        base_folder="base",
+        feed_batch=None,
+        default_feed=None,
+        prefix="optimize",
+        spyro_exe_location=None,
+        spyro_exe_name=None,
+    ):
+        """Constructor
+
+        Batch Bayesian optimization of the operating point: maximizes the
+        sum of effluent components (default ethylene + propylene) subject
+        to upper limits on general output (default MAXSKIN, COKRATE and
+        PRESSDR). Every round proposes q cases which are run concurrently as
+        a SpyroSweep. The objective and every constraint are modelled with a
+        Gaussian process, the candidates maximize the expected improvement
+        times the probability that all limits are met, and the q cases of a
+        round are chosen one after another with the predictions of the
+        earlier ones added as observations (kriging believer).
+
+        Parameters
+        ----------
+        folder_location : str
+            folder where the case folders are created, next to base_folder
+        factors : dict
+            factor name as key and (lower, upper) tuple as value, see
+            SpyroSweep, e.g. {"CONVAL": (50, 65), "STEAM": (800, 1200)}
+        objective : list or callable, optional
+            effluent components (weight percent) which are summed, default
+            C2H4 and C3H6, or a callable which returns the value for a row
+            of the sweep results
+        constraints : dict, optional
+            general output as key and upper limit as value, the original
+            Spyro name (e.g. MAXSKIN) or the descriptive name of
+            SpyroGeneralOutput, default DEFAULT_CONSTRAINTS. MAXSKIN,
+            COKRATE and PRESSDR are derived from the coil profile when the
+            general output lacks them, see get_profile_constraint. A case
+            without the output counts as infeasible, a warning is printed
+            when no case of a round reports it.
+        fixed : dict, optional
+            factors which are the same for every case, e.g. {"CONOP": 5}
+        q : int
+            number of cases per round
+        n_initial : int, optional
+            number of cases of the initial Latin hypercube design, default
+            2 q, minus the number of cases in history
+        budget : int
+            maximum number of new cases
+        n_candidates : int
+            number of random candidates the acquisition is evaluated on
+        seed : int, optional
+            seed of the random generator
+        history : DataFrame, optional
+            get_history of an earlier optimization with the same factors,
+            its cases are not simulated again
+        base_folder, feed_batch, default_feed, spyro_exe_location,
+        spyro_exe_name :
+            see SpyroSweep
+        prefix : str
+            prefix of the case names, round r uses <prefix>_r<r>
+
+        Objects
+        -------
+        history :
+            DataFrame with one row per case: the factors, objective,
+            constraint values, feasible, round and case name
+        spyro_cases :
+            dictionary with the case name as key and the SpyroData as value
+        """
+        import numpy as np
+        import pandas as pd
+
+        self.folder_location = folder_location
+        self.factors = {
+            name: (float(min(bounds)), float(max(bounds)))
+            for name, bounds in factors.items()
+        }
+        if objective is None:
+            objective = ["C2H4", "C3H6"]
+        self.objective = objective
+        if constraints is None:
+            constraints = DEFAULT_CONSTRAINTS
+        self.constraints = dict(constraints)
+        self.fixed = dict(fixed or {})
+        self.q = max(int(q), 1)
+        self.n_initial = n_initial
+        self.budget = budget
+        self.n_candidates = n_candidates
+        self.rng = np.random.default_rng(seed)
+        self.seed = seed
+        self.sweep_options = {
+            "base_folder": base_folder,
+            "feed_batch": feed_batch,
+            "default_feed": default_feed,
+            "spyro_exe_location": spyro_exe_location,
+            "spyro_exe_name": spyro_exe_name,
+        }
+        self.prefix = prefix
+        columns = (
+            list(self.factors)
+            + ["objective"]
+            + list(self.constraints)
+            + ["feasible", "round", "file_name"]
+        )
+        if history is None:
+            history = pd.DataFrame(columns=columns)
+        self.history = history[columns].reset_index(drop=True)
+        self.spyro_cases = {}
+        self.n_evaluated = 0
+        # Constraints which were never reported, warned about once
+        self.unreported = []
+
+    def get_history(self):
+        return self.history
+
+    def get_objective_value(self, row):
+        """get_objective_value.
+
+        Parameters
+        ----------
+        row : Series
+            row of the SpyroSweep results of a case
+
+        Returns
+        -------
+        float
+            value of the objective, NaN if an effluent component is missing
+        """
+        if callable(self.objective):
+            return float(self.objective(row))
+        return float(
+            sum(
+                row.get(("effluent", component), float("nan"))
+                for component in self.objective
+            )
+        )
+
+    def get_constraint_value(self, row, name, spyro_data=None):
+        """get_constraint_value.
+
+        Parameters
+        ----------
+        row : Series
+            row of the SpyroSweep results of a case
+        name : str
+            name of the constraint
+        spyro_data : SpyroData, optional
+            harvested case, a default limit which is not in the general
+            output is derived from its coil profile
+
+        Returns
+        -------
+        float
+            value of the constraint, NaN if absent
+        """
+        import math
+
+        from spyro_framework.spyro import GENERAL_COLUMN_MAPPING
+
+        for column in [name, GENERAL_COLUMN_MAPPING.get(name)]:
+            if ("general", column) in row.index:
+                value = float(row[("general", column)])
+                if not math.isnan(value):
+                    return value
+        if spyro_data is not None:
+            return get_profile_constraint(spyro_data.coil_profile, name)
+        return float("nan")
+
+    def get_best(self):
+        """Feasible row of the history with the highest objective, None if
+        no case is feasible."""
+        history = self.history[self.history["feasible"].astype(bool)]
+        history = history.dropna(subset=["objective"])
+        if history.empty:
+            return None
+        return history.loc[history["objective"].astype(float).idxmax()]
+
+    def scale(self, values):
+        """Scales factor values (one column per factor) to the unit cube."""
+        import numpy as np
+
+        low = np.array([bounds[0] for bounds in self.factors.values()])
+        high = np.array([bounds[1] for bounds in self.factors.values()])
+        return (np.asarray(values, dtype="float64") - low) / np.where(
+            high > low, high - low, 1.0
+        )
+
+    def unscale(self, unit):
+        import numpy as np
+
+        low = np.array([bounds[0] for bounds in self.factors.values()])
+        high = np.array([bounds[1] for bounds in self.factors.values()])
+        return low + np.asarray(unit) * (high - low)
+
+    def propose(self, q):
+        """propose.
+
+        Parameters
+        ----------
+        q : int
+            number of cases
+
+        Returns
+        -------
+        list
+            one dictionary per case with the factor name as key
+        """
+        import numpy as np
+
+        from spyro_framework.sweep import latin_hypercube_design
+
+        names = list(self.factors)
+        history = self.history
+        objective = history["objective"].to_numpy(dtype="float64")
+        observed = ~np.isnan(objective)
+        n_initial = self.n_initial
+        if n_initial is None:
+            n_initial = 2 * self.q
+        if observed.sum() < max(n_initial, 2):
+            # Failed cases count as well, otherwise a round of failures
+            # would propose the same design again
+            seed = None if self.seed is None else self.seed + len(history)
+            return latin_hypercube_design(self.factors, q, seed=seed)
+
+        x = self.scale(history[names].to_numpy(dtype="float64"))
+        # The objective model learns from infeasible cases as well, the
+        # limits are handled by the constraint models
+        inputs = {"objective": x[observed]}
+        outputs = {"objective": objective[observed]}
+        for name, limit in self.constraints.items():
+            values = history[name].to_numpy(dtype="float64")
+            # Missing output, e.g. of a failed case, counts as a violated
+            # limit so the constraint models steer away from failures
+            inputs[name] = x
+            outputs[name] = np.where(
+                np.isnan(values), limit + max(abs(limit), 1.0), values
+            )
+
+        candidates = self.rng.random((self.n_candidates, len(names)))
+        chosen = []
+        for _ in range(q):
+            models = {
+                name: fit_gaussian_process(inputs[name], y)
+                for name, y in outputs.items()
+            }
+            mean, std = predict_gaussian_process(
+                models["objective"], candidates
+            )
+            feasibility = np.ones(len(candidates))
+            for name, limit in self.constraints.items():
+                c_mean, c_std = predict_gaussian_process(
+                    models[name], candidates
+                )
+                feasibility *= normal_cdf((limit - c_mean) / c_std)
+            best = self.get_best()
+            if best is None:
+                acquisition = feasibility
+            else:
+                z = (mean - float(best["objective"])) / std
+                improvement = std * (
+                    z * normal_cdf(z)
+                    + np.exp(-0.5 * z**2) / np.sqrt(2 * np.pi)
+                )
+                acquisition = improvement * feasibility
+            i = int(np.argmax(acquisition))
+            chosen.append(candidates[i])
+            # Kriging believer: the prediction becomes an observation so the
+            # next case of the round is placed elsewhere
+            inputs = {
+                name: np.vstack([x, candidates[i]])
+                for name, x in inputs.items()
+            }
+            outputs = {
+                name: np.append(
+                    y,
+                    predict_gaussian_process(models[name], candidates[[i]])[0],
+                )
+                for name, y in outputs.items()
+            }
+            candidates = np.delete(candidates, i, axis=0)
+
+        return [
+            {name: float(value) for name, value in zip(names, row)}
+            for row in self.unscale(np.array(chosen))
+        ]
+
+    def evaluate(self, design, round_number, max_workers=None, cache=None):
+        """evaluate.
+        Runs the cases of one round concurrently as a SpyroSweep.
+
+        Parameters
+        ----------
+        design : list
+            one dictionary per case with the factor name as key
+        round_number : int
+            number of the round, part of the case names
+        max_workers : int, optional
+            number of cases running at the same time, default all
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+
+        Returns
+        -------
+        DataFrame
+            new rows of the history
+        """
+        import pandas as pd
+
+        from spyro_framework.sweep import SpyroSweep
+
+        sweep = SpyroSweep(
+            self.folder_location,
+            [dict(self.fixed, **case) for case in design],
+            prefix="{}_r{:02d}".format(self.prefix, round_number),
+            **self.sweep_options,
+        )
+        results = sweep.run(
+            max_workers=max_workers or len(design), cache=cache
+        )
+        self.spyro_cases.update(sweep.spyro_cases)
+        self.n_evaluated += len(design)
+
+        rows = []
+        for case, (file_name, row) in zip(design, results.iterrows()):
+            record = dict(case)
+            record["objective"] = float("nan")
+            for name in self.constraints:
+                record[name] = float("nan")
+            if row[("run", "status")] in ["finished", "cached"]:
+                record["objective"] = self.get_objective_value(row)
+                for name in self.constraints:
+                    record[name] = self.get_constraint_value(
+                        row, name, self.spyro_cases.get(file_name)
+                    )
+            record["feasible"] = all(
+                record[name] <= limit
+                for name, limit in self.constraints.items()
+            )
+            record["round"] = round_number
+            record["file_name"] = file_name
+            rows.append(record)
+        rows = pd.DataFrame(rows, columns=self.history.columns)
+        succeeded = rows["objective"].notna()
+        for name in self.constraints:
+            if (
+                name not in self.unreported
+                and succeeded.any()
+                and rows.loc[succeeded, name].isna().all()
+            ):
+                # Without the output every case counts as infeasible
+                self.unreported.append(name)
+                print(
+                    "Warning: constraint {} is not reported by the cases of "
+                    "round {}, they count as infeasible.".format(
+                        name, round_number
+                    )
+                )
+        self.history = pd.concat(
+            [self.history, rows] if not self.history.empty else [rows],
+            ignore_index=True,
+        )
+        return rows
+
+    def run(self, max_workers=None, cache=None, verbose=False):
+        """run.
+        Proposes and evaluates rounds of q cases until the budget of new
+        cases is used.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            number of cases running at the same time, default q
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+        verbose : bool
+            print the cases and results of every round
+
+        Returns
+        -------
+        SpyroData
+            harvested feasible case of this run with the highest objective,
+            None if no case of this run is feasible. get_best also
+            considers the cases of an earlier history.
+        """
+        round_number = 0
+        if not self.history.empty:
+            round_number = int(self.history["round"].max()) + 1
+        while self.n_evaluated < self.budget:
+            q = min(self.q, self.budget - self.n_evaluated)
+            rows = self.evaluate(
+                self.propose(q), round_number, max_workers, cache
+            )
+            if verbose:
+                print("round {}".format(round_number))
+                print(rows)
+            round_number += 1
+
+        history = self.history[
+            self.history["file_name"].isin(list(self.spyro_cases))
+            & self.history["feasible"].astype(bool)
+        ].dropna(subset=["objective"])
+        if history.empty:
+            return None
+        best = history.loc[history["objective"].astype(float).idxmax()]
+        return self.spyro_cases[best["file_name"]]
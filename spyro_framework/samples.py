@@ -0,0 +1,193 @@
+class LabSampleWorkbook:
+    def __init__(
+        self,
+        file_name,
+        cache_dir="processing_files/samples",
+        **read_kwargs,
+    ):
+        """Constructor
+
+        Lazy access to the lab samples of a Pitagor excel workbook, one sheet
+        per sample. The sheet names are listed without parsing the sheets,
+        a sheet is only parsed when it is requested and every parsed sheet
+        is cached in a binary format keyed on the workbook hash and the
+        sheet name. Behaves like the dictionary returned by
+        pd.read_excel(..., sheet_name=None).
+
+        Parameters
+        ----------
+        file_name : str
+            excel workbook with the lab samples, e.g. Samples Naphtha2.xlsx
+        cache_dir : str
+            folder where the parsed sheets are cached,
+            default: processing_files/samples
+        read_kwargs :
+            keyword arguments passed to pd.read_excel for every sheet, e.g.
+            skiprows=8, na_values=["<0.50"]
+
+        Objects
+        -------
+        sheets :
+            dictionary with the sheet name as key and the parsed sheet as
+            value for the sheets loaded so far
+        """
+        self.file_name = file_name
+        self.cache_dir = cache_dir
+        self.read_kwargs = read_kwargs
+        self.sheet_names = None
+        self.workbook_hash = None
+        self.excel_file = None
+        self.sheets = {}
+
+    def get_sheet_names(self):
+        """get_sheet_names.
+        Reads only the workbook index (xl/workbook.xml) of .xlsx files, other
+        formats fall back to pd.ExcelFile.
+
+        Returns
+        -------
+        list
+            sheet names in workbook order
+        """
+        import zipfile
+        import xml.etree.ElementTree as ET
+
+        import pandas as pd
+
+        if self.sheet_names is not None:
+            return self.sheet_names
+        if zipfile.is_zipfile(self.file_name):
+            with zipfile.ZipFile(self.file_name) as workbook:
+                root = ET.fromstring(workbook.read("xl/workbook.xml"))
+            namespace = root.tag[: root.tag.index("}") + 1]
+            self.sheet_names = [
+                sheet.get("name") for sheet in root.iter(namespace + "sheet")
+            ]
+        else:
+            self.sheet_names = pd.ExcelFile(self.file_name).sheet_names
+        return self.sheet_names
+
+    def get_workbook_hash(self):
+        from spyro_framework.spyro import get_file_hash
+
+        if self.workbook_hash is None:
+            self.workbook_hash = get_file_hash(self.file_name)
+        return self.workbook_hash
+
+    def get_cache_location(self, sheet_name):
+        """get_cache_location.
+
+        Parameters
+        ----------
+        sheet_name : str
+            name of the sheet
+
+        Returns
+        -------
+        str
+            cache path without extension, the name is the hash of the
+            workbook hash, the sheet name and the read arguments
+        """
+        import hashlib
+        import os
+
+        key = hashlib.sha256()
+        key.update(self.get_workbook_hash().encode())
+        key.update(b"\0" + sheet_name.encode())
+        key.update(b"\0" + repr(sorted(self.read_kwargs.items())).encode())
+        return os.path.join(self.cache_dir, key.hexdigest())
+
+    def get_sheet(self, sheet_name):
+        """get_sheet.
+        Returns a parsed sheet from memory, from the cache or, when neither
+        has it, parses it from the workbook and caches it.
+
+        Parameters
+        ----------
+        sheet_name : str
+            name of the sheet
+
+        Returns
+        -------
+        DataFrame
+            sheet as read by pd.read_excel with the read arguments
+        """
+        import pandas as pd
+
+        from spyro_framework.metrics import count, span
+        from spyro_framework.spyro import read_frame_cache, write_frame_cache
+
+        if sheet_name in self.sheets:
+            return self.sheets[sheet_name]
+        if sheet_name not in self.get_sheet_names():
+            raise KeyError(
+                "Sheet {} not found in {}".format(sheet_name, self.file_name)
+            )
+
+        with span("excel_ingestion", sheet_name):
+            cache_location = self.get_cache_location(sheet_name)
+            sheet = read_frame_cache(
+                cache_location, self.file_name, sheet_name
+            )
+            if sheet is None:
+                count("sample_sheets_parsed", case=sheet_name)
+                if self.excel_file is None:
+                    # Opened once for all sheets which are not cached
+                    self.excel_file = pd.ExcelFile(self.file_name)
+                sheet = pd.read_excel(
+                    self.excel_file, sheet_name=sheet_name, **self.read_kwargs
+                )
+                sheet = write_frame_cache(
+                    sheet,
+                    cache_location,
+                    self.file_name,
+                    sheet_name,
+                    source_hash=self.get_workbook_hash(),
+                )
+            else:
+                count("sample_sheets_cached", case=sheet_name)
+        self.sheets[sheet_name] = sheet
+        return sheet
+
+    def iter_samples(self, sheet_names=None):
+        """iter_samples.
+        Yields the samples one by one so that the feed conversion of the
+        first samples can start before the whole workbook is read.
+
+        Parameters
+        ----------
+        sheet_names : list, optional
+            only these sheets, default all sheets
+
+        Yields
+        ------
+        tuple
+            sheet (sample) name and parsed sheet
+        """
+        if sheet_names is None:
+            sheet_names = self.get_sheet_names()
+        for sheet_name in sheet_names:
+            yield sheet_name, self.get_sheet(sheet_name)
+
+    def close(self):
+        if self.excel_file is not None:
+            self.excel_file.close()
+            self.excel_file = None
+
+    def keys(self):
+        return self.get_sheet_names()
+
+    def items(self):
+        return self.iter_samples()
+
+    def __getitem__(self, sheet_name):
+        return self.get_sheet(sheet_name)
+
+    def __iter__(self):
+        return iter(self.get_sheet_names())
+
+    def __len__(self):
+        return len(self.get_sheet_names())
+
+    def __contains__(self, sheet_name):
+        return sheet_name in self.get_sheet_names()
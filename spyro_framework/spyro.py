@@ -1,3 +1,6 @@
+from spyro_framework.metrics import timed
+
+
 class SpyroData:
     def __init__(self, file_name, folder_location, base_folder="base"):
         """Constructor
@@ -34,6 +37,8 @@ class SpyroData:
         self.general_spyro = SpyroGeneralOutput()
         # Create the output container class for firebox
         self.firebox = FireboxData()
+        # Create the output container class for the coil profiles
+        self.coil_profile = CoilProfileData()
         # String where the exe file of Spyro is located
         self.spyro_exe_location = r"C:\Program Files (x86)\Pyrotec\EFPS86"
         # Spyro exe name
@@ -43,12 +48,22 @@ class SpyroData:
             self.spyro_exe_location, self.spyro_exe_name
         )
         # folder name that can be used to copy the .dat file as example
-        self.base_folder = os.path.join(self.folder_location, "base")
+        self.base_folder = os.path.join(self.folder_location, base_folder)
         # specific folder where the file is stored. Same name as the .dat
         # file
         self.file_name_folder = os.path.join(
             self.folder_location, self.file_name
         )
+        # How Pyrotec.ini is put into the case folder, see
+        # set_asset_link_mode
+        self.asset_link_mode = "copy"
+        # Extra .dat parameters on top of the convergence target, see
+        # set_dat_parameters
+        self.dat_parameters = {}
+        # Output of the last Spyro run
+        self.spyro_stdout = ""
+        self.spyro_stderr = ""
+        self.spyro_returncode = None
 
     def get_file_name(self):
         return self.file_name
@@ -59,6 +74,53 @@ class SpyroData:
     def get_folder_location(self):
         return self.folder_location
 
+    def set_folder_location(self, folder_location):
+        import os
+
+        self.folder_location = folder_location
+        self.file_name_folder = os.path.join(
+            self.folder_location, self.file_name
+        )
+
+    def get_base_folder(self):
+        return self.base_folder
+
+    def set_base_folder(self, base_folder):
+        """set_base_folder.
+
+        Parameters
+        ----------
+        base_folder :
+            string with the path of the folder with base.dat and
+            Pyrotec.ini, unlike the constructor not relative to the folder
+            location
+        """
+        self.base_folder = base_folder
+
+    def get_asset_link_mode(self):
+        return self.asset_link_mode
+
+    def set_asset_link_mode(self, asset_link_mode):
+        """set_asset_link_mode.
+
+        Parameters
+        ----------
+        asset_link_mode :
+            string with how write_spyro puts Pyrotec.ini into the case
+            folder: copy (default), hardlink, symlink or auto, see
+            staging.link_asset. A link saves the copy of the file per case
+            on network shares, Pyrotec.ini is not modified by EFPS.
+        """
+        from spyro_framework.staging import ASSET_LINK_MODES
+
+        if asset_link_mode not in ASSET_LINK_MODES:
+            raise ValueError(
+                "asset_link_mode {} is not one of {}".format(
+                    asset_link_mode, ASSET_LINK_MODES
+                )
+            )
+        self.asset_link_mode = asset_link_mode
+
     def set_feed_composition(self, feed_pitagor, feed_converter):
         """set_feed_composition.
 
@@ -75,101 +137,158 @@ class SpyroData:
     def set_file_name(self, file_name):
         self.file_name = file_name
 
-    def set_spyro_exe_location(self, spyro_exe_location):
-        self.spyro_exe_location = spyro_exe_location
+    def get_dat_parameters(self):
+        """get_dat_parameters.
 
-    def change_feed_composition(self, spyro_input_string):
-        """Change feed composition"""
-        import re
+        Returns
+        -------
+        dict
+            all .dat parameters which are changed in the base file for this
+            case: the convergence target and the extra dat_parameters
+        """
+        dat_parameters = self.convergence.get_dat_parameters()
+        dat_parameters.update(self.dat_parameters)
+        return dat_parameters
 
-        feed_replacement_string = self.create_naphtha_line()
-        spyro_input_string = re.sub(
-            "KEYW=&NAME\n[\s\S]*, END",
-            feed_replacement_string,
-            spyro_input_string,
+    def set_dat_parameters(self, dat_parameters):
+        """set_dat_parameters.
+
+        Parameters
+        ----------
+        dat_parameters :
+            dictionary with extra .dat parameters to change in the base file,
+            the key is the parameter name or a (keyword, name) tuple, e.g.
+            {("GEOM", "TUBEL"): 7.0, "STEAM": 1000}
+        """
+        self.dat_parameters = dict(dat_parameters)
+
+    def set_spyro_exe_location(self, spyro_exe_location):
+        import os
+
+        self.spyro_exe_location = spyro_exe_location
+        self.spyro_exe_loc_name = os.path.join(
+            self.spyro_exe_location, self.spyro_exe_name
         )
-        return spyro_input_string
 
-    def change_convergence_target(self, spyro_input_string):
-        import re
+    def set_spyro_exe_name(self, spyro_exe_name):
+        import os
 
-        target = self.convergence.target
-        target_value = self.convergence.target_value
-        spyro_input_string = re.sub(
-            "CONOP=[0-9]",
-            "CONOP={}".format(target),
-            spyro_input_string,
+        self.spyro_exe_name = spyro_exe_name
+        self.spyro_exe_loc_name = os.path.join(
+            self.spyro_exe_location, self.spyro_exe_name
         )
 
-        target_value_keyword = {
-            1: "TEMPO",  # COT
-            2: "CONVAL",  # C3/ethylene ratio
-            3: "CONVAL",  # P/E ratio
-            4: "CONVAL",  # M/P ratio
-            5: "CONVAL",  # Decomposition key component
-            6: "CONVAL",  # total absorbed heat duty
-        }
+    def get_dat_template(self):
+        """get_dat_template.
 
-        if self.convergence.target in [1]:
-            spyro_input_string = re.sub(
-                "{}=[^,]*".format(target_value_keyword[target]),
-                "{}={}".format(target_value_keyword[target], target_value),
-                spyro_input_string,
-            )
-        else:
-            spyro_input_string = re.sub(
-                "{}=[^,]*".format(target_value_keyword[target]),
-                "{}={}".format(target_value_keyword[target], target_value),
-                spyro_input_string,
-            )
+        Returns
+        -------
+        SpyroDatTemplate
+            parsed base .dat file, shared by all cases with the same base
+            folder
+        """
+        import os
+
+        from spyro_framework.template import load_dat_template
 
-        return spyro_input_string
+        return load_dat_template(os.path.join(self.base_folder, "base.dat"))
 
+    @timed("write_dat", case_arg="self")
     def write_spyro(self):
         import os
-        import re
-        import shutil
 
-        # Change to current working directory
-        cwd = os.getcwd()
+        from spyro_framework.staging import link_asset
 
-        # copy the example file in the folder location with new folder and name
-        src = os.path.join(self.base_folder, "base.dat")
+        # Render the case from the parsed base file straight into the new
+        # folder with the same name
         src_pyro_ini = os.path.join(self.base_folder, "Pyrotec.ini")
         dst = os.path.join(
             self.file_name_folder, "{}.dat".format(self.get_file_name())
         )
         # Create destination folder
-        if not os.path.exists(self.file_name_folder):
-            os.mkdir(self.file_name_folder)
-        shutil.copy2(src, dst)
-        shutil.copy(src_pyro_ini, self.file_name_folder)
-        os.chdir(self.file_name_folder)
-
-        # find the keywords to change with the data in self
-        file_to_change = open("{}.dat".format(self.get_file_name()), "r")
-        f_str = file_to_change.read()
-        # Modify feed composition part
-        f_str = self.change_feed_composition(f_str)
-        # Modify conversion target
-        f_str = self.change_convergence_target(f_str)
-        # Close the reading file
-        file_to_change.close()
-
-        # overwrite the base file with the new feed line
-        file_changed = open("{}.dat".format(self.get_file_name()), "w")
-        file_changed.write(f_str)
-        # close the newly file copied from the example file
-        file_changed.close()
+        os.makedirs(self.file_name_folder, exist_ok=True)
+        link_asset(
+            src_pyro_ini,
+            os.path.join(self.file_name_folder, "Pyrotec.ini"),
+            self.asset_link_mode,
+        )
+
+        # Modify feed composition and conversion target in a single write
+        self.get_dat_template().write(
+            dst,
+            parameters=self.get_dat_parameters(),
+            feed_composition=self.feed_composition.get_feed_comp(),
+        )
         print(
             "spyro files created in folder: {}".format(self.file_name_folder)
         )
 
-        os.chdir(cwd)
+    @timed("render_dat", case_arg="self")
+    def render_spyro(self):
+        """render_spyro.
+        Applies the feed composition and convergence target to the base .dat
+        file without writing anything to disk.
+
+        Returns
+        -------
+        f_str
+            String with the content of the .dat file of this case
+        """
+        return self.get_dat_template().render(
+            parameters=self.get_dat_parameters(),
+            feed_composition=self.feed_composition.get_feed_comp(),
+        )
+
+    @timed("harvest", case_arg="self")
+    def read_spyro_output(self, verbose=False, warn=True):
+        """read_spyro_output.
+        Reads the effluent, general, firebox and coil profile output of the
+        case from a single scan of the .eof file.
 
-    def read_spyro_output(self):
-        self.effluent_composition.read_effluent(self.get_file_name())
+        Parameters
+        ----------
+        verbose :
+            boolean to indicate whether to print the parsed output or not.
+        warn :
+            boolean to indicate whether to print a warning for a missing
+            [FIREBOX] section, see FireboxData.read_firebox.
 
+        Returns
+        -------
+        eof_document
+            EofDocument with the indexed sections of the .eof file
+        """
+        eof_document = EofDocument(
+            self.get_folder_location(), self.get_file_name()
+        )
+        self.effluent_composition.read_effluent(
+            self.get_folder_location(),
+            self.get_file_name(),
+            verbose=verbose,
+            eof_document=eof_document,
+        )
+        self.general_spyro.read_general(
+            self.get_folder_location(),
+            self.get_file_name(),
+            verbose=verbose,
+            eof_document=eof_document,
+        )
+        self.firebox.read_firebox(
+            self.get_folder_location(),
+            self.get_file_name(),
+            verbose=verbose,
+            eof_document=eof_document,
+            warn=warn,
+        )
+        self.coil_profile.read_profiles(
+            self.get_folder_location(),
+            self.get_file_name(),
+            verbose=verbose,
+            eof_document=eof_document,
+        )
+        return eof_document
+
+    @timed("efps_run", case_arg="self")
     def run_spyro(self, verbose=True):
         """run_spyro.
         Runs Spyro EFPS in the self.folder_location
@@ -179,24 +298,36 @@ class SpyroData:
         verbose :
             boolean to indicate whether to print the spyro output and errors
             or not.
+
+        Returns
+        -------
+        returncode
+            integer with the exit code of the Spyro process
         """
         import os
         import subprocess
 
-        cwd = os.getcwd()
-        os.chdir(os.path.join(self.folder_location, self.file_name))
+        # The case folder is passed as working directory of the process
+        # instead of changing the working directory of the whole python
+        # process, this allows running several cases in parallel.
         process = subprocess.Popen(
             [self.spyro_exe_loc_name, self.file_name + ".dat"],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            cwd=os.path.join(self.folder_location, self.file_name),
             #     executable=True,
         )
         stdout, stderr = process.communicate()
+        self.spyro_stdout = stdout.decode()
+        self.spyro_stderr = stderr.decode()
+        self.spyro_returncode = process.returncode
         if verbose:
-            print(stdout.decode())
-            print(stderr.decode())
-        os.chdir(cwd)
+            print(self.spyro_stdout)
+            print(self.spyro_stderr)
 
+        return self.spyro_returncode
+
+    @timed("naphtha_line", case_arg="self")
     def create_naphtha_line(self, ecf_dat="dat"):
         """create_naphtha_line.
 
@@ -254,6 +385,28 @@ class Convergence:
         """
         self.target = 5  # represent COT convergence criteria
         self.target_value = 1.2
+        # .dat keyword which holds the target value for each target
+        self.target_value_keyword = {
+            1: "TEMPO",  # COT
+            2: "CONVAL",  # C3/ethylene ratio
+            3: "CONVAL",  # P/E ratio
+            4: "CONVAL",  # M/P ratio
+            5: "CONVAL",  # Decomposition key component
+            6: "CONVAL",  # total absorbed heat duty
+        }
+
+    def get_dat_parameters(self):
+        """get_dat_parameters.
+
+        Returns
+        -------
+        dict
+            .dat parameter names and values for the convergence target
+        """
+        return {
+            "CONOP": self.target,
+            self.target_value_keyword[self.target]: self.target_value,
+        }
 
 
 class FeedComposition:
@@ -305,6 +458,17 @@ class FeedComposition:
     def get_piona_error(self):
         return self.piona_total_error
 
+    def set_feed_comp_wt(self, feed_comp_wt):
+        """set_feed_comp_wt.
+
+        Parameters
+        ----------
+        feed_comp_wt :
+            Series with Spyro names as index and weight percent, e.g. one
+            sample of FeedCompositionBatch.get_feed_comp
+        """
+        self.feed_comp_wt = feed_comp_wt
+
     def set_feed_composition(self, feed_pitagor, feed_converter):
         """
         Parameters
@@ -318,6 +482,7 @@ class FeedComposition:
         self.translator_df = feed_converter
         self.feed_composition_df = feed_pitagor
 
+    @timed("piona_check")
     def piona_processor(self):
         import pandas as pd
 
@@ -396,6 +561,7 @@ class FeedComposition:
             "The total PIONA error is {:.2f} %".format(self.piona_total_error)
         )
 
+    @timed("feed_conversion")
     def transform_naphtha_feed(
         self,
         # naphtha_dataframe,
@@ -473,6 +639,672 @@ class FeedComposition:
         return self.get_feed_comp()
 
 
+class FeedCompositionBatch:
+    def __init__(self):
+        """Constructor
+
+        Batch counterpart of FeedComposition which converts many lab samples
+        at once into one samples x SPYRO component matrix.
+
+        Objects
+        -------
+        feed_comp_wt :
+            DataFrame with the sample names as index and the SPYRO component
+            names as columns, components which were not analysed are 0
+        feed_comp_present :
+            boolean DataFrame indicating which components were analysed
+        total_sum :
+            Series with the sum of the weight based components per sample
+        sum_check :
+            Series with ok, warning (>= 1 % off) or error (>= 2 % off) per
+            sample
+        df_piona :
+            DataFrame with the calculated and analysed PIONA composition, the
+            total error and the check result (ok, warning or error) per
+            sample
+        """
+        import numpy as np
+        import pandas as pd
+
+        self.translator_df = pd.DataFrame()
+        self.feed_compositions = {}
+        # Lab name -> integer column of the component matrix
+        self.lab_names = pd.Index([])
+        self.lab_columns = []
+        self.spyro_components = []
+        self.feed_comp_wt = pd.DataFrame()
+        self.feed_comp_present = pd.DataFrame()
+        self.total_sum = pd.Series(dtype="float64")
+        self.sum_check = pd.Series(dtype="object")
+        # Weight based lab analysis of all samples in long format
+        self.lab_sample_rows = np.array([], dtype=int)
+        self.lab_descriptions = pd.Index([])
+        self.lab_values = np.array([])
+        # PIONA classes and the lab names of the analysed totals
+        self.piona_classes = ["P", "I", "O", "N", "A"]
+        self.piona_lab_names = {
+            "P": "Totaal n-paraffinen(gew)",
+            "I": "Totaal iso-paraffinen(gew)",
+            "O": "Totaal olefinen(gew)",
+            "A": "Totaal aromaten(gew)",
+        }
+        self.df_piona = pd.DataFrame()
+
+    def get_feed_comp(self, feed_name=None):
+        """get_feed_comp.
+
+        Parameters
+        ----------
+        feed_name :
+            string with the sample name, default None returns all samples
+
+        Returns
+        -------
+        DataFrame or Series
+            component matrix or the analysed components of one sample
+        """
+        if feed_name is None:
+            return self.feed_comp_wt
+        present = self.feed_comp_present.loc[feed_name]
+        return self.feed_comp_wt.loc[feed_name, present.to_numpy()]
+
+    def get_total_sum(self):
+        return self.total_sum
+
+    def get_sum_check(self):
+        return self.sum_check
+
+    def get_df_piona(self):
+        return self.df_piona
+
+    def set_feed_compositions(self, feed_pitagor, feed_converter):
+        """set_feed_compositions.
+
+        Parameters
+        ----------
+        feed_pitagor :
+            dictionary with the sample name as key and the naphtha dataframe
+            read from Pitagor excel output as value, e.g. the output of
+            pd.read_excel(..., sheet_name=None)
+        feed_converter :
+            naphtha converter dataframe file
+            to transform lab data name to SPYRO names
+        """
+        self.feed_compositions = dict(feed_pitagor)
+        self.set_feed_translator(feed_converter)
+
+    def set_feed_translator(self, feed_converter):
+        """set_feed_translator.
+        Precomputes the lab name -> SPYRO component column mapping once for
+        all samples. Lab names which translate to no SPYRO name get -1.
+
+        Parameters
+        ----------
+        feed_converter :
+            naphtha converter dataframe file
+            to transform lab data name to SPYRO names
+        """
+        import pandas as pd
+
+        self.translator_df = feed_converter
+        # The last entry wins for duplicated lab names, as in
+        # FeedComposition.transform_naphtha_feed
+        spyro_names = feed_converter["Spyro_name"]
+        spyro_names = spyro_names[~spyro_names.index.duplicated(keep="last")]
+        self.lab_names = pd.Index(spyro_names.index)
+        self.spyro_components = list(spyro_names.dropna().unique())
+        component_column = {
+            name: i for i, name in enumerate(self.spyro_components)
+        }
+        self.lab_columns = [
+            component_column.get(name, -1) if pd.notnull(name) else -1
+            for name in spyro_names
+        ]
+
+    @timed("feed_conversion_batch")
+    def transform_naphtha_feeds(self, log=False, normalize=True):
+        """transform_naphtha_feeds.
+        Vectorized version of FeedComposition.transform_naphtha_feed for all
+        samples at once. Weight based lab components are translated with
+        the precomputed mapping, values below the detection limit count as
+        0 and components mapped on the same SPYRO name are summed. Lab names
+        which are not in the converter are kept with their lab name, like
+        in the single sample transformation.
+
+        Parameters
+        ----------
+        log :
+            boolean for printing log output
+        normalize :
+            boolean to normalize the naphtha feed data or not
+
+        Returns
+        -------
+        feed_comp_wt
+            DataFrame with samples as index and SPYRO components as columns
+        """
+        import numpy as np
+        import pandas as pd
+
+        feed_names = list(self.feed_compositions)
+        descriptions = []
+        values = []
+        for feed_name in feed_names:
+            feed_composition_df = self.feed_compositions[feed_name]
+            mask_wt = (
+                feed_composition_df["UNITÉ DE MESURE"] == "PCT_GEW"
+            ).to_numpy()
+            descriptions.append(
+                feed_composition_df["DESCRIPTION COMPOSANT"].to_numpy()[
+                    mask_wt
+                ]
+            )
+            values.append(feed_composition_df["VALEUR"].to_numpy()[mask_wt])
+        sample_rows = np.repeat(
+            np.arange(len(feed_names)), [len(d) for d in descriptions]
+        )
+        descriptions = pd.Index(
+            np.concatenate(descriptions) if descriptions else []
+        )
+        values = (
+            pd.to_numeric(
+                pd.Series(np.concatenate(values) if values else []),
+                errors="coerce",
+            )
+            .fillna(0)
+            .to_numpy(dtype="float64")
+        )
+
+        # Translate lab names to component columns in one lookup
+        lab_rows = self.lab_names.get_indexer(descriptions)
+        lab_columns = np.append(np.asarray(self.lab_columns, dtype=int), -1)
+        columns = lab_columns[lab_rows]
+        spyro_components = list(self.spyro_components)
+        unknown = (lab_rows == -1) & descriptions.notna()
+        if unknown.any():
+            unknown_names = list(descriptions[unknown].unique())
+            unknown_index = pd.Index(unknown_names)
+            columns[unknown] = len(spyro_components) + (
+                unknown_index.get_indexer(descriptions[unknown])
+            )
+            spyro_components += unknown_names
+            if log:
+                print(
+                    "lab components not in the converter file: {}".format(
+                        unknown_names
+                    )
+                )
+        keep = columns >= 0
+
+        feed_comp = np.zeros((len(feed_names), len(spyro_components)))
+        present = np.zeros(feed_comp.shape, dtype=bool)
+        np.add.at(feed_comp, (sample_rows[keep], columns[keep]), values[keep])
+        present[sample_rows[keep], columns[keep]] = True
+
+        # Sum check and normalization column-wise for all samples
+        total_sum = feed_comp.sum(axis=1)
+        deviation = np.abs(total_sum - 100)
+        sum_check = np.where(
+            deviation >= 2, "error", np.where(deviation >= 1, "warning", "ok")
+        )
+        if normalize:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                feed_comp = feed_comp / total_sum[:, np.newaxis] * 100
+            if log:
+                print("feeds normalized")
+
+        self.feed_comp_wt = pd.DataFrame(
+            feed_comp, index=feed_names, columns=spyro_components
+        )
+        self.feed_comp_present = pd.DataFrame(
+            present, index=feed_names, columns=spyro_components
+        )
+        self.total_sum = pd.Series(total_sum, index=feed_names)
+        self.sum_check = pd.Series(sum_check, index=feed_names)
+        self.lab_sample_rows = sample_rows
+        self.lab_descriptions = descriptions
+        self.lab_values = values
+
+        if log:
+            print(
+                "{} samples transformed, {} with a warning, {} with an "
+                "error".format(
+                    len(feed_names),
+                    (sum_check == "warning").sum(),
+                    (sum_check == "error").sum(),
+                )
+            )
+
+        return self.get_feed_comp()
+
+    def get_piona_matrix(self):
+        """get_piona_matrix.
+
+        Returns
+        -------
+        np.ndarray
+            component x PIONA class matrix with a 1 for the PIONA class of
+            every SPYRO component of feed_comp_wt, components without a
+            PIONA class in the converter have only zeros
+        """
+        import numpy as np
+        import pandas as pd
+
+        naphtha_piona_converter = self.translator_df.set_index("Spyro_name")
+        # Remove duplicate indices and take only the PIONA column
+        naphtha_piona_converter = naphtha_piona_converter.loc[
+            ~naphtha_piona_converter.index.duplicated(keep="first")
+        ]["PIONA"]
+        component_piona = naphtha_piona_converter.reindex(
+            self.feed_comp_wt.columns
+        )
+        class_rows = pd.Index(self.piona_classes).get_indexer(component_piona)
+        piona_matrix = np.zeros(
+            (len(self.feed_comp_wt.columns), len(self.piona_classes))
+        )
+        known = class_rows >= 0
+        piona_matrix[np.flatnonzero(known), class_rows[known]] = 1
+
+        return piona_matrix
+
+    @timed("piona_check_batch")
+    def piona_processor(self):
+        """piona_processor.
+        Vectorized version of FeedComposition.piona_processor for all
+        samples. The calculated PIONA composition is the matrix product of
+        the component matrix with the component x PIONA class matrix, the
+        analysed naphthenes are 100 minus the other analysed classes.
+
+        Returns
+        -------
+        df_piona
+            DataFrame with samples as index and the calculated and analysed
+            PIONA classes, the difference, the total error and the check
+            result as columns
+        """
+        import numpy as np
+        import pandas as pd
+
+        feed_names = list(self.feed_comp_wt.index)
+        calculated = self.feed_comp_wt.to_numpy() @ self.get_piona_matrix()
+
+        # Analysed PIONA totals from the lab data in one scatter
+        analysed = np.zeros((len(feed_names), len(self.piona_classes)))
+        analysed_names = [
+            self.piona_lab_names.get(piona_class)
+            for piona_class in self.piona_classes
+        ]
+        class_rows = pd.Index(analysed_names).get_indexer(
+            self.lab_descriptions
+        )
+        found = class_rows >= 0
+        np.add.at(
+            analysed,
+            (self.lab_sample_rows[found], class_rows[found]),
+            self.lab_values[found],
+        )
+        # The total amount of naphthenes is not given in the lab data so a
+        # subtraction of the total is used.
+        naphthene_column = self.piona_classes.index("N")
+        analysed[:, naphthene_column] = 100 - np.delete(
+            analysed, naphthene_column, axis=1
+        ).sum(axis=1)
+
+        calculated = np.round(calculated, 2)
+        analysed = np.round(analysed, 2)
+        difference = np.abs(calculated - analysed)
+        total_error = difference.sum(axis=1)
+
+        df_piona = {}
+        for i, piona_class in enumerate(self.piona_classes):
+            df_piona["{} calculated".format(piona_class)] = calculated[:, i]
+            df_piona["{} analysed".format(piona_class)] = analysed[:, i]
+            df_piona["{} difference".format(piona_class)] = difference[:, i]
+        df_piona["total error"] = total_error
+        df_piona["check"] = np.where(
+            total_error > 2.0,
+            "error",
+            np.where(total_error > 1.0, "warning", "ok"),
+        )
+        self.df_piona = pd.DataFrame(df_piona, index=feed_names)
+
+        return self.df_piona
+
+
+class EofDocument:
+    @timed("read_eof", case_arg="file_name")
+    def __init__(self, folder_location, file_name):
+        """Constructor
+
+        Reads the Spyro .eof output file once and indexes all
+        [SECTION] ... [SECTION END] blocks so that the effluent, general and
+        firebox readers can take their part without scanning the file again.
+
+        Parameters
+        ----------
+        folder_location : str
+            The folder location where the case folder is located.
+        file_name : str
+            The name of the Spyro case (folder and file name).
+
+        Objects
+        -------
+        text :
+            string with the complete content of the .eof file
+        section_index :
+            dictionary with the section name as key and a list of
+            (header_start, body_start, body_end) positions in text
+        """
+        import os
+
+        self.folder_file_name = os.path.join(
+            os.path.join(folder_location, file_name),
+            "{}.eof".format(file_name),
+        )
+        with open(self.folder_file_name, "r") as output_file:
+            self.text = output_file.read()
+        self.section_index = self.index_sections(self.text)
+
+    @staticmethod
+    def index_sections(text):
+        """index_sections.
+
+        Parameters
+        ----------
+        text : str
+            Content of a Spyro .eof file.
+
+        Returns
+        -------
+        dict
+            Section name as key and a list of (header_start, body_start,
+            body_end) tuples in order of appearance. Sections without an
+            END marker are closed by the END marker of their parent or by the
+            end of the text.
+        """
+        import re
+
+        # Header lines such as "[EFFLUENT]" or "[EFFLUENT END]"
+        header_pattern = re.compile(r"^[ \t]*\[([^\]\r\n]+)\][^\n]*\n?", re.M)
+
+        section_index = {}
+        open_sections = []
+        for match in header_pattern.finditer(text):
+            name = match.group(1).strip()
+            if name.endswith(" END"):
+                name = name[:-4]
+                open_names = [section[0] for section in open_sections]
+                if name not in open_names:
+                    continue
+                while open_sections:
+                    open_name, header_start, body_start = open_sections.pop()
+                    section_index.setdefault(open_name, []).append(
+                        (header_start, body_start, match.start())
+                    )
+                    if open_name == name:
+                        break
+            else:
+                open_sections.append((name, match.start(), match.end()))
+
+        while open_sections:
+            open_name, header_start, body_start = open_sections.pop()
+            section_index.setdefault(open_name, []).append(
+                (header_start, body_start, len(text))
+            )
+        # Closing nested sections appends the inner ones first, restore the
+        # order of appearance in the file
+        for spans in section_index.values():
+            spans.sort()
+
+        return section_index
+
+    def has_section(self, name):
+        return name in self.section_index
+
+    def get_section_names(self):
+        return list(self.section_index)
+
+    def get_section_count(self, name):
+        return len(self.section_index.get(name, []))
+
+    def get_sections(self, name, within=None, within_occurrence=0):
+        """get_sections.
+
+        Parameters
+        ----------
+        name : str
+            Section name without brackets, e.g. EFFLUENT
+        within : str, optional
+            Only return sections nested in a section with this name
+        within_occurrence : int
+            Which occurrence of within, default the first one (0), -1 for
+            the last one, e.g. the last simulated day of [SPYRO]
+
+        Returns
+        -------
+        list
+            Body text of all matching sections in order of appearance
+        """
+        spans = self.section_index.get(name, [])
+        if within is not None:
+            if not self.has_section(within):
+                return []
+            _, parent_start, parent_end = self.section_index[within][
+                within_occurrence
+            ]
+            spans = [
+                span
+                for span in spans
+                if span[0] >= parent_start and span[2] <= parent_end
+            ]
+        return [self.text[start:end] for _, start, end in spans]
+
+    def get_section(self, name, occurrence=-1, within=None):
+        """get_section.
+
+        Parameters
+        ----------
+        name : str
+            Section name without brackets, e.g. EFFLUENT
+        occurrence : int
+            Which occurrence to return, default the last one (-1) which
+            corresponds to the last simulated day.
+        within : str, optional
+            Only consider sections nested in the first section with this name
+
+        Returns
+        -------
+        str or None
+            Body text of the section, None if the section is not present
+        """
+        sections = self.get_sections(name, within=within)
+        if not sections:
+            return None
+        return sections[occurrence]
+
+
+class EofSectionReader:
+    def __init__(self, folder_location, file_name):
+        """Constructor
+
+        Memory maps the Spyro .eof output file instead of reading it. A
+        section is located by searching backwards from the end of the file
+        (the last occurrence, i.e. the last simulated day, is at the end) or
+        forwards from the start, and only its body is decoded. The memory
+        per case stays flat for large firebox and long coil files and the
+        time is dominated by the sections which are read, not by the file
+        size. Has the same interface as EofDocument, lookups which need the
+        complete index (e.g. get_sections) fall back to an EofDocument.
+
+        Parameters
+        ----------
+        folder_location : str
+            The folder location where the case folder is located.
+        file_name : str
+            The name of the Spyro case (folder and file name).
+
+        Objects
+        -------
+        buffer :
+            mmap of the .eof file (bytes for an empty file)
+        eof_document :
+            EofDocument which is only created for the fallback lookups
+        """
+        import mmap
+        import os
+
+        self.folder_location = folder_location
+        self.file_name = file_name
+        self.folder_file_name = os.path.join(
+            os.path.join(folder_location, file_name),
+            "{}.eof".format(file_name),
+        )
+        self.eof_document = None
+        with open(self.folder_file_name, "rb") as output_file:
+            if os.fstat(output_file.fileno()).st_size:
+                self.buffer = mmap.mmap(
+                    output_file.fileno(), 0, access=mmap.ACCESS_READ
+                )
+            else:
+                self.buffer = b""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if not isinstance(self.buffer, bytes):
+            self.buffer.close()
+        self.buffer = b""
+
+    def get_document(self):
+        if self.eof_document is None:
+            self.eof_document = EofDocument(
+                self.folder_location, self.file_name
+            )
+        return self.eof_document
+
+    def is_header(self, position):
+        """True if only white space precedes position on its line."""
+        line_start = self.buffer.rfind(b"\n", 0, position) + 1
+        return not self.buffer[line_start:position].strip()
+
+    def find_header(self, header, start, end, reverse):
+        """Position of the first or last header line in [start, end)."""
+        while start < end:
+            if reverse:
+                position = self.buffer.rfind(header, start, end)
+            else:
+                position = self.buffer.find(header, start, end)
+            if position < 0 or self.is_header(position):
+                return position
+            if reverse:
+                end = position
+            else:
+                start = position + 1
+        return -1
+
+    def find_section(self, name, occurrence=-1, within=None):
+        """find_section.
+
+        Parameters
+        ----------
+        name : str
+            Section name without brackets, e.g. EFFLUENT
+        occurrence : int
+            0 for the first or -1 for the last occurrence
+        within : str, optional
+            Only consider sections nested in the first section with this name
+
+        Returns
+        -------
+        tuple or None
+            (body_start, body_end) positions in buffer, None if the section
+            is not present. Raises LookupError if the section can not be
+            located without indexing the complete file, e.g. because its END
+            marker is missing.
+        """
+        if occurrence not in [0, -1]:
+            raise LookupError(name)
+        start, end = 0, len(self.buffer)
+        if within is not None:
+            parent = self.find_section(within, occurrence=0)
+            if parent is None:
+                return None
+            start, end = parent
+
+        name = name.encode()
+        header_start = self.find_header(
+            b"[" + name + b"]", start, end, reverse=occurrence == -1
+        )
+        if header_start < 0:
+            return None
+        body_start = self.buffer.find(b"\n", header_start, end)
+        body_start = end if body_start < 0 else body_start + 1
+        body_end = self.find_header(
+            b"[" + name + b" END]", body_start, end, reverse=False
+        )
+        if (
+            body_end < 0
+            or self.buffer.find(b"[" + name + b"]", body_start, body_end) >= 0
+        ):
+            # Not closed by its own END marker
+            raise LookupError(name)
+        # Same body as EofDocument, up to the start of the END line
+        line_start = self.buffer.rfind(b"\n", body_start, body_end) + 1
+        return body_start, max(line_start, body_start)
+
+    def has_section(self, name):
+        return (
+            self.find_header(
+                b"[" + name.encode() + b"]", 0, len(self.buffer), reverse=True
+            )
+            >= 0
+        )
+
+    def get_section_names(self):
+        return self.get_document().get_section_names()
+
+    def get_section_count(self, name):
+        return self.get_document().get_section_count(name)
+
+    def get_sections(self, name, within=None, within_occurrence=0):
+        """Body text of all matching sections, see EofDocument."""
+        return self.get_document().get_sections(
+            name, within=within, within_occurrence=within_occurrence
+        )
+
+    def get_section(self, name, occurrence=-1, within=None):
+        """get_section.
+
+        Parameters
+        ----------
+        name : str
+            Section name without brackets, e.g. EFFLUENT
+        occurrence : int
+            Which occurrence to return, default the last one (-1) which
+            corresponds to the last simulated day.
+        within : str, optional
+            Only consider sections nested in the first section with this name
+
+        Returns
+        -------
+        str or None
+            Body text of the section, None if the section is not present
+        """
+        try:
+            span = self.find_section(name, occurrence, within)
+        except LookupError:
+            return self.get_document().get_section(name, occurrence, within)
+        if span is None:
+            return None
+        # Universal newlines like the text mode read of EofDocument
+        section = self.buffer[span[0] : span[1]].decode()
+        return section.replace("\r\n", "\n").replace("\r", "\n")
+
+
 class EffluentComposition:
     def __init__(self):
         self.effluent = {}
@@ -488,30 +1320,60 @@ class EffluentComposition:
         ]
         for effluent_sublist in effluent_list:
             self.effluent[effluent_sublist] = {}
+        # Effluent with the original Spyro names (WC2H4, VC2H4, ...)
+        self.effluent_raw = {}
 
-    def read_effluent(self, folder_location, file_name, verbose=False):
-        import os
+    def get_effluent_raw(self):
+        return self.effluent_raw
+
+    @timed("read_effluent", case_arg="file_name")
+    def read_effluent(
+        self, folder_location, file_name, verbose=False, eof_document=None
+    ):
+        """read_effluent.
+
+        Parameters
+        ----------
+        folder_location : str
+            The folder location where the Spyro output file is located.
+        file_name : str
+            The name of the Spyro output file.
+        verbose : bool, optional
+            Whether to print verbose output, by default False.
+        eof_document : EofDocument or EofSectionReader, optional
+            Already indexed .eof file, avoids reading the file again when
+            several readers are applied to the same case. By default only
+            the needed section is read with an EofSectionReader.
+
+        Raises
+        ------
+        ValueError
+            If the file has no [EFFLUENT] section.
+        """
+        import contextlib
         import re
 
         import pandas as pd
 
-        effl_df = 0
-        folder_file_name = os.path.join(
-            os.path.join(folder_location, file_name),
-            "{}.eof".format(file_name),
-        )
-        with open(folder_file_name, "r") as output_file:
-            f_str = output_file.read()
-            effl_start_semi = f_str.rfind("[EFFLUENT]")
-            effl_start = f_str.find(" ", effl_start_semi)
-            effl_end = f_str.rfind("[EFFLUENT END]")
-            effl_str = f_str[effl_start + 1 : effl_end]
-            if verbose:
-                print(effl_str)
-            d = re.findall(r"([^\s]+)\s([0-9\.]+)", effl_str)
-            effl_df = pd.DataFrame(d, columns=["Component", "Value"])
-            effl_df = effl_df.set_index("Component")
-            effl_df["Value"].astype("float64")
+        if eof_document is None:
+            eof_context = EofSectionReader(folder_location, file_name)
+        else:
+            eof_context = contextlib.nullcontext(eof_document)
+        # A reader of our own is closed right away, an open mapping keeps
+        # EFPS from rewriting the .eof on Windows
+        with eof_context as eof_document:
+            effl_str = eof_document.get_section("EFFLUENT")
+
+        if effl_str is None:
+            raise ValueError(
+                "[EFFLUENT] section not found in {}.eof".format(file_name)
+            )
+        if verbose:
+            print(effl_str)
+        d = re.findall(r"([^\s]+)\s([0-9\.]+)", effl_str)
+        effl_df = pd.DataFrame(d, columns=["Component", "Value"])
+        effl_df = effl_df.set_index("Component")
+        self.effluent_raw = effl_df["Value"].astype("float64")
 
         for component in effl_df.index:
             if component[0] == "W":
@@ -563,7 +1425,10 @@ class EffluentComposition:
             print("Effluent succesfully read from Spyro output file")
 
 
-def read_naphtha_spyro_converter(file_name, log=False):
+@timed("converter_ingestion")
+def read_naphtha_spyro_converter(
+    file_name, log=False, processing_dir="processing_files"
+):
     """read_naphtha_spyro_converter.
 
     Parameters
@@ -572,6 +1437,9 @@ def read_naphtha_spyro_converter(file_name, log=False):
         string which indicates the excel file name for the converter file
     log :
         boolean for printing log output
+    processing_dir :
+        string with the folder where the converter is cached,
+        default: processing_files
 
     Returns
     -------
@@ -579,46 +1447,226 @@ def read_naphtha_spyro_converter(file_name, log=False):
         DataFrame with lab names and SPYRO names
     """
     import os
-    import pickle
 
     import pandas as pd
 
-    # Store the spyro converter file in a python pickle format for faster
-    # reading
-    processing_dir = ".\\processing_files"
-    converter_file_str_name = "converter_file.pkl"
-    converter_file_location = processing_dir + "\\" + converter_file_str_name
-    if not os.path.isdir(processing_dir):
-        os.mkdir(processing_dir)
-    else:
-        if os.path.isfile(converter_file_location):
-            pickle.load(open(converter_file_location, "rb"))
+    # Store the spyro converter file in a binary format for faster reading.
+    # The cache is only used as long as the excel file did not change.
+    converter_file_location = os.path.join(processing_dir, "converter_file")
+    nafta_converter = read_frame_cache(
+        converter_file_location, file_name, "Detailed_comp"
+    )
+    if nafta_converter is not None:
+        if log:
+            print("read converter from cache")
+        return nafta_converter
 
     if log:
         print("read converter")
-    # TODO Add checks if the file exists and has the correct attributes
     nafta_converter = pd.read_excel(
         file_name, sheet_name="Detailed_comp"
     ).set_index("Lab_name")
     if log:
         print(nafta_converter)
 
-    pickle.dump(nafta_converter, open(converter_file_location, "wb"))
+    nafta_converter = write_frame_cache(
+        nafta_converter, converter_file_location, file_name, "Detailed_comp"
+    )
     print("Converter file saved.")
 
     return nafta_converter
 
 
+def get_file_hash(file_name):
+    """get_file_hash.
+
+    Parameters
+    ----------
+    file_name :
+        string with the file to hash
+
+    Returns
+    -------
+    str
+        sha256 hex digest of the file content
+    """
+    import hashlib
+
+    file_hash = hashlib.sha256()
+    with open(file_name, "rb") as hash_file:
+        for chunk in iter(lambda: hash_file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def read_frame_cache(cache_location, source_file, source_part=None):
+    """read_frame_cache.
+    Returns a cached DataFrame if the source file did not change since the
+    cache was written. The size has to match, the modification time is
+    checked first and only when it differs the content hash is compared.
+
+    Parameters
+    ----------
+    cache_location :
+        string with the cache path without extension
+    source_file :
+        string with the file the DataFrame was read from
+    source_part :
+        string identifying the part of the source file, e.g. the sheet name
+
+    Returns
+    -------
+    DataFrame or None
+        cached DataFrame, None if there is no valid cache
+    """
+    import json
+    import os
+
+    import pandas as pd
+
+    meta_location = cache_location + ".json"
+    if not os.path.isfile(meta_location) or not os.path.isfile(source_file):
+        return None
+    with open(meta_location, "r") as meta_file:
+        meta = json.load(meta_file)
+
+    stat = os.stat(source_file)
+    if (
+        meta.get("source") != os.path.basename(source_file)
+        or meta.get("source_part") != source_part
+        or meta.get("size") != stat.st_size
+    ):
+        return None
+    if meta.get("mtime_ns") != stat.st_mtime_ns:
+        if meta.get("sha256") != get_file_hash(source_file):
+            return None
+        # Only the modification time changed, e.g. after a copy
+        meta["mtime_ns"] = stat.st_mtime_ns
+        with open(meta_location, "w") as meta_file:
+            json.dump(meta, meta_file)
+
+    data_location = cache_location + "." + meta["format"]
+    if not os.path.isfile(data_location):
+        return None
+    if meta["format"] == "parquet":
+        return pd.read_parquet(data_location)
+    return pd.read_pickle(data_location)
+
+
+def write_frame_cache(
+    frame, cache_location, source_file, source_part=None, source_hash=None
+):
+    """write_frame_cache.
+    Stores a DataFrame in parquet format (pickle when pyarrow is not
+    available) together with the size, modification time and hash of the
+    source file. Values of object columns with mixed types, e.g. the numeric
+    lab descriptions of the converter, are stored as strings.
+
+    Parameters
+    ----------
+    frame :
+        DataFrame to store
+    cache_location :
+        string with the cache path without extension
+    source_file :
+        string with the file the DataFrame was read from
+    source_part :
+        string identifying the part of the source file, e.g. the sheet name
+    source_hash :
+        string with the sha256 of source_file if already known
+
+    Returns
+    -------
+    DataFrame
+        frame as stored, equal to what read_frame_cache returns
+    """
+    import json
+    import os
+
+    cache_dir = os.path.dirname(cache_location)
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+
+    # Parquet columns have a single type
+    frame = frame.copy()
+    for column in frame.columns[frame.dtypes == object]:
+        present = frame[column].notna()
+        frame.loc[present, column] = frame.loc[present, column].astype(str)
+
+    try:
+        frame.to_parquet(cache_location + ".parquet")
+        cache_format = "parquet"
+    except (ImportError, TypeError, ValueError):
+        if os.path.isfile(cache_location + ".parquet"):
+            os.remove(cache_location + ".parquet")
+        frame.to_pickle(cache_location + ".pkl")
+        cache_format = "pkl"
+
+    stat = os.stat(source_file)
+    meta = {
+        "source": os.path.basename(source_file),
+        "source_part": source_part,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": source_hash or get_file_hash(source_file),
+        "format": cache_format,
+    }
+    with open(cache_location + ".json", "w") as meta_file:
+        json.dump(meta, meta_file)
+
+    return frame
+
+
+# Descriptive names of the original SPYROGENERAL parameter names
+GENERAL_COLUMN_MAPPING = {
+    "CIT": "Coil inlet temperature [°C]",
+    "TXADIA": "Outlet temperature at measuring point [°C]",
+    # "SURINS": "Transferline volume outlet temperature [°C]",
+    "TMT": "Tube no. TMT",
+    "MAXSKIN": "Maximum skin temperature [°C]",
+    "COKRATE": "Coking rate at location of max TMT [mm/month]",
+    "INLETP": "Coil inlet pressure [kgf/cm²]",
+    "PRESSDR": "Pressure drop [kgf/cm²]",
+    "OUTLETP": "Coil outlet pressure [kgf/cm²]",
+    "MASSFL": "Feed flow per coil [kg/h]",
+    "DSRATIO": "Steam dilution ratio [-]",
+    "VELOLI": "Coil outlet linear velocity [m/s]",
+    "VELOMA": "Coil outlet mass velocity [kg/m²s]",
+    #         "": "Residence time up to coil outlet [s]",
+    #         "": "Residence time including transfer line volume [s]",
+    #         "": "Resulting convergence value [°C]",
+    "TEMPWA": "Radiant wall temperature [°C]",
+    "TEMPGA": "Radiant gas temperature [°C]",
+    "TEMPCO": "Average correction of process temperature [°C]",
+    "AVTMT": "Fourth power average tube skin temperature [°C]",
+    "TOTDUT": "Total thermal duty transferred [kcal/h]",
+    "HEATFA": "Average heat flux (clean int. surface) [kcal/m²h]",
+    "COKVOL": "Total coil coke volume [dm³]",
+    "VOLINS": "Total coil inside volume [dm³]",
+    "SURINS": "Total coil inside surface [m²]",
+    "SUROUT": "Total coil outside surface [m²]",
+    "COILWE": "Total coil weight [kg]",
+}
+
+
 class SpyroGeneralOutput:
     def __init__(self):
         import pandas as pd
 
         self.general = pd.DataFrame()
+        # General output with the original Spyro parameter names
+        self.general_raw = pd.DataFrame()
 
     def get_general(self):
         return self.general
 
-    def read_general(self, folder_location, file_name, verbose=False):
+    def get_general_raw(self):
+        return self.general_raw
+
+    @timed("read_general", case_arg="file_name")
+    def read_general(
+        self, folder_location, file_name, verbose=False, eof_document=None
+    ):
         """
         Read the general output from a Spyro output file and return it as
         DataFrame.
@@ -631,6 +1679,10 @@ class SpyroGeneralOutput:
             The name of the Spyro output file.
         verbose : bool, optional
             Whether to print verbose output, by default False.
+        eof_document : EofDocument or EofSectionReader, optional
+            Already indexed .eof file, avoids reading the file again when
+            several readers are applied to the same case. By default only
+            the needed section is read with an EofSectionReader.
 
         Returns
         -------
@@ -642,62 +1694,24 @@ class SpyroGeneralOutput:
         FileNotFoundError
             If the provided file_path does not exist.
         """
-        import os
+        import contextlib
 
         import pandas as pd
 
-        folder_file_name = os.path.join(
-            os.path.join(folder_location, file_name),
-            "{}.eof".format(file_name),
-        )
-
-        with open(folder_file_name, "r") as output_file:
-            section = None
-            for line in output_file:
-                line = line.strip()
-                if line.startswith("[SPYROGENERAL]"):
-                    section = "SPYROGENERAL"
-                elif line.startswith("[SPYROGENERAL END]"):
-                    section = None
-                elif section == "SPYROGENERAL":
-                    splits = line.split()
-                    parameters = splits[::2]
-                    values = splits[1::2]
+        if eof_document is None:
+            eof_context = EofSectionReader(folder_location, file_name)
+        else:
+            eof_context = contextlib.nullcontext(eof_document)
+        with eof_context as eof_document:
+            splits = eof_document.get_section("SPYROGENERAL").split()
+        parameters = splits[::2]
+        values = splits[1::2]
 
         df = pd.Series(values, index=parameters)
         df = df.astype("float64")
 
-        # Rename the columns for df
-        column_mapping = {
-            "CIT": "Coil inlet temperature [°C]",
-            "TXADIA": "Outlet temperature at measuring point [°C]",
-            # "SURINS": "Transferline volume outlet temperature [°C]",
-            "TMT": "Tube no. TMT",
-            "MAXSKIN": "Maximum skin temperature [°C]",
-            "COKRATE": "Coking rate at location of max TMT [mm/month]",
-            "INLETP": "Coil inlet pressure [kgf/cm²]",
-            "PRESSDR": "Pressure drop [kgf/cm²]",
-            "OUTLETP": "Coil outlet pressure [kgf/cm²]",
-            "MASSFL": "Feed flow per coil [kg/h]",
-            "DSRATIO": "Steam dilution ratio [-]",
-            "VELOLI": "Coil outlet linear velocity [m/s]",
-            "VELOMA": "Coil outlet mass velocity [kg/m²s]",
-            #         "": "Residence time up to coil outlet [s]",
-            #         "": "Residence time including transfer line volume [s]",
-            #         "": "Resulting convergence value [°C]",
-            "TEMPWA": "Radiant wall temperature [°C]",
-            "TEMPGA": "Radiant gas temperature [°C]",
-            "TEMPCO": "Average correction of process temperature [°C]",
-            "AVTMT": "Fourth power average tube skin temperature [°C]",
-            "TOTDUT": "Total thermal duty transferred [kcal/h]",
-            "HEATFA": "Average heat flux (clean int. surface) [kcal/m²h]",
-            "COKVOL": "Total coil coke volume [dm³]",
-            "VOLINS": "Total coil inside volume [dm³]",
-            "SURINS": "Total coil inside surface [m²]",
-            "SUROUT": "Total coil outside surface [m²]",
-            "COILWE": "Total coil weight [kg]",
-        }
-        df = df.rename(index=column_mapping)
+        self.general_raw = df
+        df = df.rename(index=GENERAL_COLUMN_MAPPING)
 
         if verbose:
             print("Spyro General Data and misc:")
@@ -713,11 +1727,24 @@ class FireboxData:
         self.firebox_present = False
         self.perform_section = False
         self.firebox_perf_summary = pd.DataFrame()
+        # Performance summary with the original Spyro parameter names
+        self.firebox_perf_raw = pd.DataFrame()
 
     def get_firebox_perf_summary(self):
         return self.firebox_perf_summary
 
-    def read_firebox(self, folder_location, file_name, verbose=False):
+    def get_firebox_perf_raw(self):
+        return self.firebox_perf_raw
+
+    @timed("read_firebox", case_arg="file_name")
+    def read_firebox(
+        self,
+        folder_location,
+        file_name,
+        verbose=False,
+        eof_document=None,
+        warn=True,
+    ):
         """
         Read the firebox output from a Spyro output file and return it as a
         DataFrame.
@@ -730,6 +1757,13 @@ class FireboxData:
             The name of the Spyro output file.
         verbose : bool, optional
             Whether to print verbose output, by default False.
+        eof_document : EofDocument or EofSectionReader, optional
+            Already indexed .eof file, avoids reading the file again when
+            several readers are applied to the same case. By default only
+            the needed section is read with an EofSectionReader.
+        warn : bool, optional
+            Whether to print a warning when the file has no [FIREBOX]
+            section, by default True. firebox_present tells afterwards.
 
         Returns
         -------
@@ -741,41 +1775,38 @@ class FireboxData:
         FileNotFoundError
             If the provided file_path does not exist.
         """
-        import os
+        import contextlib
 
         import pandas as pd
 
-        folder_file_name = os.path.join(
-            os.path.join(folder_location, file_name),
-            "{}.eof".format(file_name),
-        )
-
-        with open(folder_file_name, "r") as output_file:
-            data = []
-
-            for line in output_file:
-                line = line.strip()
-
-                if line.startswith("[FIREBOX]"):
-                    self.firebox_present = True
-
-                if self.firebox_present and line.startswith("[PERFORM]"):
-                    self.perform_section = True
-                    continue
-
-                if self.perform_section:
-                    if line.startswith("["):
-                        break
-                    else:
-                        data.append(line)
+        if eof_document is None:
+            eof_context = EofSectionReader(folder_location, file_name)
+        else:
+            eof_context = contextlib.nullcontext(eof_document)
+        with eof_context as eof_document:
+            if eof_document.has_section("FIREBOX"):
+                self.firebox_present = True
+            perform_str = eof_document.get_section(
+                "PERFORM", occurrence=0, within="FIREBOX"
+            )
 
         if not self.firebox_present:
-            print(
-                "Warning: [FIREBOX] section not found in the file."
-                "No data was parsed."
-            )
+            if warn:
+                print(
+                    "Warning: [FIREBOX] section not found in the file."
+                    "No data was parsed."
+                )
             return None
 
+        self.perform_section = perform_str is not None
+        data = []
+        for line in (perform_str or "").splitlines():
+            line = line.strip()
+            if line.startswith("["):
+                break
+            else:
+                data.append(line)
+
         splits = data[0].split()
         parameters = splits[::2]
         values = splits[1::2]
@@ -835,6 +1866,7 @@ class FireboxData:
             "BRDGLO": "Bridge wall heat losses [kcal/h]",
         }
 
+        self.firebox_perf_raw = df
         df = df.rename(index=column_mapping)
 
         if verbose:
@@ -842,3 +1874,189 @@ class FireboxData:
             print(df)
 
         self.firebox_perf_summary = df
+
+
+class CoilProfileData:
+    def __init__(self):
+        """Constructor
+
+        Objects
+        -------
+        profiles :
+            dictionary with the section name (TUBE, TUBEDATA, TRVOL) as key
+            and a 2-D float array (position x variable) as value
+        columns :
+            dictionary with the section name as key and the list of variable
+            names (column order of the profile array) as value
+        """
+        self.profile_sections = ["TUBE", "TUBEDATA", "TRVOL"]
+        self.profiles = {}
+        self.columns = {}
+
+    def get_profile(self, section="TUBE"):
+        return self.profiles.get(section)
+
+    def get_columns(self, section="TUBE"):
+        return self.columns.get(section, [])
+
+    def get_column(self, key, section="TUBE"):
+        """get_column.
+
+        Parameters
+        ----------
+        key : str
+            Variable name, e.g. TMT, COKER or TEMP
+        section : str
+            Profile section, TUBE, TUBEDATA or TRVOL, default TUBE
+
+        Returns
+        -------
+        np.ndarray
+            1-D array with the variable along the coil
+        """
+        return self.profiles[section][:, self.columns[section].index(key)]
+
+    @staticmethod
+    def parse_records(records):
+        """parse_records.
+        Parses KEY VALUE records straight into a preallocated float array.
+        The columns are taken from the first record, keys which only appear
+        in later records are appended as extra columns.
+
+        Parameters
+        ----------
+        records : list
+            Body text of the [TUBE], [TUBEDATA] or [TRVOL] records
+
+        Returns
+        -------
+        profile
+            2-D float array (record x variable), missing values are NaN
+        columns
+            list with the variable names of the profile columns
+        """
+        import numpy as np
+
+        columns = []
+        if records:
+            columns = list(dict.fromkeys(records[0].split()[::2]))
+        column_position = {key: i for i, key in enumerate(columns)}
+        profile = np.full((len(records), len(columns)), np.nan)
+        for row, record in enumerate(records):
+            splits = record.split()
+            for key, value in zip(splits[::2], splits[1::2]):
+                if key not in column_position:
+                    column_position[key] = len(columns)
+                    columns.append(key)
+                    profile = np.hstack(
+                        [profile, np.full((len(records), 1), np.nan)]
+                    )
+                try:
+                    profile[row, column_position[key]] = float(value)
+                except ValueError:
+                    pass
+
+        return profile, columns
+
+    @timed("read_profiles", case_arg="file_name")
+    def read_profiles(
+        self, folder_location, file_name, verbose=False, eof_document=None
+    ):
+        """
+        Read the [TUBE], [TUBEDATA] and [TRVOL] coil profiles from a Spyro
+        output file into float arrays with one column per variable. Only
+        the last simulated day ([SPYRO] block) is read, the same day as the
+        effluent of read_effluent.
+
+        Parameters
+        ----------
+        folder_location : str
+            The folder location where the Spyro output file is located.
+        file_name : str
+            The name of the Spyro output file.
+        verbose : bool, optional
+            Whether to print verbose output, by default False.
+        eof_document : EofDocument, optional
+            Already indexed .eof file, avoids reading the file again when
+            several readers are applied to the same case.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the provided file_path does not exist.
+        """
+        if eof_document is None:
+            eof_document = EofDocument(folder_location, file_name)
+
+        within = "SPYRO" if eof_document.has_section("SPYRO") else None
+        for section in self.profile_sections:
+            profile, columns = self.parse_records(
+                eof_document.get_sections(
+                    section, within=within, within_occurrence=-1
+                )
+            )
+            self.profiles[section] = profile
+            self.columns[section] = columns
+            if verbose:
+                print(
+                    "{} profile: {} records x {} variables".format(
+                        section, *profile.shape
+                    )
+                )
+
+
+def stack_coil_profiles(coil_profiles, section="TUBE", columns=None):
+    """stack_coil_profiles.
+    Stacks the coil profiles of many cases into one 3-D array so that
+    screening (e.g. TMT or coking rate limits) can be done vectorized over a
+    whole campaign.
+
+    Parameters
+    ----------
+    coil_profiles : list
+        CoilProfileData objects which have been read with read_profiles
+    section : str
+        Profile section, TUBE, TUBEDATA or TRVOL, default TUBE
+    columns : list, optional
+        Variable names to stack, default all variables in order of
+        appearance
+
+    Returns
+    -------
+    stacked_profiles
+        3-D float array (case x position x variable), cases with a shorter
+        coil are padded with NaN
+    columns
+        list with the variable names of the last axis
+    """
+    import numpy as np
+
+    if columns is None:
+        columns = []
+        for coil_profile in coil_profiles:
+            for key in coil_profile.get_columns(section):
+                if key not in columns:
+                    columns.append(key)
+    column_position = {key: i for i, key in enumerate(columns)}
+
+    n_positions = max(
+        [
+            coil_profile.get_profile(section).shape[0]
+            for coil_profile in coil_profiles
+        ],
+        default=0,
+    )
+    stacked_profiles = np.full(
+        (len(coil_profiles), n_positions, len(columns)), np.nan
+    )
+    for case, coil_profile in enumerate(coil_profiles):
+        profile = coil_profile.get_profile(section)
+        case_columns = coil_profile.get_columns(section)
+        source = [
+            i for i, key in enumerate(case_columns) if key in column_position
+        ]
+        target = [column_position[case_columns[i]] for i in source]
+        case_profile = stacked_profiles[case, : profile.shape[0]]
+        case_profile[:, target] = profile[:, source]
+
+    return stacked_profiles, columns
@@ -0,0 +1,364 @@
+# Ways to put an immutable asset of the base folder (Pyrotec.ini) into a
+# case folder. auto tries a hard link, then a symbolic link and copies when
+# neither is possible, e.g. a hard link across file systems or a symbolic
+# link without the privilege on Windows.
+ASSET_LINK_MODES = ["copy", "hardlink", "symlink", "auto"]
+
+
+def _replace_link(link_function, source, destination):
+    import os
+
+    try:
+        link_function(source, destination)
+    except FileExistsError:
+        os.remove(destination)
+        link_function(source, destination)
+
+
+def link_asset(source, destination, mode="copy"):
+    """link_asset.
+
+    Parameters
+    ----------
+    source : str
+        path of the asset, e.g. base/Pyrotec.ini
+    destination : str
+        path of the asset in the case folder, an existing file is replaced
+    mode : str
+        copy, hardlink, symlink or auto, see ASSET_LINK_MODES
+
+    Returns
+    -------
+    str
+        mode which was used, auto returns hardlink, symlink or copy
+    """
+    import os
+    import shutil
+
+    if mode not in ASSET_LINK_MODES:
+        raise ValueError(
+            "link mode {} is not one of {}".format(mode, ASSET_LINK_MODES)
+        )
+    attempts = ["hardlink", "symlink", "copy"] if mode == "auto" else [mode]
+    for attempt in attempts:
+        try:
+            if attempt == "hardlink":
+                _replace_link(os.link, source, destination)
+            elif attempt == "symlink":
+                _replace_link(os.symlink, os.path.abspath(source), destination)
+            else:
+                # A link left by an earlier write would be written through
+                if os.path.islink(destination) or (
+                    os.path.isfile(destination)
+                    and os.stat(destination).st_nlink > 1
+                ):
+                    os.remove(destination)
+                shutil.copy(source, destination)
+            return attempt
+        except OSError:
+            if attempt == attempts[-1]:
+                raise
+    return None
+
+
+def write_cases(spyro_cases, max_workers=8, link_mode=None):
+    """write_cases.
+    Writes the case folders with write_spyro from a thread pool, so that the
+    metadata round trips of many cases on a network share overlap.
+
+    Parameters
+    ----------
+    spyro_cases : list
+        SpyroData objects
+    max_workers : int
+        number of case folders written at the same time
+    link_mode : str, optional
+        asset link mode of every case, see SpyroData.set_asset_link_mode,
+        default the mode of each case
+
+    Returns
+    -------
+    list
+        (case name, exception) tuples of the cases which could not be
+        written
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    spyro_cases = list(spyro_cases)
+    if link_mode is not None:
+        for spyro_data in spyro_cases:
+            spyro_data.set_asset_link_mode(link_mode)
+
+    def write(spyro_data):
+        try:
+            spyro_data.write_spyro()
+        except Exception as error:
+            return spyro_data.get_file_name(), error
+        return None
+
+    with ThreadPoolExecutor(max_workers=max(int(max_workers), 1)) as pool:
+        return [error for error in pool.map(write, spyro_cases) if error]
+
+
+class ScratchStaging:
+    def __init__(
+        self, scratch_root=None, link_mode="auto", max_workers=8, keep=False
+    ):
+        """Constructor
+
+        Runs cases in a local scratch folder (a local disk or a tmpfs such
+        as /dev/shm) instead of in their folder on a network share. The
+        base .dat and Pyrotec.ini are copied to the scratch folder once,
+        every case folder is written, run and harvested locally and the
+        outputs are copied back to the original folders in bulk by sync.
+        The scratch folder is removed by cleanup, when the staging is used
+        as context manager or at the latest when it is garbage collected.
+
+        Parameters
+        ----------
+        scratch_root : str, optional
+            folder in which the scratch folder is created, default the
+            temporary folder of the system
+        link_mode : str
+            asset link mode of the staged cases and of the synced folders,
+            see ASSET_LINK_MODES
+        max_workers : int
+            number of case folders copied back at the same time
+        keep : bool
+            keep the scratch folder when the context manager exits, it is
+            always kept when a case could not be copied back
+
+        Objects
+        -------
+        scratch_folder :
+            path of the scratch folder
+        staged :
+            dictionary with (original folder, case name) as key and
+            (SpyroData, original folder, original base folder, original
+            asset link mode) as value
+        """
+        import shutil
+        import tempfile
+        import threading
+        import weakref
+
+        self.scratch_folder = tempfile.mkdtemp(
+            prefix="spyro_scratch_", dir=scratch_root
+        )
+        self.link_mode = link_mode
+        self.max_workers = max_workers
+        self.keep = keep
+        self.staged = {}
+        # Original folder -> scratch folder, for case and base folders
+        self.case_folders = {}
+        self.base_folders = {}
+        self.lock = threading.Lock()
+        self.finalizer = weakref.finalize(
+            self, shutil.rmtree, self.scratch_folder, ignore_errors=True
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        failed = self.sync()
+        if failed:
+            # The scratch folder holds the only copy of their output
+            print(
+                "Warning: the scratch folder {} is kept, {} cases could not "
+                "be copied back.".format(self.scratch_folder, len(failed))
+            )
+            self.finalizer.detach()
+        elif not self.keep:
+            self.cleanup()
+
+    def get_scratch_folder(self):
+        return self.scratch_folder
+
+    def get_staged(self):
+        return [staged[0] for staged in self.staged.values()]
+
+    def get_scratch_base_folder(self, base_folder):
+        """Local copy of base.dat and Pyrotec.ini of a base folder."""
+        import os
+        import shutil
+
+        base_folder = os.path.abspath(base_folder)
+        with self.lock:
+            scratch_base_folder = self.base_folders.get(base_folder)
+            if scratch_base_folder is None:
+                scratch_base_folder = os.path.join(
+                    self.scratch_folder,
+                    "base_{}".format(len(self.base_folders)),
+                )
+                os.mkdir(scratch_base_folder)
+                for asset in ["base.dat", "Pyrotec.ini"]:
+                    if os.path.isfile(os.path.join(base_folder, asset)):
+                        shutil.copy(
+                            os.path.join(base_folder, asset),
+                            scratch_base_folder,
+                        )
+                self.base_folders[base_folder] = scratch_base_folder
+        return scratch_base_folder
+
+    def get_scratch_case_folder(self, folder_location):
+        import os
+
+        folder_location = os.path.abspath(folder_location)
+        with self.lock:
+            scratch_case_folder = self.case_folders.get(folder_location)
+            if scratch_case_folder is None:
+                scratch_case_folder = os.path.join(
+                    self.scratch_folder,
+                    "cases_{}".format(len(self.case_folders)),
+                )
+                os.mkdir(scratch_case_folder)
+                self.case_folders[folder_location] = scratch_case_folder
+        return scratch_case_folder
+
+    def stage(self, spyro_data, copy_inputs=False):
+        """stage.
+        Moves a case to the scratch folder. A case which is already staged
+        is left as it is.
+
+        Parameters
+        ----------
+        spyro_data : SpyroData
+            case, its folder location and base folder point to the scratch
+            folder until it is synced
+        copy_inputs : bool
+            copy the files of an existing case folder to the scratch folder,
+            needed when the case is run without write_spyro
+        """
+        import os
+        import shutil
+
+        folder_location = spyro_data.get_folder_location()
+        key = (os.path.abspath(folder_location), spyro_data.get_file_name())
+        if key in self.staged or (
+            os.path.dirname(os.path.abspath(folder_location))
+            == self.scratch_folder
+        ):
+            return
+        base_folder = spyro_data.get_base_folder()
+        scratch_case_folder = self.get_scratch_case_folder(folder_location)
+        if copy_inputs and os.path.isdir(spyro_data.file_name_folder):
+            shutil.copytree(
+                spyro_data.file_name_folder,
+                os.path.join(scratch_case_folder, spyro_data.get_file_name()),
+                dirs_exist_ok=True,
+            )
+        asset_link_mode = spyro_data.get_asset_link_mode()
+        spyro_data.set_folder_location(scratch_case_folder)
+        spyro_data.set_base_folder(self.get_scratch_base_folder(base_folder))
+        spyro_data.set_asset_link_mode(self.link_mode)
+        with self.lock:
+            self.staged[key] = (
+                spyro_data,
+                folder_location,
+                base_folder,
+                asset_link_mode,
+            )
+
+    def sync_case(self, key):
+        """sync_case.
+        Copies the case folder back to its original folder, links
+        Pyrotec.ini from the original base folder, removes the scratch case
+        folder and points the case back to its original folders and asset
+        link mode.
+
+        Parameters
+        ----------
+        key : tuple
+            (original folder, case name), key of staged
+        """
+        import os
+        import shutil
+
+        from spyro_framework.metrics import span
+
+        spyro_data, folder_location, base_folder, asset_link_mode = (
+            self.staged[key]
+        )
+        file_name = spyro_data.get_file_name()
+        scratch_case_folder = spyro_data.file_name_folder
+        case_folder = os.path.join(folder_location, file_name)
+        with span("sync_back", file_name):
+            if os.path.isdir(scratch_case_folder):
+                os.makedirs(case_folder, exist_ok=True)
+                for entry in os.scandir(scratch_case_folder):
+                    destination = os.path.join(case_folder, entry.name)
+                    if entry.name == "Pyrotec.ini":
+                        link_asset(
+                            os.path.join(base_folder, entry.name),
+                            destination,
+                            self.link_mode,
+                        )
+                    elif entry.is_dir():
+                        shutil.copytree(
+                            entry.path, destination, dirs_exist_ok=True
+                        )
+                    else:
+                        shutil.copyfile(entry.path, destination)
+                shutil.rmtree(scratch_case_folder, ignore_errors=True)
+        spyro_data.set_folder_location(folder_location)
+        spyro_data.set_base_folder(base_folder)
+        spyro_data.set_asset_link_mode(asset_link_mode)
+        with self.lock:
+            del self.staged[key]
+
+    def sync(self, spyro_cases=None):
+        """sync.
+        Copies staged cases back to their original folders, see sync_case.
+
+        Parameters
+        ----------
+        spyro_cases : list, optional
+            only these SpyroData objects, e.g. the cases of one batch while
+            another batch is still running on the same staging, default all
+            staged cases
+
+        Returns
+        -------
+        list
+            (case name, exception) tuples of the cases which could not be
+            copied back, they stay staged
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self.lock:
+            keys = list(self.staged)
+            if spyro_cases is not None:
+                case_ids = {id(spyro_data) for spyro_data in spyro_cases}
+                keys = [
+                    key for key in keys if id(self.staged[key][0]) in case_ids
+                ]
+        if not keys:
+            return []
+
+        def sync_case(key):
+            try:
+                self.sync_case(key)
+            except Exception as error:
+                return key[1], error
+            return None
+
+        with ThreadPoolExecutor(
+            max_workers=max(min(int(self.max_workers), len(keys)), 1)
+        ) as pool:
+            failed = [error for error in pool.map(sync_case, keys) if error]
+        for file_name, error in failed:
+            print(
+                "Warning: {} could not be copied back from {}: {}".format(
+                    file_name, self.scratch_folder, error
+                )
+            )
+        return failed
+
+    def cleanup(self):
+        """Removes the scratch folder, unsynced cases are lost."""
+        import shutil
+
+        self.staged = {}
+        self.finalizer.detach()
+        shutil.rmtree(self.scratch_folder, ignore_errors=True)
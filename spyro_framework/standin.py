@@ -0,0 +1,588 @@
+# Sections of base.eof with KEY value pairs which are perturbed
+PERTURBED_SECTIONS = ["TUBE", "TRVOL", "EFFLUENT", "TUBEDATA", "SPYROGENERAL"]
+# Keys which describe the case or the geometry, these are never perturbed
+FIXED_KEYS = [
+    "NUMBER",
+    "LENGTH",
+    "COILEN",
+    "CONOP",
+    "CIT",
+    "MASSFL",
+    "DSRATIO",
+]
+
+# Messages of the failure modes, see simulate_case
+FAILURE_MESSAGES = {
+    "security": [
+        "0 ERROR SECURITY 2014 Please contact Pyrotec with the error number.",
+        "0 ERROR EFPS 0 SECURE",
+        "0 ERROR EFPS 0 PROGRAM HAS BEEN TERMINATED. PLEASE CHECK YOUT INPUT",
+    ],
+    "nonconvergence": [
+        "0 ERROR SPYRO 0 CONVERGENCE NOT REACHED AFTER ITMAX ITERATIONS",
+    ],
+}
+
+
+class EofLayout:
+    def __init__(self, base_folder):
+        """Constructor
+
+        Splits base.eof once into literal text and numeric value slots so
+        that new .eof files are rendered by joining strings only.
+
+        Parameters
+        ----------
+        base_folder : str
+            folder with base.eof, base.OUT and base.dat
+
+        Objects
+        -------
+        chunks :
+            list with the literal text around the value slots, one more
+            than the number of values
+        keys :
+            array with the Spyro key of every value slot, e.g. WC2H4
+        sections :
+            array with the section name of every value slot
+        values :
+            array with the base value of every value slot
+        """
+        import os
+        import re
+
+        import numpy as np
+
+        from spyro_framework.spyro import EofDocument
+        from spyro_framework.template import SpyroDatTemplate
+
+        self.base_folder = base_folder
+        with open(os.path.join(base_folder, "base.eof"), "r") as eof_file:
+            text = eof_file.read()
+        with open(os.path.join(base_folder, "base.OUT"), "r") as out_file:
+            self.out_lines = out_file.read().split("\n")
+        base_dat = SpyroDatTemplate(os.path.join(base_folder, "base.dat"))
+        self.base_conval = float(base_dat.get_parameter("CONVAL")[0])
+
+        bodies = []
+        for name in PERTURBED_SECTIONS:
+            for _, body_start, body_end in EofDocument.index_sections(
+                text
+            ).get(name, []):
+                bodies.append((body_start, body_end, name))
+        bodies.sort()
+
+        pair = re.compile(
+            r"([A-Z][A-Z0-9]*) (-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)"
+        )
+        self.chunks = []
+        keys = []
+        sections = []
+        values = []
+        position = 0
+        for body_start, body_end, name in bodies:
+            for match in pair.finditer(text, body_start, body_end):
+                if match.group(1) in FIXED_KEYS:
+                    continue
+                self.chunks.append(text[position : match.start(2)])
+                keys.append(match.group(1))
+                sections.append(name)
+                values.append(float(match.group(2)))
+                position = match.end(2)
+        self.chunks.append(text[position:])
+        self.keys = np.array(keys)
+        self.sections = np.array(sections)
+        self.values = np.array(values)
+        self.effluent_wt = (self.sections == "EFFLUENT") & np.char.startswith(
+            self.keys, "W"
+        )
+
+    def perturb(self, rng, conval=None, noise=0.02):
+        """perturb.
+
+        Parameters
+        ----------
+        rng : numpy.random.Generator
+            random generator of the case
+        conval : float, optional
+            convergence value of the case, the ethylene and ethane yields
+            follow the ratio to the base convergence value
+        noise : float
+            relative standard deviation of the perturbation of every value
+
+        Returns
+        -------
+        ndarray
+            new values, the weight based effluent still sums up to the base
+            total
+        """
+        import numpy as np
+
+        values = self.values * rng.lognormal(0.0, noise, len(self.values))
+        if conval is not None and self.base_conval > 0:
+            severity = conval / self.base_conval
+            values[self.keys == "WC2H4"] *= severity
+            values[self.keys == "WC2H6"] /= severity
+        wt = self.effluent_wt
+        if wt.any() and values[wt].sum() > 0:
+            values[wt] *= self.values[wt].sum() / values[wt].sum()
+        return np.round(values, 6)
+
+    def render_eof(self, values):
+        """Renders a .eof file with the base layout and the given values."""
+        parts = [self.chunks[0]]
+        for value, chunk in zip(values.tolist(), self.chunks[1:]):
+            parts.append("{:.6f}".format(value).rstrip("0").rstrip("."))
+            parts.append(chunk)
+        return "".join(parts)
+
+    def render_out(self, dat_text, outcome):
+        """render_out.
+        Renders a .OUT file: the base output with the input echo replaced by
+        the case input, cut after the input processing for fatal errors.
+        """
+        import re
+
+        echo = re.compile(r"^\s+\d+ :  ")
+        lines = [line for line in self.out_lines if not echo.match(line)]
+        first_echo = next(
+            (i for i, line in enumerate(self.out_lines) if echo.match(line)),
+            len(lines),
+        )
+        case_echo = [
+            "{:5d} :  {}".format(i + 1, line)
+            for i, line in enumerate(dat_text.split("\n"))
+            if line.strip()
+        ]
+        if outcome == "security":
+            end = next(
+                (
+                    i
+                    for i, line in enumerate(lines)
+                    if "SPYRO INPUT PROCESSING STARTS" in line
+                ),
+                first_echo,
+            )
+            lines = lines[:end] + [
+                "     ECHO PRINT OF INPUT DATA",
+                "     ************************",
+                "",
+                "",
+            ]
+            first_echo = len(lines)
+            lines += ["", "", "     CALCULATIONS FINALIZED"]
+        elif outcome == "nonconvergence":
+            lines = [
+                line.replace("CONVERGENCE REACHED", "CONVERGENCE NOT REACHED")
+                for line in lines
+            ]
+        return "\n".join(lines[:first_echo] + case_echo + lines[first_echo:])
+
+
+# Layouts shared by all cases of a process, see get_eof_layout
+_eof_layouts = {}
+
+
+def get_eof_layout(base_folder):
+    import os
+
+    key = os.path.abspath(base_folder)
+    if key not in _eof_layouts:
+        _eof_layouts[key] = EofLayout(base_folder)
+    return _eof_layouts[key]
+
+
+def get_case_rng(dat_text, seed=0):
+    """Random generator seeded by the .dat content, same input same case."""
+    import hashlib
+
+    import numpy as np
+
+    digest = hashlib.sha256(dat_text.encode()).digest()
+    return np.random.default_rng([int.from_bytes(digest[:8], "little"), seed])
+
+
+def simulate_case(dat_text, layout, failure_rates=None, seed=0, noise=0.02):
+    """simulate_case.
+
+    Parameters
+    ----------
+    dat_text : str
+        content of the .dat file
+    layout : EofLayout
+        parsed base case
+    failure_rates : dict, optional
+        probability of every failure mode:
+        - security: EFPS license error, .msg and .OUT like NI82, no .eof
+        - nonconvergence: .eof written but convergence not reached
+        - crash: non zero exit code and no output files
+        - hang: the process keeps running, see run_standin
+    seed : int
+        seed which is combined with the .dat content
+    noise : float
+        relative standard deviation of the perturbation of the values
+
+    Returns
+    -------
+    outcome : str
+        finished or one of the failure modes
+    files : dict
+        extension (.eof, .msg, .OUT) as key and file content as value
+    """
+    import re
+
+    rng = get_case_rng(dat_text, seed)
+    outcome = "finished"
+    draw = rng.random()
+    for mode, rate in (failure_rates or {}).items():
+        if draw < rate:
+            outcome = mode
+            break
+        draw -= rate
+
+    if outcome in ["crash", "hang"]:
+        return outcome, {}
+    files = {
+        ".msg": "\n".join(FAILURE_MESSAGES.get(outcome, [])) + "\n",
+        ".OUT": layout.render_out(dat_text, outcome),
+    }
+    if outcome != "security":
+        conval = re.search(r"CONVAL=([-+.\deE]+)", dat_text)
+        conval = float(conval.group(1)) if conval else None
+        # The perturbation does not depend on CONVAL, so the yields change
+        # smoothly with the convergence value like in EFPS and a target
+        # match can converge
+        values = layout.perturb(
+            get_case_rng(
+                re.sub(r"CONVAL=[-+.\deE]+", "CONVAL=", dat_text), seed
+            ),
+            conval,
+            noise,
+        )
+        files[".eof"] = layout.render_eof(values)
+    return outcome, files
+
+
+def write_case_files(case_folder, file_name, files):
+    import os
+
+    for extension, content in files.items():
+        with open(
+            os.path.join(case_folder, file_name + extension), "w"
+        ) as case_file:
+            case_file.write(content)
+
+
+def run_standin(
+    dat_location,
+    base_folder=None,
+    sleep_time=0.0,
+    sleep_jitter=0.0,
+    failure_rates=None,
+    hang_time=3600.0,
+    seed=0,
+):
+    """run_standin.
+    Runs the stand-in simulator for one .dat file and writes the output
+    files next to it, like EFPS. The values of the base case are perturbed
+    deterministically per .dat content, so identical input gives identical
+    output. CONVAL is left out of the perturbation and scales the ethylene
+    and ethane yields instead. Used instead of EFPS68.exe to measure
+    throughput on any platform, either with python -m
+    spyro_framework.standin NI03.dat or through a script written with
+    write_standin_executable.
+
+    Parameters
+    ----------
+    dat_location : str
+        path of the .dat file, usually only the file name as EFPS is started
+        in the case folder
+    base_folder : str, optional
+        folder with base.eof, base.OUT and base.dat, default ../base
+        relative to the case folder
+    sleep_time : float
+        simulated run time in seconds
+    sleep_jitter : float
+        relative random variation of the run time
+    failure_rates : dict, optional
+        see simulate_case
+    hang_time : float
+        run time in seconds of a hanging case
+    seed : int
+        seed which is combined with the .dat content
+
+    Returns
+    -------
+    int
+        exit code, 1 for a crash and 0 otherwise
+    """
+    import os
+    import time
+
+    case_folder = os.path.dirname(os.path.abspath(dat_location))
+    file_name = os.path.splitext(os.path.basename(dat_location))[0]
+    if base_folder is None:
+        base_folder = os.path.join(case_folder, os.pardir, "base")
+    with open(dat_location, "r") as dat_file:
+        dat_text = dat_file.read()
+
+    outcome, files = simulate_case(
+        dat_text, get_eof_layout(base_folder), failure_rates, seed
+    )
+    run_time = sleep_time
+    if sleep_jitter:
+        rng = get_case_rng(dat_text, seed + 1)
+        run_time *= max(0.0, 1.0 + sleep_jitter * rng.standard_normal())
+    if outcome == "hang":
+        run_time = hang_time
+    # EFPS writes its messages while running and the .eof at the end
+    write_case_files(
+        case_folder,
+        file_name,
+        {
+            extension: content
+            for extension, content in files.items()
+            if extension != ".eof"
+        },
+    )
+    time.sleep(run_time)
+
+    if outcome == "crash":
+        print("forrtl: severe (157): Program Exception - access violation")
+        return 1
+    if ".eof" in files:
+        write_case_files(case_folder, file_name, {".eof": files[".eof"]})
+    return 0
+
+
+def write_standin_executable(
+    location,
+    base_folder=None,
+    sleep_time=0.0,
+    sleep_jitter=0.0,
+    failure_rates=None,
+    hang_time=3600.0,
+    seed=0,
+):
+    """write_standin_executable.
+    Writes an executable script which runs the stand-in with the given
+    options for the .dat file passed as only argument, like EFPS68.exe.
+
+    Parameters
+    ----------
+    location : str
+        path of the script, e.g. bin/EFPS68
+    base_folder, sleep_time, sleep_jitter, failure_rates, hang_time, seed :
+        see run_standin
+
+    Returns
+    -------
+    str
+        absolute path of the script
+    """
+    import os
+    import stat
+    import sys
+
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    options = {
+        "base_folder": (
+            os.path.abspath(base_folder) if base_folder is not None else None
+        ),
+        "sleep_time": sleep_time,
+        "sleep_jitter": sleep_jitter,
+        "failure_rates": failure_rates,
+        "hang_time": hang_time,
+        "seed": seed,
+    }
+    script = "\n".join(
+        [
+            "#!{}".format(sys.executable),
+            "import sys",
+            "sys.path.insert(0, {!r})".format(package_root),
+            "from spyro_framework.standin import run_standin",
+            "sys.exit(run_standin(sys.argv[1], **{!r}))".format(options),
+            "",
+        ]
+    )
+    location = os.path.abspath(location)
+    if not os.path.isdir(os.path.dirname(location)):
+        os.makedirs(os.path.dirname(location))
+    with open(location, "w") as script_file:
+        script_file.write(script)
+    os.chmod(
+        location,
+        os.stat(location).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH,
+    )
+    return location
+
+
+def _generate_cases(
+    folder_location, base_folder, case_seeds, failure_rates, seed, run
+):
+    """Worker of generate_corpus, returns the outcome of every case."""
+    import os
+
+    import numpy as np
+
+    from spyro_framework.template import load_dat_template
+
+    template = load_dat_template(os.path.join(base_folder, "base.dat"))
+    layout = get_eof_layout(base_folder)
+    base_feed = {
+        name: float(value)
+        for line_number in next(
+            block["lines"]
+            for block in template.blocks
+            if block["keyword"] == "NAME"
+        )
+        for name, value in template.lines[line_number]["params"]
+    }
+    outcomes = {}
+    for file_name, case_seed in case_seeds:
+        rng = np.random.default_rng([case_seed, seed])
+        feed = dict(
+            zip(
+                base_feed,
+                rng.dirichlet(np.array(list(base_feed.values())) + 1.0)
+                * 100.0,
+            )
+        )
+        dat_text = template.render(
+            parameters={
+                "CONVAL": round(layout.base_conval * rng.uniform(0.9, 1.1), 4)
+            },
+            feed_composition=feed,
+        )
+        case_folder = os.path.join(folder_location, file_name)
+        os.makedirs(case_folder, exist_ok=True)
+        files = {".dat": dat_text}
+        if run:
+            outcome, output_files = simulate_case(
+                dat_text, layout, failure_rates, seed
+            )
+            files.update(output_files)
+        else:
+            outcome = "pending"
+        write_case_files(case_folder, file_name, files)
+        outcomes[file_name] = outcome
+    return outcomes
+
+
+def generate_corpus(
+    folder_location,
+    n_cases,
+    base_folder="base",
+    prefix="synth",
+    failure_rates=None,
+    seed=0,
+    run=True,
+    max_workers=None,
+    chunk_size=1000,
+):
+    """generate_corpus.
+    Generates synthetic case folders for load tests of the harvest and
+    scheduling code. Every case gets a .dat with a random CONVAL and a
+    random variation of the base feed and, with run, the stand-in output.
+    A case takes about 65 kB on disk, 10^6 cases about 65 GB.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder where the case folders are created
+    n_cases : int
+        number of cases
+    base_folder : str
+        folder with base.dat, base.eof and base.OUT, default: base
+    prefix : str
+        prefix of the case names, default: synth
+    failure_rates : dict, optional
+        see simulate_case, a hanging case gets no output files
+    seed : int
+        seed of the corpus
+    run : bool
+        write the stand-in output, otherwise only the .dat files
+    max_workers : int, optional
+        number of processes, default the number of CPUs
+    chunk_size : int
+        number of cases per task
+
+    Returns
+    -------
+    Series
+        outcome per case name
+    """
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+
+    import pandas as pd
+
+    base_folder = os.path.abspath(base_folder)
+    if not os.path.isdir(folder_location):
+        os.makedirs(folder_location)
+    width = max(len(str(n_cases - 1)), 5)
+    case_seeds = [
+        ("{}_{:0{}d}".format(prefix, i, width), i) for i in range(n_cases)
+    ]
+    chunks = [
+        case_seeds[i : i + chunk_size] for i in range(0, n_cases, chunk_size)
+    ]
+    outcomes = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(
+                _generate_cases,
+                folder_location,
+                base_folder,
+                chunk,
+                failure_rates,
+                seed,
+                run,
+            )
+            for chunk in chunks
+        ]
+        for future in futures:
+            outcomes.update(future.result())
+    return pd.Series(outcomes, name="outcome")
+
+
+def main(argv=None):
+    """Command line entry point, see python -m spyro_framework.standin -h."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Stand-in for the EFPS executable"
+    )
+    parser.add_argument("dat", help=".dat file of the case")
+    parser.add_argument("--base-folder", default=None)
+    parser.add_argument("--sleep", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--hang-time", type=float, default=3600.0)
+    for mode in ["security", "nonconvergence", "crash", "hang"]:
+        parser.add_argument(
+            "--fail-{}".format(mode),
+            type=float,
+            default=0.0,
+            help="probability of a {} failure".format(mode),
+        )
+    args = parser.parse_args(argv)
+    failure_rates = {
+        mode: getattr(args, "fail_{}".format(mode))
+        for mode in ["security", "nonconvergence", "crash", "hang"]
+    }
+    return run_standin(
+        args.dat,
+        base_folder=args.base_folder,
+        sleep_time=args.sleep,
+        sleep_jitter=args.jitter,
+        failure_rates=failure_rates,
+        hang_time=args.hang_time,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -0,0 +1,346 @@
+class SpyroResultStore:
+    def __init__(self, store_folder):
+        """Constructor
+
+        Persistent, append-only Parquet store of harvested Spyro results.
+        Every table (effluent, general, firebox) is a folder with one hive
+        partition per batch (batch=<name>), so queries with filters such as
+        [("MAXSKIN", ">", 1050)] only read the row groups and columns they
+        need. Columns use the original Spyro names (WC2H4, MAXSKIN, ...).
+
+        Parameters
+        ----------
+        store_folder : str
+            Folder where the store is located, created when missing
+
+        Objects
+        -------
+        tables :
+            list with the table names of the store
+        """
+        import os
+        import threading
+
+        self.store_folder = store_folder
+        self.tables = ["effluent", "general", "firebox"]
+        self.lock = threading.Lock()
+        for table in self.tables:
+            table_folder = os.path.join(self.store_folder, table)
+            if not os.path.isdir(table_folder):
+                os.makedirs(table_folder)
+
+    def get_table_folder(self, table):
+        import os
+
+        return os.path.join(self.store_folder, table)
+
+    def get_columns(self, table):
+        """get_columns.
+
+        Parameters
+        ----------
+        table : str
+            effluent, general or firebox
+
+        Returns
+        -------
+        list
+            value columns of the table in a stable order, new columns are
+            only ever appended
+        """
+        import json
+        import os
+
+        schema_file = os.path.join(
+            self.get_table_folder(table), "_schema.json"
+        )
+        if not os.path.isfile(schema_file):
+            return []
+        with open(schema_file, "r") as schema:
+            return json.load(schema)
+
+    def extend_columns(self, table, columns):
+        """Appends unknown columns to the stable column list of a table."""
+        import json
+        import os
+
+        known_columns = self.get_columns(table)
+        new_columns = [
+            column for column in columns if column not in known_columns
+        ]
+        if not new_columns:
+            return known_columns
+        known_columns += new_columns
+        schema_file = os.path.join(
+            self.get_table_folder(table), "_schema.json"
+        )
+        with open(schema_file + ".tmp", "w") as schema:
+            json.dump(known_columns, schema)
+        os.replace(schema_file + ".tmp", schema_file)
+        return known_columns
+
+    def get_schema(self, table):
+        """get_schema.
+
+        Returns
+        -------
+        pyarrow.Schema
+            schema of the table: file_name, written_at, one float64 column
+            per value column and the batch partition column
+        """
+        import pyarrow as pa
+
+        return pa.schema(
+            [("file_name", pa.string()), ("written_at", pa.float64())]
+            + [(column, pa.float64()) for column in self.get_columns(table)]
+            + [("batch", pa.string())]
+        )
+
+    def get_batches(self):
+        """Returns the names of all batches in the store."""
+        import os
+
+        batches = set()
+        for table in self.tables:
+            for folder in os.listdir(self.get_table_folder(table)):
+                if folder.startswith("batch="):
+                    batches.add(folder[len("batch=") :])
+        return sorted(batches)
+
+    def write_part(self, table, batch, records):
+        """write_part.
+        Writes one Parquet file with the records of a batch. Files are
+        written under a temporary name and renamed when complete so that
+        readers never see partial files.
+
+        Parameters
+        ----------
+        table : str
+            effluent, general or firebox
+        batch : str
+            name of the batch (partition)
+        records : dict
+            case name as key and Series with the values as value
+        """
+        import os
+        import time
+        import uuid
+
+        import pandas as pd
+
+        if not records:
+            return
+        frame = pd.DataFrame(records).transpose().astype("float64")
+        with self.lock:
+            columns = self.extend_columns(table, list(frame.columns))
+        frame = frame.reindex(columns=columns)
+        frame.insert(0, "written_at", time.time())
+        frame.insert(0, "file_name", frame.index.astype(str))
+        frame = frame.reset_index(drop=True)
+
+        partition_folder = os.path.join(
+            self.get_table_folder(table), "batch={}".format(batch)
+        )
+        if not os.path.isdir(partition_folder):
+            os.makedirs(partition_folder, exist_ok=True)
+        part_name = "part-{}.parquet".format(uuid.uuid4().hex)
+        tmp_location = os.path.join(partition_folder, "." + part_name)
+        frame.to_parquet(tmp_location, index=False)
+        os.replace(tmp_location, os.path.join(partition_folder, part_name))
+
+    def open_batch(self, batch, flush_every=50):
+        """open_batch.
+
+        Parameters
+        ----------
+        batch : str
+            name of the batch (partition)
+        flush_every : int
+            number of cases buffered before a Parquet file is written
+
+        Returns
+        -------
+        SpyroBatchWriter
+        """
+        return SpyroBatchWriter(self, batch, flush_every=flush_every)
+
+    @staticmethod
+    def build_filter(filters):
+        """build_filter.
+
+        Parameters
+        ----------
+        filters : list
+            (column, operator, value) tuples which are combined with and,
+            operator is one of ==, !=, <, <=, >, >=, in
+
+        Returns
+        -------
+        pyarrow.compute.Expression or None
+        """
+        import operator
+
+        import pyarrow.compute as pc
+
+        operators = {
+            "==": operator.eq,
+            "=": operator.eq,
+            "!=": operator.ne,
+            "<": operator.lt,
+            "<=": operator.le,
+            ">": operator.gt,
+            ">=": operator.ge,
+        }
+        expression = None
+        for column, op, value in filters or []:
+            if op == "in":
+                condition = pc.field(column).isin(value)
+            else:
+                condition = operators[op](pc.field(column), value)
+            expression = (
+                condition if expression is None else expression & condition
+            )
+        return expression
+
+    def query(
+        self, table, filters=None, columns=None, batches=None, latest=False
+    ):
+        """query.
+        Reads a table with predicate and projection pushdown, only the
+        matching partitions, row groups and columns are loaded.
+
+        Parameters
+        ----------
+        table : str
+            effluent, general or firebox
+        filters : list, optional
+            (column, operator, value) tuples, e.g. [("MAXSKIN", ">", 1050)]
+        columns : list, optional
+            columns to return, default all
+        batches : list, optional
+            only read these batches
+        latest : bool
+            only consider the last written row of every case in a batch,
+            e.g. after a case has been harvested again
+
+        Returns
+        -------
+        DataFrame
+            one row per case
+        """
+        import pyarrow.dataset as ds
+
+        filters = list(filters or [])
+        if batches is not None:
+            filters.append(("batch", "in", list(batches)))
+        schema = self.get_schema(table)
+        if any(column not in schema.names for column, _, _ in filters):
+            # A column which was never written is null for every case
+            return schema.empty_table().to_pandas().reindex(columns=columns)
+        dataset = ds.dataset(
+            self.get_table_folder(table),
+            format="parquet",
+            partitioning="hive",
+            schema=schema,
+            exclude_invalid_files=False,
+            ignore_prefixes=[".", "_"],
+        )
+        key_columns = ["batch", "file_name", "written_at"]
+        read_columns = columns
+        if columns is not None:
+            # Columns which were never written are returned as null
+            read_columns = [
+                column for column in columns if column in schema.names
+            ]
+            if latest:
+                read_columns = list(dict.fromkeys(read_columns + key_columns))
+        frame = dataset.to_table(
+            columns=read_columns, filter=self.build_filter(filters)
+        ).to_pandas()
+        if latest:
+            # Versions are resolved on all rows, not only the filtered ones,
+            # so an outdated row never matches a filter
+            batch_filter = self.build_filter(
+                [("batch", "in", list(batches))] if batches else []
+            )
+            versions = dataset.to_table(
+                columns=key_columns, filter=batch_filter
+            ).to_pandas()
+            versions = versions.sort_values("written_at").drop_duplicates(
+                ["batch", "file_name"], keep="last"
+            )
+            frame = frame.merge(versions, on=key_columns, how="inner")
+        if columns is not None:
+            frame = frame.reindex(columns=columns)
+        return frame
+
+    def query_file_names(self, table, filters, batches=None):
+        """Returns the (batch, file_name) pairs of the matching cases."""
+        frame = self.query(
+            table, filters, columns=["batch", "file_name"], batches=batches
+        )
+        return list(zip(frame["batch"], frame["file_name"]))
+
+
+class SpyroBatchWriter:
+    def __init__(self, store, batch, flush_every=50):
+        """Constructor
+
+        Buffers harvested cases of one batch and appends them to the
+        SpyroResultStore every flush_every cases and on close.
+
+        Parameters
+        ----------
+        store : SpyroResultStore
+            store to write to
+        batch : str
+            name of the batch (partition)
+        flush_every : int
+            number of cases buffered before a Parquet file is written
+        """
+        self.store = store
+        self.batch = batch
+        self.flush_every = flush_every
+        self.records = {table: {} for table in store.tables}
+        self.n_buffered = 0
+        self.n_written = 0
+
+    def add(self, spyro_data):
+        """add.
+        Adds the harvested output of a finished case.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object after read_spyro_output
+        """
+        file_name = spyro_data.get_file_name()
+        self.records["effluent"][
+            file_name
+        ] = spyro_data.effluent_composition.get_effluent_raw()
+        self.records["general"][
+            file_name
+        ] = spyro_data.general_spyro.get_general_raw()
+        if spyro_data.firebox.firebox_present:
+            self.records["firebox"][
+                file_name
+            ] = spyro_data.firebox.get_firebox_perf_raw()
+        self.n_buffered += 1
+        if self.n_buffered >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        for table, records in self.records.items():
+            self.store.write_part(table, self.batch, records)
+        self.records = {table: {} for table in self.store.tables}
+        self.n_written += self.n_buffered
+        self.n_buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
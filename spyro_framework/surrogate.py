@@ -0,0 +1,468 @@
+class SpyroSurrogate:
+    def __init__(
+        self,
+        general_keys=None,
+        regularization=1e-6,
+        min_samples=5,
+        distance_factor=1.5,
+        range_margin=0.05,
+    ):
+        """Constructor
+
+        Fast regression model of Spyro which predicts the weight based
+        effluent composition and key general output from the feed
+        composition and the convergence settings. One Gaussian kernel ridge
+        model is trained per convergence target (CONOP) in pure NumPy.
+
+        Inputs outside the training domain are detected, see predict,
+        and can be simulated with Spyro instead with
+        predict_or_run, which adds their results to the training set.
+
+        Parameters
+        ----------
+        general_keys : list, optional
+            SpyroGeneralOutput parameters (original Spyro names) to predict,
+            default CIT, TXADIA, MAXSKIN, COKRATE, PRESSDR and OUTLETP
+        regularization : float
+            ridge term added to the diagonal of the kernel matrix
+        min_samples : int
+            minimum number of training cases of a convergence target before
+            it is predicted, all inputs are out of domain below it
+        distance_factor : float
+            an input is out of domain when its distance to the nearest
+            training case exceeds distance_factor times the largest nearest
+            neighbour distance within the training set
+        range_margin : float
+            fraction of the training range every feature may exceed
+
+        Objects
+        -------
+        features :
+            DataFrame with one row per training case, the feed components in
+            weight percent and the CONOP and target_value columns
+        targets :
+            DataFrame with one row per training case and column groups
+            effluent and general
+        models :
+            dictionary with the convergence target as key and the fitted
+            model (dictionary of NumPy arrays) as value
+        """
+        import pandas as pd
+
+        if general_keys is None:
+            general_keys = [
+                "CIT",
+                "TXADIA",
+                "MAXSKIN",
+                "COKRATE",
+                "PRESSDR",
+                "OUTLETP",
+            ]
+        self.general_keys = general_keys
+        self.regularization = regularization
+        self.min_samples = min_samples
+        self.distance_factor = distance_factor
+        self.range_margin = range_margin
+        self.features = pd.DataFrame()
+        self.targets = pd.DataFrame()
+        self.components = []
+        self.models = {}
+
+    def get_features(self):
+        return self.features
+
+    def get_targets(self):
+        return self.targets
+
+    @staticmethod
+    def get_case_features(spyro_data):
+        """get_case_features.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object of the case
+
+        Returns
+        -------
+        Series
+            feed composition in weight percent, CONOP and target_value
+        """
+        import pandas as pd
+
+        feed_comp_wt = spyro_data.feed_composition.get_feed_comp()
+        if isinstance(feed_comp_wt, pd.DataFrame):
+            # Default single row feed composition of FeedComposition
+            feed_comp_wt = feed_comp_wt.iloc[0]
+        features = feed_comp_wt.astype("float64").copy()
+        features["CONOP"] = float(spyro_data.convergence.target)
+        features["target_value"] = float(spyro_data.convergence.target_value)
+        return features
+
+    def get_case_targets(self, spyro_data):
+        """get_case_targets.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object after read_spyro_output
+
+        Returns
+        -------
+        Series
+            (effluent, component) and (general, parameter) as index
+        """
+        import pandas as pd
+
+        effluent = pd.Series(
+            spyro_data.effluent_composition.effluent["wt"], dtype="float64"
+        )
+        general = spyro_data.general_spyro.get_general_raw().reindex(
+            self.general_keys
+        )
+        return pd.concat([effluent, general], keys=["effluent", "general"])
+
+    def add_case(self, spyro_data, fit=True):
+        """add_case.
+        Adds a harvested case to the training set.
+
+        Parameters
+        ----------
+        spyro_data :
+            SpyroData object after read_spyro_output
+        fit : bool
+            refit the model of the convergence target of the case
+        """
+        self.add_cases([spyro_data], fit=fit)
+
+    def add_cases(self, spyro_cases, fit=True):
+        """add_cases.
+
+        Parameters
+        ----------
+        spyro_cases : list
+            SpyroData objects after read_spyro_output
+        fit : bool
+            refit the models of the convergence targets of the cases
+        """
+        import pandas as pd
+
+        spyro_cases = list(spyro_cases)
+        if not spyro_cases:
+            return
+        index = [spyro_data.get_file_name() for spyro_data in spyro_cases]
+        features = pd.DataFrame(
+            [self.get_case_features(spyro_data) for spyro_data in spyro_cases],
+            index=index,
+        )
+        targets = pd.DataFrame(
+            [self.get_case_targets(spyro_data) for spyro_data in spyro_cases],
+            index=index,
+        )
+        self.add_training_data(features, targets, fit=fit)
+
+    def add_training_data(self, features, targets, fit=True):
+        """add_training_data.
+
+        Parameters
+        ----------
+        features : DataFrame
+            one row per case, see get_case_features
+        targets : DataFrame
+            one row per case, see get_case_targets
+        fit : bool
+            refit the models of the convergence targets in features
+        """
+        import pandas as pd
+
+        self.features = pd.concat([self.features, features]).fillna(
+            {
+                column: 0.0
+                for column in features.columns.union(self.features.columns)
+                if column not in ["CONOP", "target_value"]
+            }
+        )
+        self.targets = pd.concat([self.targets, targets])
+        if fit:
+            for conop in features["CONOP"].unique():
+                self.fit(conop)
+
+    def fit(self, conop=None):
+        """fit.
+        Fits the kernel ridge model of one or all convergence targets on the
+        training set.
+
+        Parameters
+        ----------
+        conop : int, optional
+            convergence target, default all targets in the training set
+        """
+        import numpy as np
+
+        if conop is None:
+            for conop in self.features["CONOP"].unique():
+                self.fit(conop)
+            return
+        conop = float(conop)
+        self.components = [
+            column
+            for column in self.features.columns
+            if column not in ["CONOP", "target_value"]
+        ]
+        rows = (self.features["CONOP"] == conop).to_numpy()
+        x = self.features.loc[rows, self.components + ["target_value"]]
+        x = x.to_numpy(dtype="float64")
+        y = self.targets.loc[rows].to_numpy(dtype="float64")
+        if len(x) < self.min_samples:
+            self.models.pop(conop, None)
+            return
+
+        x_mean = x.mean(axis=0)
+        x_std = x.std(axis=0)
+        x_std[x_std == 0] = 1.0
+        x_scaled = (x - x_mean) / x_std
+        y_valid = ~np.isnan(y)
+        # Targets which were never reported (e.g. no MAXSKIN in the .eof)
+        # keep a NaN mean and are therefore predicted as NaN
+        y_count = y_valid.sum(axis=0)
+        y_mean = np.where(y_valid, y, 0.0).sum(axis=0) / np.maximum(y_count, 1)
+        y_mean[y_count == 0] = np.nan
+        y_centered = np.where(y_valid, y - np.nan_to_num(y_mean), 0.0)
+
+        sq_distances = self.get_sq_distances(x_scaled, x_scaled)
+        off_diagonal = sq_distances[~np.eye(len(x), dtype=bool)]
+        length_scale_sq = np.median(off_diagonal) or 1.0
+        kernel = np.exp(-0.5 * sq_distances / length_scale_sq)
+        alpha = np.linalg.solve(
+            kernel + self.regularization * np.eye(len(x)), y_centered
+        )
+
+        # Nearest neighbour distance of every training case to the others
+        np.fill_diagonal(sq_distances, np.inf)
+        nn_distance = np.sqrt(sq_distances.min(axis=1)).max()
+        low = x.min(axis=0)
+        high = x.max(axis=0)
+        margin = self.range_margin * np.maximum(high - low, 1e-9)
+        self.models[conop] = {
+            "columns": list(self.components) + ["target_value"],
+            "x_mean": x_mean,
+            "x_std": x_std,
+            "x_scaled": x_scaled,
+            "y_mean": y_mean,
+            "alpha": alpha,
+            "length_scale_sq": length_scale_sq,
+            "distance_threshold": self.distance_factor * nn_distance,
+            "low": low - margin,
+            "high": high + margin,
+            "target_columns": self.targets.columns,
+        }
+
+    @staticmethod
+    def get_sq_distances(a, b):
+        """Squared euclidean distances between the rows of a and b."""
+        import numpy as np
+
+        sq_distances = (
+            np.square(a).sum(axis=1)[:, None]
+            + np.square(b).sum(axis=1)[None, :]
+            - 2.0 * a @ b.T
+        )
+        return np.maximum(sq_distances, 0.0)
+
+    def predict_array(self, conop, x):
+        """predict_array.
+        NumPy prediction path without pandas overhead.
+
+        Parameters
+        ----------
+        conop : int
+            convergence target of all rows
+        x : ndarray
+            one row per case with the columns of the model of conop, see
+            get_model_columns
+
+        Returns
+        -------
+        y : ndarray
+            one row per case with the predicted targets, NaN for all rows
+            when conop has no model
+        out_of_domain : ndarray
+            boolean per case
+        """
+        import numpy as np
+
+        x = np.atleast_2d(np.asarray(x, dtype="float64"))
+        model = self.models.get(float(conop))
+        if model is None:
+            y = np.full((len(x), self.targets.shape[1]), np.nan)
+            return y, np.ones(len(x), dtype=bool)
+
+        x_scaled = (x - model["x_mean"]) / model["x_std"]
+        sq_distances = self.get_sq_distances(x_scaled, model["x_scaled"])
+        kernel = np.exp(-0.5 * sq_distances / model["length_scale_sq"])
+        y = model["y_mean"] + kernel @ model["alpha"]
+        out_of_domain = (
+            np.sqrt(sq_distances.min(axis=1)) > model["distance_threshold"]
+        ) | ((x < model["low"]) | (x > model["high"])).any(axis=1)
+        return y, out_of_domain
+
+    def get_model_columns(self, conop):
+        model = self.models.get(float(conop))
+        if model is None:
+            return []
+        return model["columns"]
+
+    def predict(self, features):
+        """predict.
+
+        Parameters
+        ----------
+        features : DataFrame
+            one row per case with the feed components in weight percent and
+            the CONOP and target_value columns, see get_case_features
+
+        Returns
+        -------
+        predictions : DataFrame
+            one row per case with column groups effluent and general
+        out_of_domain : Series
+            True for the cases outside the training domain, including
+            cases with feed components which were never trained on
+        """
+        import numpy as np
+        import pandas as pd
+
+        features = features.fillna(
+            {
+                column: 0.0
+                for column in features.columns
+                if column not in ["CONOP", "target_value"]
+            }
+        )
+        predictions = pd.DataFrame(
+            np.nan, index=features.index, columns=self.targets.columns
+        )
+        out_of_domain = np.ones(len(features), dtype=bool)
+        for conop in features["CONOP"].unique():
+            rows = (features["CONOP"] == conop).to_numpy()
+            columns = self.get_model_columns(conop)
+            if not columns:
+                continue
+            x = features.loc[rows].reindex(columns=columns, fill_value=0.0)
+            y, rows_out_of_domain = self.predict_array(conop, x.to_numpy())
+            unknown = features.loc[rows].drop(columns=columns, errors="ignore")
+            unknown = unknown.drop(columns=["CONOP"]).abs().sum(axis=1) > 0
+            predictions.loc[rows] = pd.DataFrame(
+                y,
+                index=features.index[rows],
+                columns=self.models[float(conop)]["target_columns"],
+            ).reindex(columns=self.targets.columns)
+            out_of_domain[rows] = rows_out_of_domain | unknown.to_numpy()
+
+        return predictions, pd.Series(out_of_domain, index=features.index)
+
+    def predict_or_run(
+        self, spyro_cases, max_workers=4, cache=None, write=True, fit=True
+    ):
+        """predict_or_run.
+        Predicts the cases within the training domain with the surrogate and
+        simulates only the out of domain cases with Spyro (run_spyro_batch).
+        Successfully simulated cases are added to the training set.
+
+        Parameters
+        ----------
+        spyro_cases : list
+            SpyroData objects
+        max_workers : int
+            number of Spyro cases running at the same time
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+        write : bool
+            write the case folders of the simulated cases before running
+        fit : bool
+            refit the models with the simulated cases
+
+        Returns
+        -------
+        results
+            DataFrame with the case name as index, column groups effluent
+            and general and the column (run, source) which is surrogate,
+            spyro or failed
+        """
+        import numpy as np
+        import pandas as pd
+
+        from spyro_framework.executor import run_spyro_batch
+
+        spyro_cases = {
+            spyro_data.get_file_name(): spyro_data
+            for spyro_data in spyro_cases
+        }
+        features = pd.DataFrame(
+            [
+                self.get_case_features(spyro_data)
+                for spyro_data in spyro_cases.values()
+            ],
+            index=list(spyro_cases),
+        )
+        if self.models:
+            predictions, out_of_domain = self.predict(features)
+        else:
+            predictions = pd.DataFrame(index=features.index)
+            out_of_domain = pd.Series(True, index=features.index)
+
+        simulated = []
+        for result in run_spyro_batch(
+            [spyro_cases[name] for name in out_of_domain.index[out_of_domain]],
+            max_workers=max_workers,
+            write=write,
+            harvest=True,
+            cache=cache,
+        ):
+            if not result.succeeded():
+                print(
+                    "Warning: {} could not be simulated: {}".format(
+                        result.get_file_name(), result.reason
+                    )
+                )
+                continue
+            simulated.append(result.spyro_data)
+        self.add_cases(simulated, fit=fit)
+
+        source = pd.Series(
+            np.where(out_of_domain, "failed", "surrogate"),
+            index=features.index,
+        )
+        simulated_targets = {}
+        for spyro_data in simulated:
+            simulated_targets[spyro_data.get_file_name()] = (
+                self.get_case_targets(spyro_data)
+            )
+            source[spyro_data.get_file_name()] = "spyro"
+        results = pd.concat(
+            [
+                predictions.loc[~out_of_domain.to_numpy()],
+                pd.DataFrame(simulated_targets).transpose(),
+            ]
+        ).reindex(features.index)
+        results[("run", "source")] = source
+        return results
+
+    def save(self, location):
+        """Stores the training set, the models are refit on load."""
+        import pandas as pd
+
+        pd.to_pickle(
+            {"features": self.features, "targets": self.targets}, location
+        )
+
+    def load(self, location):
+        """Reads a training set stored with save and fits the models."""
+        import pandas as pd
+
+        training_set = pd.read_pickle(location)
+        self.features = training_set["features"]
+        self.targets = training_set["targets"]
+        self.models = {}
+        if not self.features.empty:
+            self.fit()
@@ -0,0 +1,416 @@
+def grid_design(factors):
+    """grid_design.
+    Full factorial design over all levels of all factors.
+
+    Parameters
+    ----------
+    factors : dict
+        factor name as key and list of levels as value, e.g.
+        {"CONOP": [5], "CONVAL": [0.6, 0.65, 0.7], "feed": ["NI03", "NI26"]}
+
+    Returns
+    -------
+    list
+        one dictionary per case with the factor name as key
+    """
+    import itertools
+
+    names = list(factors)
+    return [
+        dict(zip(names, levels))
+        for levels in itertools.product(*[factors[name] for name in names])
+    ]
+
+
+def latin_hypercube_design(factors, n_cases, seed=None):
+    """latin_hypercube_design.
+    Latin hypercube sample of continuous factors: every factor range is
+    split in n_cases strata and every stratum is sampled exactly once.
+
+    Parameters
+    ----------
+    factors : dict
+        factor name as key and a (low, high) tuple as value
+    n_cases : int
+        number of cases
+    seed : int, optional
+        seed of the random generator for a reproducible design
+
+    Returns
+    -------
+    list
+        one dictionary per case with the factor name as key
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    names = list(factors)
+    # One random point in every stratum, shuffled independently per factor
+    unit = (
+        np.argsort(rng.random((n_cases, len(names))), axis=0)
+        + rng.random((n_cases, len(names)))
+    ) / n_cases
+    low = np.array([factors[name][0] for name in names], dtype="float64")
+    high = np.array([factors[name][1] for name in names], dtype="float64")
+    values = low + unit * (high - low)
+    return [
+        {name: float(value) for name, value in zip(names, row)}
+        for row in values
+    ]
+
+
+def list_design(cases):
+    """list_design.
+
+    Parameters
+    ----------
+    cases : list
+        dictionaries with the factor name as key, or a DataFrame with one
+        row per case
+
+    Returns
+    -------
+    list
+        one dictionary per case with the factor name as key
+    """
+    if hasattr(cases, "to_dict"):
+        return cases.to_dict(orient="records")
+    return [dict(case) for case in cases]
+
+
+def cross_design(*designs):
+    """cross_design.
+    Combines designs so that every case of one design is run with every case
+    of the others, e.g. a grid over CONOP crossed with a Latin hypercube
+    over the other factors.
+
+    Returns
+    -------
+    list
+        one dictionary per case with the factor name as key
+    """
+    import itertools
+
+    crossed = []
+    for cases in itertools.product(*designs):
+        case = {}
+        for sub_case in cases:
+            case.update(sub_case)
+        crossed.append(case)
+    return crossed
+
+
+class SpyroSweep:
+    def __init__(
+        self,
+        folder_location,
+        design,
+        base_folder="base",
+        feed_batch=None,
+        default_feed=None,
+        prefix="sweep",
+        spyro_exe_location=None,
+        spyro_exe_name=None,
+    ):
+        """Constructor
+
+        Parametric study over convergence targets, .dat parameters and feeds.
+        Every case of the design becomes a SpyroData case folder.
+
+        Recognised factor names are:
+        - CONOP: convergence target (Convergence.target)
+        - CONVAL / TEMPO: convergence value when it is the keyword of the
+          convergence target (see Convergence.target_value_keyword), a .dat
+          parameter otherwise
+        - feed: name of a sample of feed_batch or a dictionary with sample
+          names and blend weights
+        - any other name: .dat parameter, "KEYWORD.NAME" (e.g. "GEOM.TUBEL")
+          restricts the change to the blocks with that keyword
+
+        Parameters
+        ----------
+        folder_location : str
+            folder where the case folders are created, next to base_folder
+        design : list
+            one dictionary per case, e.g. the output of grid_design
+        base_folder : str
+            base folder name, default: base
+        feed_batch : FeedCompositionBatch, optional
+            transformed lab samples used by the feed factor
+        default_feed : Series or dict, optional
+            feed composition of cases without a feed factor, default 100 %
+            ethane
+        prefix : str
+            prefix of the case names, default: sweep
+        spyro_exe_location : str, optional
+            folder of the Spyro executable, default the SpyroData default
+        spyro_exe_name : str, optional
+            name of the Spyro executable, default the SpyroData default
+
+        Objects
+        -------
+        case_table :
+            DataFrame with one row per case, the case name as index and the
+            factors as columns
+        """
+        import pandas as pd
+
+        self.folder_location = folder_location
+        self.base_folder = base_folder
+        self.feed_batch = feed_batch
+        if default_feed is None:
+            default_feed = {"C2H6": 100.0}
+        self.default_feed = pd.Series(default_feed, dtype="float64")
+        self.prefix = prefix
+        self.spyro_exe_location = spyro_exe_location
+        self.spyro_exe_name = spyro_exe_name
+        design = list_design(design)
+        self.case_table = pd.DataFrame(
+            design,
+            index=["{}_{:05d}".format(prefix, i) for i in range(len(design))],
+        )
+        self.case_table.index.name = "file_name"
+        self.spyro_cases = {}
+        self.results = pd.DataFrame()
+
+    def get_case_table(self):
+        return self.case_table
+
+    def get_results(self):
+        return self.results
+
+    def get_feed(self, feed):
+        """get_feed.
+
+        Parameters
+        ----------
+        feed :
+            sample name or dictionary with sample names and blend weights
+
+        Returns
+        -------
+        Series
+            feed composition in weight percent
+        """
+        import pandas as pd
+
+        if isinstance(feed, dict):
+            feed_comp_wt = self.feed_batch.get_feed_comp()
+            weights = pd.Series(feed, dtype="float64")
+            blend = (
+                feed_comp_wt.loc[weights.index].mul(weights, axis=0).sum()
+                / weights.sum()
+            )
+            present = self.feed_batch.feed_comp_present.loc[weights.index]
+            return blend[present.any().to_numpy()]
+        return self.feed_batch.get_feed_comp(feed)
+
+    def create_case(self, file_name, case):
+        """create_case.
+
+        Parameters
+        ----------
+        file_name : str
+            name of the case
+        case : dict
+            factor name as key and level as value
+
+        Returns
+        -------
+        SpyroData
+            case with the convergence, .dat parameters and feed applied
+        """
+        import pandas as pd
+
+        from spyro_framework.spyro import SpyroData
+
+        spyro_data = SpyroData(
+            file_name, self.folder_location, base_folder=self.base_folder
+        )
+        if self.spyro_exe_location is not None:
+            spyro_data.set_spyro_exe_location(self.spyro_exe_location)
+        if self.spyro_exe_name is not None:
+            spyro_data.set_spyro_exe_name(self.spyro_exe_name)
+        case = {
+            name: level
+            for name, level in case.items()
+            if not (pd.api.types.is_scalar(level) and pd.isnull(level))
+        }
+        convergence = spyro_data.convergence
+        if "CONOP" in case:
+            convergence.target = int(case.pop("CONOP"))
+        target_keyword = convergence.target_value_keyword[convergence.target]
+        if target_keyword in case:
+            convergence.target_value = case.pop(target_keyword)
+
+        feed = case.pop("feed", None)
+        if feed is None:
+            spyro_data.feed_composition.set_feed_comp_wt(self.default_feed)
+        else:
+            spyro_data.feed_composition.set_feed_comp_wt(self.get_feed(feed))
+
+        dat_parameters = {}
+        for name, level in case.items():
+            if "." in name:
+                dat_parameters[tuple(name.split(".", 1))] = level
+            else:
+                dat_parameters[name] = level
+        spyro_data.set_dat_parameters(dat_parameters)
+
+        return spyro_data
+
+    def create_cases(self):
+        """create_cases.
+
+        Returns
+        -------
+        dict
+            case name as key and SpyroData as value
+        """
+        self.spyro_cases = {
+            file_name: self.create_case(file_name, case)
+            for file_name, case in zip(
+                self.case_table.index,
+                self.case_table.to_dict(orient="records"),
+            )
+        }
+        return self.spyro_cases
+
+    def write_cases(self, max_workers=8, link_mode=None):
+        """write_cases.
+        Writes the case folders without running them.
+
+        Parameters
+        ----------
+        max_workers : int
+            number of case folders written at the same time
+        link_mode : str, optional
+            how Pyrotec.ini is put into the case folders, see
+            SpyroData.set_asset_link_mode
+        """
+        from spyro_framework.staging import write_cases
+
+        if not self.spyro_cases:
+            self.create_cases()
+        failed = write_cases(
+            self.spyro_cases.values(), max_workers, link_mode=link_mode
+        )
+        if failed:
+            # Raise the error of the first case which could not be written
+            raise failed[0][1]
+
+    def run(
+        self,
+        max_workers=4,
+        cache=None,
+        write=True,
+        verbose=False,
+        result_store=None,
+        staging=None,
+    ):
+        """run.
+        Writes, runs and harvests all cases with at most max_workers EFPS
+        processes at the same time.
+
+        Parameters
+        ----------
+        max_workers : int
+            number of cases running at the same time
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+        write : bool
+            write the case folders before running, default True
+        verbose : bool
+            print the Spyro output and errors
+        result_store : SpyroResultStore, optional
+            store where the harvested cases are appended as they finish,
+            the batch name is the prefix of the sweep
+        staging : ScratchStaging, optional
+            run the cases in a local scratch folder, the case folders are
+            copied back when all cases are finished
+
+        Returns
+        -------
+        results
+            DataFrame with the case name as index and column groups case
+            (factors), run (status, reason, duration), effluent (weight
+            based effluent composition) and general (general Spyro output)
+        """
+        import contextlib
+
+        from spyro_framework.executor import run_spyro_batch
+
+        if not self.spyro_cases:
+            self.create_cases()
+
+        # The writer is closed on errors as well, so the buffered cases are
+        # not lost
+        if result_store is None:
+            writer_context = contextlib.nullcontext()
+        else:
+            writer_context = result_store.open_batch(self.prefix)
+
+        run_results = {}
+        with writer_context as batch_writer:
+            for result in run_spyro_batch(
+                list(self.spyro_cases.values()),
+                max_workers=max_workers,
+                write=write,
+                harvest=True,
+                verbose=verbose,
+                cache=cache,
+                staging=staging,
+            ):
+                run_results[result.get_file_name()] = result
+                if batch_writer is not None and result.succeeded():
+                    batch_writer.add(result.spyro_data)
+                if verbose:
+                    print(result)
+
+        self.results = self.collect_results(run_results)
+        return self.results
+
+    def collect_results(self, run_results):
+        """collect_results.
+
+        Parameters
+        ----------
+        run_results : dict
+            case name as key and SpyroRunResult as value
+
+        Returns
+        -------
+        results
+            DataFrame with the case table and the harvested output
+        """
+        import pandas as pd
+
+        run = {}
+        effluent = {}
+        general = {}
+        for file_name in self.case_table.index:
+            result = run_results.get(file_name)
+            if result is None:
+                continue
+            run[file_name] = {
+                "status": result.status,
+                "reason": result.reason,
+                "duration": result.duration,
+            }
+            if result.succeeded():
+                spyro_data = self.spyro_cases[file_name]
+                effluent[file_name] = spyro_data.effluent_composition.effluent[
+                    "wt"
+                ]
+                general[file_name] = spyro_data.general_spyro.get_general()
+
+        return pd.concat(
+            [
+                self.case_table,
+                pd.DataFrame.from_dict(run, orient="index"),
+                pd.DataFrame(effluent).transpose(),
+                pd.DataFrame(general).transpose(),
+            ],
+            axis=1,
+            keys=["case", "run", "effluent", "general"],
+        )
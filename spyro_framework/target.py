@@ -0,0 +1,313 @@
+class TargetMatch:
+    def __init__(
+        self,
+        folder_location,
+        parameter,
+        output,
+        target_value,
+        bounds,
+        initial=None,
+        fixed=None,
+        tolerance=0.1,
+        n_parallel=3,
+        max_rounds=8,
+        base_folder="base",
+        feed_batch=None,
+        default_feed=None,
+        prefix="target",
+        spyro_exe_location=None,
+        spyro_exe_name=None,
+    ):
+        """Constructor
+
+        Finds the value of one input (e.g. CONVAL or TEMPO) for which an
+        output of Spyro (e.g. the coil outlet temperature or the ethylene
+        yield) hits a setpoint. Every round runs n_parallel candidate cases
+        at the same time: the regula falsi (secant) estimate and speculative
+        points around it, so the bracket around the setpoint shrinks by much
+        more than one secant step per round of wall clock time. The cases of
+        every round are created and run as a SpyroSweep.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder where the case folders are created, next to base_folder
+        parameter : str
+            factor which is changed, see SpyroSweep, e.g. CONVAL, TEMPO or
+            GEOM.TUBEL
+        output : str, tuple or callable
+            output to match: a column of the sweep results as (group, name)
+            tuple, e.g. ("effluent", "C2H4"), a name which is looked up in
+            the effluent and then the general output, or a callable which
+            returns the value for a row of the sweep results
+        target_value : float
+            setpoint of the output
+        bounds : tuple
+            (lower, upper) limits of the parameter
+        initial : float, optional
+            first guess of the parameter, evaluated in the first round
+        fixed : dict, optional
+            factors which are the same for every case, e.g. {"CONOP": 5} or
+            {"feed": "sample 1"}
+        tolerance : float
+            absolute difference with target_value which counts as converged
+        n_parallel : int
+            number of cases per round
+        max_rounds : int
+            maximum number of rounds
+        base_folder, feed_batch, default_feed, spyro_exe_location,
+        spyro_exe_name :
+            see SpyroSweep
+        prefix : str
+            prefix of the case names, round r uses <prefix>_r<r>
+
+        Objects
+        -------
+        history :
+            DataFrame with one row per evaluated case: the parameter value,
+            the output value, the round and the case name
+        spyro_cases :
+            dictionary with the case name as key and the SpyroData as value
+        converged :
+            boolean, True when the setpoint was hit within the tolerance
+        """
+        import pandas as pd
+
+        self.folder_location = folder_location
+        self.parameter = parameter
+        self.output = output
+        self.target_value = target_value
+        self.bounds = (min(bounds), max(bounds))
+        self.initial = initial
+        self.fixed = dict(fixed or {})
+        self.tolerance = tolerance
+        self.n_parallel = max(int(n_parallel), 1)
+        self.max_rounds = max_rounds
+        self.sweep_options = {
+            "base_folder": base_folder,
+            "feed_batch": feed_batch,
+            "default_feed": default_feed,
+            "spyro_exe_location": spyro_exe_location,
+            "spyro_exe_name": spyro_exe_name,
+        }
+        self.prefix = prefix
+        self.history = pd.DataFrame(
+            {
+                "parameter": pd.Series(dtype="float64"),
+                "output": pd.Series(dtype="float64"),
+                "round": pd.Series(dtype="int64"),
+                "file_name": pd.Series(dtype="object"),
+            }
+        )
+        self.spyro_cases = {}
+        self.converged = False
+
+    def get_history(self):
+        return self.history
+
+    def get_output_value(self, row):
+        """get_output_value.
+
+        Parameters
+        ----------
+        row : Series
+            row of the SpyroSweep results of a case
+
+        Returns
+        -------
+        float
+            value of the output, NaN if the case failed
+        """
+        if callable(self.output):
+            return float(self.output(row))
+        if isinstance(self.output, tuple):
+            return float(row.get(self.output, float("nan")))
+        for group in ["effluent", "general"]:
+            if (group, self.output) in row.index:
+                return float(row[(group, self.output)])
+        return float("nan")
+
+    def get_best(self):
+        """Row of the history closest to the setpoint, None if empty."""
+        history = self.history.dropna(subset=["output"])
+        if history.empty:
+            return None
+        residual = (history["output"] - self.target_value).abs()
+        return history.loc[residual.idxmin()]
+
+    def propose(self):
+        """propose.
+        Candidates of the next round from all evaluated cases.
+
+        Returns
+        -------
+        list
+            parameter values which were not evaluated before, empty when no
+            new candidate can improve the result
+        """
+        import numpy as np
+
+        lower, upper = self.bounds
+        n = self.n_parallel
+        history = (
+            self.history.dropna(subset=["output"])
+            .groupby("parameter")["output"]
+            .mean()
+            .sort_index()
+        )
+        x = history.index.to_numpy(dtype="float64")
+        r = history.to_numpy(dtype="float64") - self.target_value
+
+        if len(x) == 0:
+            candidates = list(np.linspace(lower, upper, n))
+            if self.initial is not None:
+                candidates = [self.initial] + list(
+                    np.linspace(lower, upper, n - 1) if n > 2 else [upper]
+                )[: n - 1]
+        else:
+            # Adjacent evaluated points on both sides of the setpoint
+            sign_change = np.flatnonzero(r[:-1] * r[1:] <= 0)
+            if len(sign_change):
+                i = sign_change[np.argmin(np.abs(r[sign_change]))]
+                a, b = x[i], x[i + 1]
+                ra, rb = r[i], r[i + 1]
+                estimate = a - ra * (b - a) / (rb - ra) if rb != ra else a
+                width = b - a
+                offsets = [0.0] + [
+                    sign * 0.05 * k * width
+                    for k in range(1, n)
+                    for sign in [-1.0, 1.0]
+                ]
+                candidates = [
+                    min(max(estimate + offset, a), b) for offset in offsets[:n]
+                ]
+            else:
+                # Extrapolate with the secant of the two closest points
+                closest = np.argsort(np.abs(r))[:2]
+                if len(closest) == 2 and r[closest[0]] != r[closest[1]]:
+                    x0, x1 = x[closest]
+                    r0, r1 = r[closest]
+                    estimate = x0 - r0 * (x1 - x0) / (r1 - r0)
+                    step = abs(x1 - x0)
+                else:
+                    estimate = upper if r[closest[0]] < 0 else lower
+                    step = (upper - lower) / (2 * n)
+                candidates = [estimate] + [
+                    estimate + sign * 0.5 * k * step
+                    for k in range(1, n)
+                    for sign in [1.0, -1.0]
+                ][: n - 1]
+                candidates = [min(max(c, lower), upper) for c in candidates]
+
+        known = set(np.round(self.history["parameter"].to_numpy(), 12))
+        proposed = []
+        for candidate in candidates:
+            candidate = float(np.round(candidate, 12))
+            if candidate not in known and candidate not in proposed:
+                proposed.append(candidate)
+        return proposed
+
+    def evaluate(self, candidates, round_number, max_workers=None, cache=None):
+        """evaluate.
+        Runs the candidates of one round concurrently as a SpyroSweep.
+
+        Parameters
+        ----------
+        candidates : list
+            parameter values
+        round_number : int
+            number of the round, part of the case names
+        max_workers : int, optional
+            number of cases running at the same time, default all
+        cache : SpyroResultCache, optional
+            cases which were simulated before, also in earlier matches, are
+            not run again
+
+        Returns
+        -------
+        DataFrame
+            new rows of the history
+        """
+        import pandas as pd
+
+        from spyro_framework.sweep import SpyroSweep
+
+        design = [
+            dict(self.fixed, **{self.parameter: candidate})
+            for candidate in candidates
+        ]
+        sweep = SpyroSweep(
+            self.folder_location,
+            design,
+            prefix="{}_r{:02d}".format(self.prefix, round_number),
+            **self.sweep_options,
+        )
+        results = sweep.run(
+            max_workers=max_workers or len(candidates), cache=cache
+        )
+        self.spyro_cases.update(sweep.spyro_cases)
+
+        rows = []
+        for candidate, (file_name, row) in zip(candidates, results.iterrows()):
+            output = float("nan")
+            if row[("run", "status")] in ["finished", "cached"]:
+                output = self.get_output_value(row)
+            rows.append(
+                {
+                    "parameter": candidate,
+                    "output": output,
+                    "round": round_number,
+                    "file_name": file_name,
+                }
+            )
+        rows = pd.DataFrame(rows, columns=self.history.columns)
+        self.history = pd.concat(
+            [self.history, rows] if not self.history.empty else [rows],
+            ignore_index=True,
+        )
+        return rows
+
+    def run(self, max_workers=None, cache=None, verbose=False):
+        """run.
+        Evaluates rounds of candidates until the output is within the
+        tolerance of the setpoint, no new candidate is left or max_rounds
+        is reached.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            number of cases running at the same time, default n_parallel
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+        verbose : bool
+            print the candidates and outputs of every round
+
+        Returns
+        -------
+        SpyroData
+            harvested case closest to the setpoint, None if every case
+            failed. converged tells whether it is within the tolerance.
+        """
+        self.converged = False
+        for round_number in range(self.max_rounds):
+            best = self.get_best()
+            if best is not None and (
+                abs(best["output"] - self.target_value) <= self.tolerance
+            ):
+                self.converged = True
+                break
+            candidates = self.propose()
+            if not candidates:
+                break
+            rows = self.evaluate(candidates, round_number, max_workers, cache)
+            if verbose:
+                print("round {}".format(round_number))
+                print(rows)
+
+        best = self.get_best()
+        if best is None:
+            return None
+        self.converged = (
+            abs(best["output"] - self.target_value) <= self.tolerance
+        )
+        return self.spyro_cases[best["file_name"]]
@@ -0,0 +1,287 @@
+class SpyroDatTemplate:
+    def __init__(self, base_dat_location):
+        """Constructor
+
+        Parses a Spyro .dat file (e.g. base/base.dat) once into its keyword
+        blocks (KEYW=&SPEC, KEYW=&GEOM, KEYW=&NAME, ...) and parameters so
+        that new cases can be rendered from it without regular expression
+        passes over the whole file.
+
+        Parameters
+        ----------
+        base_dat_location : str
+            Path of the .dat file which is used as template
+
+        Objects
+        -------
+        lines :
+            list with a dictionary per line of the file with the raw text,
+            the keyword block it belongs to and its parameters
+        blocks :
+            list with a dictionary per keyword block with the keyword and
+            the line numbers of its parameter lines
+        parameter_index :
+            dictionary with the parameter name as key and a list of
+            (line number, parameter position) tuples as value
+        """
+        self.base_dat_location = base_dat_location
+        with open(base_dat_location, "r") as base_file:
+            self.text = base_file.read()
+        self.lines = []
+        self.blocks = []
+        self.parameter_index = {}
+        self.parse(self.text)
+
+    def parse(self, text):
+        """parse.
+
+        Parameters
+        ----------
+        text : str
+            Content of a Spyro .dat file
+        """
+        for line_number, raw in enumerate(text.split("\n")):
+            line = {
+                "raw": raw,
+                "block": len(self.blocks) - 1,
+                "indent": raw[: len(raw) - len(raw.lstrip())],
+                "params": [],
+                "trailing_comma": False,
+                "continuation": False,
+                "end": False,
+            }
+            content = raw.strip()
+            if content.startswith("KEYW="):
+                self.blocks.append(
+                    {"keyword": content[len("KEYW=&") :], "lines": []}
+                )
+                line["block"] = len(self.blocks) - 1
+                line["keyword_line"] = True
+                self.lines.append(line)
+                continue
+
+            line["keyword_line"] = False
+            if content.endswith("*"):
+                line["continuation"] = True
+                content = content[:-1].rstrip()
+            if content.endswith(","):
+                line["trailing_comma"] = True
+            for token in content.split(","):
+                token = token.strip()
+                if not token:
+                    continue
+                if token == "END":
+                    line["end"] = True
+                    continue
+                name, _, value = token.partition("=")
+                self.parameter_index.setdefault(name.strip(), []).append(
+                    (line_number, len(line["params"]))
+                )
+                line["params"].append([name.strip(), value.strip()])
+            if line["block"] >= 0 and content:
+                self.blocks[line["block"]]["lines"].append(line_number)
+            self.lines.append(line)
+
+    def get_keywords(self):
+        return [block["keyword"] for block in self.blocks]
+
+    def get_parameter(self, name, keyword=None):
+        """get_parameter.
+
+        Parameters
+        ----------
+        name : str
+            Parameter name, e.g. CONVAL
+        keyword : str, optional
+            Only look in blocks with this keyword, e.g. GEOM
+
+        Returns
+        -------
+        list
+            values (as strings) of all occurrences of the parameter
+        """
+        return [
+            self.lines[line_number]["params"][position][1]
+            for line_number, position in self.find_parameter(name, keyword)
+        ]
+
+    def find_parameter(self, name, keyword=None):
+        positions = self.parameter_index.get(name, [])
+        if keyword is not None:
+            positions = [
+                (line_number, position)
+                for line_number, position in positions
+                if self.blocks[self.lines[line_number]["block"]]["keyword"]
+                == keyword
+            ]
+        return positions
+
+    @staticmethod
+    def render_line(line, params):
+        """Renders a parameter line in the Spyro .dat layout."""
+        rendered = ", ".join(
+            "{}={}".format(name, value) for name, value in params
+        )
+        if line["end"]:
+            rendered += ", END" if rendered else "END"
+        if line["trailing_comma"]:
+            rendered += ","
+        if line["continuation"]:
+            rendered += "*"
+        return line["indent"] + rendered
+
+    @staticmethod
+    def render_name_block(feed_comp_wt_dct, width=72, indent="    "):
+        """render_name_block.
+        Renders the parameter lines of the KEYW=&NAME block with the same
+        layout as SpyroData.create_naphtha_line.
+
+        Parameters
+        ----------
+        feed_comp_wt_dct : dict
+            SPYRO component name as key and weight percent as value
+        width : int
+            maximum width of a line without indentation, default 72
+
+        Returns
+        -------
+        list
+            lines of the block, continuation lines end with *
+        """
+        lines = []
+        current = ""
+        for key, value in feed_comp_wt_dct.items():
+            word = "{}={:05f},".format(key, value)
+            if current and len(current) + 1 + len(word) > width:
+                lines.append(current)
+                current = word
+            else:
+                current = "{} {}".format(current, word) if current else word
+        lines.append(current)
+        lines = [indent + line + "*" for line in lines[:-1]] + [
+            indent + lines[-1][:-1] + ", END"
+        ]
+        return lines
+
+    def render(self, parameters=None, feed_composition=None):
+        """render.
+
+        Parameters
+        ----------
+        parameters : dict, optional
+            New parameter values. The key is either the parameter name,
+            which changes every occurrence (e.g. "CONOP"), or a
+            (keyword, name) tuple which only changes the occurrences in the
+            blocks with that keyword (e.g. ("GEOM", "TEMPO")).
+        feed_composition : dict or Series, optional
+            SPYRO component name as key and weight percent as value, replaces
+            the content of the KEYW=&NAME block
+
+        Returns
+        -------
+        str
+            Content of the new .dat file
+
+        Raises
+        ------
+        KeyError
+            If a parameter does not exist in the template.
+        """
+        changed_lines = {}
+        for key, value in (parameters or {}).items():
+            if isinstance(key, tuple):
+                keyword, name = key
+            else:
+                keyword, name = None, key
+            positions = self.find_parameter(name, keyword)
+            if not positions:
+                raise KeyError(
+                    "Parameter {} not found in {}".format(
+                        key, self.base_dat_location
+                    )
+                )
+            for line_number, position in positions:
+                if line_number not in changed_lines:
+                    changed_lines[line_number] = [
+                        list(param)
+                        for param in self.lines[line_number]["params"]
+                    ]
+                changed_lines[line_number][position][1] = "{}".format(value)
+
+        name_lines = set()
+        name_block_start = None
+        if feed_composition is not None:
+            if hasattr(feed_composition, "to_dict"):
+                feed_composition = feed_composition.to_dict()
+            for block in self.blocks:
+                if block["keyword"] == "NAME":
+                    name_lines = set(block["lines"])
+                    name_block_start = min(block["lines"])
+                    break
+            if name_block_start is None:
+                raise KeyError(
+                    "KEYW=&NAME not found in {}".format(self.base_dat_location)
+                )
+
+        rendered_lines = []
+        for line_number, line in enumerate(self.lines):
+            if line_number in name_lines:
+                if line_number == name_block_start:
+                    rendered_lines += self.render_name_block(
+                        feed_composition, indent=line["indent"]
+                    )
+            elif line_number in changed_lines:
+                rendered_lines.append(
+                    self.render_line(line, changed_lines[line_number])
+                )
+            else:
+                rendered_lines.append(line["raw"])
+
+        return "\n".join(rendered_lines)
+
+    def write(self, destination, parameters=None, feed_composition=None):
+        """write.
+        Renders a case and writes it to destination in a single write.
+
+        Parameters
+        ----------
+        destination : str
+            Path of the new .dat file
+        parameters : dict, optional
+            New parameter values, see render
+        feed_composition : dict or Series, optional
+            New content of the KEYW=&NAME block, see render
+        """
+        f_str = self.render(parameters, feed_composition)
+        with open(destination, "w") as dat_file:
+            dat_file.write(f_str)
+
+
+# Parsed templates shared by all cases, see load_dat_template
+_dat_templates = {}
+
+
+def load_dat_template(base_dat_location):
+    """load_dat_template.
+    Returns the parsed template of a .dat file. The template is parsed once
+    per process and reparsed only when the file changes.
+
+    Parameters
+    ----------
+    base_dat_location : str
+        Path of the .dat file which is used as template
+
+    Returns
+    -------
+    SpyroDatTemplate
+    """
+    import os
+
+    stat = os.stat(base_dat_location)
+    key = os.path.abspath(base_dat_location)
+    signature = (stat.st_size, stat.st_mtime_ns)
+    cached = _dat_templates.get(key)
+    if cached is None or cached[0] != signature:
+        cached = (signature, SpyroDatTemplate(base_dat_location))
+        _dat_templates[key] = cached
+    return cached[1]
@@ -0,0 +1,379 @@
+# Reason code and pattern of EFPS messages which doom a run, checked in
+# this order. The messages are written to the .msg and .OUT files (and
+# stdout) while EFPS is running, e.g. NI82.
+FAILURE_PATTERNS = [
+    ("security", r"ERROR SECURITY \d+|TERMINATED DUE TO SECURITY PROBLEM"),
+    ("terminated", r"PROGRAM HAS BEEN TERMINATED"),
+    ("nonconvergence", r"CONVERGENCE NOT REACHED"),
+    ("crash", r"forrtl: severe|Program Exception"),
+]
+# Extension of the marker file of a failed case, see mark_case_failed
+FAILED_MARKER = ".failed"
+
+
+def classify_line(line, patterns=None):
+    """classify_line.
+
+    Parameters
+    ----------
+    line : str
+        line of EFPS output
+    patterns : list, optional
+        (reason code, regular expression) tuples, default FAILURE_PATTERNS
+
+    Returns
+    -------
+    str or None
+        reason code of the first matching pattern, None if the line is fine
+    """
+    import re
+
+    for reason_code, pattern in patterns or FAILURE_PATTERNS:
+        if re.search(pattern, line):
+            return reason_code
+    return None
+
+
+def get_marker_location(folder_location, file_name):
+    import os
+
+    return os.path.join(folder_location, file_name, file_name + FAILED_MARKER)
+
+
+def mark_case_failed(folder_location, file_name, reason_code, detail=None):
+    """mark_case_failed.
+    Writes <case>/<case>.failed so that harvesters skip the case, the .eof
+    of a doomed run is left over from an earlier run or garbage (e.g. the
+    -273.150 temperatures of NI82).
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    file_name : str
+        name of the case
+    reason_code : str
+        e.g. security, nonconvergence or timeout
+    detail : str, optional
+        line which triggered the failure
+    """
+    import json
+    import time
+
+    with open(get_marker_location(folder_location, file_name), "w") as marker:
+        json.dump(
+            {"reason": reason_code, "detail": detail, "time": time.time()},
+            marker,
+        )
+
+
+def get_case_failure(folder_location, file_name):
+    """get_case_failure.
+
+    Returns
+    -------
+    dict or None
+        content of the failed marker (reason, detail, time), None if the
+        case is not marked as failed
+    """
+    import json
+
+    try:
+        with open(get_marker_location(folder_location, file_name)) as marker:
+            return json.load(marker)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        return {"reason": "unknown", "detail": None, "time": None}
+
+
+def clear_case_failure(folder_location, file_name):
+    import os
+
+    try:
+        os.remove(get_marker_location(folder_location, file_name))
+    except FileNotFoundError:
+        pass
+
+
+def check_case_output(folder_location, file_name, patterns=None, mark=True):
+    """check_case_output.
+    Classifies the complete .msg and .OUT files of a case which ran
+    without watchdog, e.g. the checked-in NI82.
+
+    Parameters
+    ----------
+    folder_location : str
+        folder with the case folders
+    file_name : str
+        name of the case
+    patterns : list, optional
+        (reason code, regular expression) tuples, default
+        FAILURE_PATTERNS
+    mark : bool
+        write the failed marker of a failed case
+
+    Returns
+    -------
+    str or None
+        reason code of the failure, None if the output is fine
+    """
+    import os
+
+    for extension in [".msg", ".OUT"]:
+        location = os.path.join(
+            folder_location, file_name, file_name + extension
+        )
+        if not os.path.isfile(location):
+            continue
+        with open(location, "r", errors="replace") as output_file:
+            for line in output_file:
+                reason_code = classify_line(line, patterns)
+                if reason_code is not None:
+                    if mark:
+                        mark_case_failed(
+                            folder_location,
+                            file_name,
+                            reason_code,
+                            line.strip(),
+                        )
+                    return reason_code
+    return None
+
+
+class RunWatchdog:
+    def __init__(
+        self,
+        folder_location,
+        file_name,
+        patterns=None,
+        extensions=None,
+        poll_interval=0.5,
+    ):
+        """Constructor
+
+        Tails the .msg and .OUT files of a running case and classifies new
+        lines with FAILURE_PATTERNS. The files of an earlier run are removed
+        (EFPS writes them anew) so everything read is output of the new
+        run, even when it rewrites a file with the same size within the
+        modification time granularity. Create the watchdog right before
+        starting EFPS. A failed marker of an earlier run is removed as
+        well.
+
+        Parameters
+        ----------
+        folder_location : str
+            folder with the case folders
+        file_name : str
+            name of the case
+        patterns : list, optional
+            (reason code, regular expression) tuples, default
+            FAILURE_PATTERNS
+        extensions : list, optional
+            files which are tailed, default .msg and .OUT
+        poll_interval : float
+            seconds between two polls, see run_spyro_watched
+
+        Objects
+        -------
+        reason_code :
+            reason code of the first failure, None while the run is fine
+        detail :
+            line which triggered the failure
+        """
+        import os
+
+        self.folder_location = folder_location
+        self.file_name = file_name
+        self.patterns = patterns or FAILURE_PATTERNS
+        if extensions is None:
+            extensions = [".msg", ".OUT"]
+        self.poll_interval = poll_interval
+        self.reason_code = None
+        self.detail = None
+        # File location -> inode, offset and the partial last line
+        self.files = {}
+        for extension in extensions:
+            location = os.path.join(
+                folder_location, file_name, file_name + extension
+            )
+            try:
+                os.remove(location)
+            except FileNotFoundError:
+                pass
+            self.files[location] = {
+                "inode": None,
+                "offset": 0,
+                "partial": "",
+            }
+        clear_case_failure(folder_location, file_name)
+
+    @staticmethod
+    def get_signature(location):
+        import os
+
+        try:
+            stat = os.stat(location)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def get_reason_code(self):
+        return self.reason_code
+
+    def read_new_lines(self, location, final=False):
+        """read_new_lines.
+
+        Parameters
+        ----------
+        location : str
+            path of a tailed file
+        final : bool
+            also return the last line without newline, after the run
+
+        Returns
+        -------
+        list
+            complete lines written since the previous call
+        """
+        signature = self.get_signature(location)
+        tailed = self.files[location]
+        if signature is None:
+            return []
+        if signature[0] != tailed["inode"] or signature[1] < tailed["offset"]:
+            # Replaced or truncated
+            tailed["inode"] = signature[0]
+            tailed["offset"] = 0
+            tailed["partial"] = ""
+        with open(location, "rb") as tailed_file:
+            tailed_file.seek(tailed["offset"])
+            data = tailed_file.read()
+        tailed["offset"] += len(data)
+        lines = (tailed["partial"] + data.decode(errors="replace")).split("\n")
+        tailed["partial"] = lines.pop()
+        if final and tailed["partial"]:
+            lines.append(tailed["partial"])
+            tailed["partial"] = ""
+        return lines
+
+    def check_lines(self, lines):
+        """Classifies lines, the first failure is kept."""
+        if self.reason_code is not None:
+            return self.reason_code
+        for line in lines:
+            reason_code = classify_line(line, self.patterns)
+            if reason_code is not None:
+                self.reason_code = reason_code
+                self.detail = line.strip()
+                break
+        return self.reason_code
+
+    def poll(self, final=False):
+        """poll.
+
+        Parameters
+        ----------
+        final : bool
+            True for the check after the process has finished
+
+        Returns
+        -------
+        str or None
+            reason code of the failure, None if the run is fine so far
+        """
+        for location in self.files:
+            if self.check_lines(self.read_new_lines(location, final)):
+                break
+        return self.reason_code
+
+    def mark_failed(self, reason_code=None):
+        """Writes the failed marker with the reason code of the failure."""
+        if reason_code is not None and self.reason_code is None:
+            self.reason_code = reason_code
+        mark_case_failed(
+            self.folder_location,
+            self.file_name,
+            self.reason_code,
+            self.detail,
+        )
+
+
+def run_spyro_watched(spyro_data, watchdog=None, timeout=None):
+    """run_spyro_watched.
+    Runs EFPS like SpyroData.run_spyro while a RunWatchdog tails its output.
+    The process is killed as soon as a fatal message appears, when it
+    exceeds the timeout, or when its output contains a failure after it
+    ended, and the case is then marked as failed.
+
+    Parameters
+    ----------
+    spyro_data : SpyroData
+        case to run, its case folder must exist
+    watchdog : RunWatchdog, optional
+        default a RunWatchdog with the default patterns
+    timeout : float, optional
+        maximum wall clock time in seconds
+
+    Returns
+    -------
+    returncode : int
+        exit code of EFPS, None when it was killed
+    reason_code : str or None
+        reason code of the failure, None if the run is fine
+    """
+    import os
+    import subprocess
+    import time
+
+    from spyro_framework.executor import _kill_process
+    from spyro_framework.metrics import count, span
+
+    if watchdog is None:
+        watchdog = RunWatchdog(
+            spyro_data.get_folder_location(), spyro_data.get_file_name()
+        )
+    start = time.perf_counter()
+    with span("efps_run", spyro_data.get_file_name()):
+        process = subprocess.Popen(
+            [spyro_data.spyro_exe_loc_name, spyro_data.file_name + ".dat"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=os.path.join(spyro_data.folder_location, spyro_data.file_name),
+            start_new_session=os.name == "posix",
+        )
+        stdout, stderr = b"", b""
+        while True:
+            try:
+                stdout, stderr = process.communicate(
+                    timeout=watchdog.poll_interval
+                )
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if watchdog.poll() is not None:
+                break
+            if timeout is not None and time.perf_counter() - start > timeout:
+                watchdog.reason_code = "timeout"
+                watchdog.detail = "timeout after {} s".format(timeout)
+                break
+        if process.returncode is None:
+            _kill_process(process)
+            stdout, stderr = process.communicate()
+            returncode = None
+        else:
+            returncode = process.returncode
+
+    spyro_data.spyro_stdout = stdout.decode(errors="replace")
+    spyro_data.spyro_stderr = stderr.decode(errors="replace")
+    spyro_data.spyro_returncode = returncode
+    watchdog.poll(final=True)
+    watchdog.check_lines(
+        (spyro_data.spyro_stdout + "\n" + spyro_data.spyro_stderr).split("\n")
+    )
+    if watchdog.reason_code is not None:
+        watchdog.mark_failed()
+        count(
+            "watchdog_{}".format(watchdog.reason_code),
+            case=spyro_data.file_name,
+        )
+    return returncode, watchdog.reason_code
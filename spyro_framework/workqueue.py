@@ -0,0 +1,750 @@
+class WorkQueue:
+    def __init__(self, queue_folder, lease_time=300.0, max_attempts=3):
+        """Constructor
+
+        Work queue of Spyro cases on a shared filesystem. A coordinator
+        submits batch manifests and any number of QueueWorker processes, on
+        any node which sees the same folder, claim the cases one at a time.
+
+        A claim is a lease file created with O_CREAT | O_EXCL, so exactly
+        one worker gets it. The worker renews the lease while the case runs
+        and writes a result file when it is done. A lease which is not
+        renewed in time (crashed worker or node) expires: the case is
+        claimed again, up to max_attempts times. All files are written
+        under a temporary name and renamed, readers never see partial files.
+
+        Layout of queue_folder:
+        - batches/<batch>.json: manifest with the cases of a batch
+        - leases/<batch>/<case>.lease: claimed cases
+        - results/<batch>/<case>.json: finished cases
+
+        Parameters
+        ----------
+        queue_folder : str
+            shared folder of the queue, created when missing
+        lease_time : float
+            seconds a lease is valid without renewal
+        max_attempts : int
+            number of expired leases after which a case counts as failed
+        """
+        import os
+
+        self.queue_folder = queue_folder
+        self.lease_time = lease_time
+        self.max_attempts = max_attempts
+        for folder in ["batches", "leases", "results"]:
+            os.makedirs(os.path.join(queue_folder, folder), exist_ok=True)
+
+    @staticmethod
+    def write_json(location, content):
+        """Writes a json file atomically."""
+        import json
+        import os
+        import uuid
+
+        tmp_location = "{}.{}.tmp".format(location, uuid.uuid4().hex)
+        with open(tmp_location, "w") as json_file:
+            json.dump(content, json_file)
+        os.replace(tmp_location, location)
+
+    @staticmethod
+    def read_json(location):
+        """Reads a json file, None if it does not exist (anymore)."""
+        import json
+
+        try:
+            with open(location, "r") as json_file:
+                return json.load(json_file)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def get_manifest_location(self, batch):
+        import os
+
+        return os.path.join(self.queue_folder, "batches", batch + ".json")
+
+    def get_lease_location(self, batch, file_name):
+        import os
+
+        return os.path.join(
+            self.queue_folder, "leases", batch, file_name + ".lease"
+        )
+
+    def get_result_location(self, batch, file_name):
+        import os
+
+        return os.path.join(
+            self.queue_folder, "results", batch, file_name + ".json"
+        )
+
+    def get_batches(self):
+        import os
+
+        return sorted(
+            name[: -len(".json")]
+            for name in os.listdir(os.path.join(self.queue_folder, "batches"))
+            if name.endswith(".json")
+        )
+
+    def get_manifest(self, batch):
+        return self.read_json(self.get_manifest_location(batch))
+
+    @staticmethod
+    def describe_case(spyro_data):
+        """describe_case.
+
+        Parameters
+        ----------
+        spyro_data : SpyroData
+            case with a written case folder
+
+        Returns
+        -------
+        dict
+            everything a worker needs to recreate the SpyroData
+        """
+        import os
+
+        return {
+            "file_name": spyro_data.get_file_name(),
+            "folder_location": os.path.abspath(
+                spyro_data.get_folder_location()
+            ),
+            "base_folder": os.path.relpath(
+                spyro_data.base_folder, spyro_data.get_folder_location()
+            ),
+            "spyro_exe_location": spyro_data.get_spyro_exe_location(),
+            "spyro_exe_name": spyro_data.spyro_exe_name,
+        }
+
+    @staticmethod
+    def create_case(case):
+        """Recreates the SpyroData of a case of a manifest."""
+        from spyro_framework.spyro import SpyroData
+
+        spyro_data = SpyroData(
+            case["file_name"],
+            case["folder_location"],
+            base_folder=case["base_folder"],
+        )
+        spyro_data.set_spyro_exe_name(case["spyro_exe_name"])
+        spyro_data.set_spyro_exe_location(case["spyro_exe_location"])
+        return spyro_data
+
+    def submit(self, spyro_cases, batch):
+        """submit.
+        Writes the manifest of a batch, the case folders must be written
+        (write_spyro or spyro render) on the shared filesystem.
+
+        Parameters
+        ----------
+        spyro_cases : list
+            SpyroData objects or case dictionaries (see describe_case)
+        batch : str
+            name of the batch, an existing batch is extended
+
+        Returns
+        -------
+        int
+            number of cases in the batch
+        """
+        import os
+        import time
+
+        cases = {}
+        manifest = self.get_manifest(batch)
+        if manifest is not None:
+            cases = {case["file_name"]: case for case in manifest["cases"]}
+        for spyro_data in spyro_cases:
+            case = spyro_data
+            if not isinstance(case, dict):
+                case = self.describe_case(spyro_data)
+            cases[case["file_name"]] = case
+        os.makedirs(
+            os.path.join(self.queue_folder, "leases", batch), exist_ok=True
+        )
+        os.makedirs(
+            os.path.join(self.queue_folder, "results", batch), exist_ok=True
+        )
+        self.write_json(
+            self.get_manifest_location(batch),
+            {
+                "batch": batch,
+                "submitted_at": time.time(),
+                "cases": list(cases.values()),
+            },
+        )
+        return len(cases)
+
+    def claim(self, batch, file_name, worker_id):
+        """claim.
+        Takes the lease of a case. An expired lease is broken first by
+        renaming it, which only one worker can do.
+
+        Parameters
+        ----------
+        batch : str
+            name of the batch
+        file_name : str
+            name of the case
+        worker_id : str
+            name of the worker, e.g. <host>-<pid>
+
+        Returns
+        -------
+        dict or None
+            the lease (worker, attempt, expires), None if the case is done
+            or leased by another worker
+        """
+        import json
+        import os
+        import time
+
+        if os.path.exists(self.get_result_location(batch, file_name)):
+            return None
+        lease_location = self.get_lease_location(batch, file_name)
+        attempt = 1
+        if os.path.exists(lease_location):
+            old_lease = self.read_json(lease_location)
+            if old_lease is None:
+                # Being written, or the claiming worker died before writing
+                try:
+                    modified = os.stat(lease_location).st_mtime
+                except FileNotFoundError:
+                    return None
+                if modified + self.lease_time > time.time():
+                    return None
+                old_lease = {"worker": "unknown", "attempt": 1, "expires": 0}
+            elif old_lease["expires"] > time.time():
+                return None
+            broken_location = "{}.{}.broken".format(lease_location, worker_id)
+            try:
+                os.rename(lease_location, broken_location)
+            except FileNotFoundError:
+                return None
+            broken_lease = self.read_json(broken_location)
+            if broken_lease is not None and broken_lease != old_lease:
+                # Another worker renewed or claimed it in the meantime. A
+                # link never replaces a lease which a third worker created
+                # while it was renamed away, a rename would on posix.
+                try:
+                    os.link(broken_location, lease_location)
+                except FileExistsError:
+                    # Lost to the new lease, its worker runs the case
+                    pass
+                os.remove(broken_location)
+                return None
+            os.remove(broken_location)
+            # Leases released by requeue_expired already count the attempt
+            attempt = old_lease["attempt"] + (old_lease["worker"] is not None)
+            if attempt > self.max_attempts:
+                self.write_json(
+                    self.get_result_location(batch, file_name),
+                    {
+                        "file_name": file_name,
+                        "status": "failed",
+                        "reason": "lease expired {} times".format(attempt - 1),
+                        "failure_code": "lease_expired",
+                        "worker": old_lease["worker"],
+                        "attempt": old_lease["attempt"],
+                    },
+                )
+                return None
+
+        lease = {
+            "worker": worker_id,
+            "attempt": attempt,
+            "expires": time.time() + self.lease_time,
+        }
+        try:
+            descriptor = os.open(
+                lease_location, os.O_CREAT | os.O_EXCL | os.O_WRONLY
+            )
+        except FileExistsError:
+            return None
+        with os.fdopen(descriptor, "w") as lease_file:
+            json.dump(lease, lease_file)
+        return lease
+
+    def renew(self, batch, file_name, lease):
+        """renew.
+        Extends a lease which is still held by the worker.
+
+        Returns
+        -------
+        bool
+            False when the lease was lost (expired and claimed by another
+            worker)
+        """
+        import time
+
+        lease_location = self.get_lease_location(batch, file_name)
+        current = self.read_json(lease_location)
+        # A worker which checks whether the lease expired renames it away
+        # for a moment, wait until it is restored
+        deadline = time.time() + 1.0
+        while current is None and time.time() < deadline:
+            time.sleep(0.05)
+            current = self.read_json(lease_location)
+        if current is None or current["worker"] != lease["worker"]:
+            return False
+        lease["expires"] = time.time() + self.lease_time
+        self.write_json(lease_location, lease)
+        return True
+
+    def complete(self, batch, file_name, result):
+        """Writes the result of a case and releases its lease."""
+        import os
+
+        self.write_json(self.get_result_location(batch, file_name), result)
+        try:
+            os.remove(self.get_lease_location(batch, file_name))
+        except FileNotFoundError:
+            pass
+
+    def requeue_expired(self, batch=None):
+        """requeue_expired.
+        Releases expired leases so their cases show up as pending again.
+        Workers also break expired leases themselves when they claim a
+        case, this is for a coordinator which watches the status.
+
+        Parameters
+        ----------
+        batch : str, optional
+            default all batches
+
+        Returns
+        -------
+        list
+            (batch, case name) tuples which were re-queued
+        """
+        import os
+        import time
+
+        requeued = []
+        for batch in [batch] if batch is not None else self.get_batches():
+            lease_folder = os.path.join(self.queue_folder, "leases", batch)
+            if not os.path.isdir(lease_folder):
+                continue
+            for name in os.listdir(lease_folder):
+                if not name.endswith(".lease"):
+                    continue
+                file_name = name[: -len(".lease")]
+                lease = self.read_json(os.path.join(lease_folder, name))
+                if (
+                    lease is None
+                    or lease["worker"] is None
+                    or lease["expires"] > time.time()
+                ):
+                    continue
+                # The expired attempt counts, see claim
+                self.write_json(
+                    os.path.join(lease_folder, name),
+                    {
+                        "worker": None,
+                        "attempt": lease["attempt"] + 1,
+                        "expires": 0,
+                    },
+                )
+                requeued.append((batch, file_name))
+        return requeued
+
+    def get_status(self, batch):
+        """get_status.
+
+        Returns
+        -------
+        dict
+            number of pending, leased, expired, finished and failed cases
+        """
+        import os
+        import time
+
+        manifest = self.get_manifest(batch) or {"cases": []}
+        status = {
+            "pending": 0,
+            "leased": 0,
+            "expired": 0,
+            "finished": 0,
+            "failed": 0,
+        }
+        for case in manifest["cases"]:
+            file_name = case["file_name"]
+            result = self.read_json(self.get_result_location(batch, file_name))
+            if result is not None:
+                if result["status"] in ["finished", "cached"]:
+                    status["finished"] += 1
+                else:
+                    status["failed"] += 1
+                continue
+            lease_location = self.get_lease_location(batch, file_name)
+            if not os.path.exists(lease_location):
+                status["pending"] += 1
+                continue
+            lease = self.read_json(lease_location)
+            if lease is not None and lease["worker"] is None:
+                status["pending"] += 1
+            elif lease is not None and lease["expires"] <= time.time():
+                status["expired"] += 1
+            else:
+                status["leased"] += 1
+        return status
+
+    def is_done(self, batch):
+        status = self.get_status(batch)
+        return status["finished"] + status["failed"] == sum(status.values())
+
+    def wait(self, batch, poll_interval=1.0, timeout=None):
+        """Waits until every case of a batch has a result, returns the
+        status."""
+        import time
+
+        start = time.perf_counter()
+        while not self.is_done(batch):
+            if timeout is not None and time.perf_counter() - start > timeout:
+                break
+            time.sleep(poll_interval)
+        return self.get_status(batch)
+
+    def get_results(self, batch):
+        """get_results.
+
+        Returns
+        -------
+        DataFrame
+            case name as index with column groups run (status, reason,
+            failure_code, duration, worker, attempt) and, for harvesting
+            workers, effluent (weight based) and general (original names)
+        """
+        import pandas as pd
+
+        manifest = self.get_manifest(batch) or {"cases": []}
+        run = {}
+        effluent = {}
+        general = {}
+        for case in manifest["cases"]:
+            file_name = case["file_name"]
+            result = self.read_json(self.get_result_location(batch, file_name))
+            if result is None:
+                continue
+            effluent[file_name] = result.pop("effluent", None) or {}
+            general[file_name] = result.pop("general", None) or {}
+            result.pop("file_name", None)
+            run[file_name] = result
+        return pd.concat(
+            [
+                pd.DataFrame.from_dict(run, orient="index"),
+                pd.DataFrame.from_dict(effluent, orient="index"),
+                pd.DataFrame.from_dict(general, orient="index"),
+            ],
+            axis=1,
+            keys=["run", "effluent", "general"],
+        )
+
+
+class QueueWorker:
+    def __init__(
+        self,
+        work_queue,
+        worker_id=None,
+        max_workers=1,
+        harvest=True,
+        watchdog=True,
+        cache=None,
+        poll_interval=1.0,
+    ):
+        """Constructor
+
+        Claims and runs cases of a WorkQueue until the queue is empty.
+
+        Parameters
+        ----------
+        work_queue : WorkQueue
+            queue on the shared filesystem
+        worker_id : str, optional
+            default <host>-<pid>
+        max_workers : int
+            number of cases this worker runs at the same time
+        harvest : bool
+            read the .eof output and store the weight based effluent and
+            general output in the result file
+        watchdog : bool
+            kill and mark doomed runs early, see run_spyro_case
+        cache : SpyroResultCache, optional
+            cache to skip cases which were simulated before
+        poll_interval : float
+            seconds between two scans of an idle queue
+        """
+        import os
+        import socket
+
+        self.work_queue = work_queue
+        if worker_id is None:
+            worker_id = "{}-{}".format(socket.gethostname(), os.getpid())
+        self.worker_id = worker_id
+        self.max_workers = max_workers
+        self.harvest = harvest
+        self.watchdog = watchdog
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self.n_done = 0
+
+    def claim_next(self):
+        """claim_next.
+
+        Returns
+        -------
+        tuple or None
+            (batch, case dictionary, lease) of a claimed case, None if no
+            case is available
+        """
+        import os
+        import random
+
+        for batch in self.work_queue.get_batches():
+            manifest = self.work_queue.get_manifest(batch)
+            if manifest is None:
+                continue
+            done = set(
+                name[: -len(".json")]
+                for name in os.listdir(
+                    os.path.join(
+                        self.work_queue.queue_folder, "results", batch
+                    )
+                )
+                if name.endswith(".json")
+            )
+            cases = [
+                case
+                for case in manifest["cases"]
+                if case["file_name"] not in done
+            ]
+            # Workers start at different places to avoid contention
+            random.shuffle(cases)
+            for case in cases:
+                lease = self.work_queue.claim(
+                    batch, case["file_name"], self.worker_id
+                )
+                if lease is not None:
+                    return batch, case, lease
+        return None
+
+    def process(self, batch, case, lease):
+        """process.
+        Runs a claimed case while a thread renews its lease, and writes the
+        result back. An exception while the case is created, run or
+        harvested gives a failed result.
+
+        Returns
+        -------
+        dict
+            the result of the case
+        """
+        import threading
+
+        from spyro_framework.executor import run_spyro_case
+
+        file_name = case["file_name"]
+        stop = threading.Event()
+        lost = threading.Event()
+
+        def renew():
+            while not stop.wait(self.work_queue.lease_time / 3):
+                if not self.work_queue.renew(batch, file_name, lease):
+                    lost.set()
+                    return
+
+        result = {
+            "file_name": file_name,
+            "status": "failed",
+            "reason": None,
+            "failure_code": None,
+            "duration": None,
+            "worker": self.worker_id,
+            "attempt": lease["attempt"],
+        }
+        renewer = threading.Thread(target=renew, daemon=True)
+        renewer.start()
+        try:
+            spyro_data = self.work_queue.create_case(case)
+            run_result = run_spyro_case(
+                spyro_data,
+                harvest=self.harvest,
+                cache=self.cache,
+                watchdog=self.watchdog,
+            )
+            result.update(
+                {
+                    "status": run_result.status,
+                    "reason": run_result.reason,
+                    "failure_code": run_result.failure_code,
+                    "duration": run_result.duration,
+                }
+            )
+            if self.harvest and run_result.succeeded():
+                result["effluent"] = (
+                    spyro_data.effluent_composition.effluent["wt"]
+                    .astype(float)
+                    .to_dict()
+                )
+                result["general"] = (
+                    spyro_data.general_spyro.get_general_raw()
+                    .astype(float)
+                    .to_dict()
+                )
+        except Exception as error:
+            # The case fails on its own instead of stopping the worker
+            result.pop("effluent", None)
+            result.pop("general", None)
+            result["status"] = "failed"
+            result["reason"] = "{}: {}".format(type(error).__name__, error)
+        finally:
+            stop.set()
+            renewer.join()
+
+        if lost.is_set():
+            # Another worker took over the expired lease, it writes the
+            # result
+            return result
+        self.work_queue.complete(batch, file_name, result)
+        return result
+
+    def run(self, max_cases=None, stop_when_empty=True, verbose=False):
+        """run.
+
+        Parameters
+        ----------
+        max_cases : int, optional
+            stop after this number of cases
+        stop_when_empty : bool
+            stop when no case can be claimed, otherwise keep polling
+        verbose : bool
+            print every finished case
+
+        Returns
+        -------
+        int
+            number of cases processed by this worker
+        """
+        import time
+        from concurrent.futures import (
+            FIRST_COMPLETED,
+            ThreadPoolExecutor,
+            wait,
+        )
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = set()
+            while True:
+                while len(running) < self.max_workers and (
+                    max_cases is None or self.n_done + len(running) < max_cases
+                ):
+                    claimed = self.claim_next()
+                    if claimed is None:
+                        break
+                    running.add(pool.submit(self.process, *claimed))
+                if not running:
+                    if stop_when_empty or (
+                        max_cases is not None and self.n_done >= max_cases
+                    ):
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                done, running = wait(
+                    running,
+                    timeout=self.poll_interval,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    result = future.result()
+                    self.n_done += 1
+                    if verbose:
+                        print(
+                            "{} {} {} {}".format(
+                                self.worker_id,
+                                result["file_name"],
+                                result["status"],
+                                result["reason"] or "",
+                            )
+                        )
+        return self.n_done
+
+
+def main(argv=None):
+    """Command line entry point, see python -m spyro_framework.workqueue."""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Shared filesystem work queue of Spyro cases"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    submit = subparsers.add_parser(
+        "submit", help="submit written case folders as a batch"
+    )
+    submit.add_argument("queue", help="shared queue folder")
+    submit.add_argument("batch")
+    submit.add_argument("folder", help="folder with the case folders")
+    submit.add_argument("cases", nargs="*", help="default all .dat cases")
+    submit.add_argument("--base-folder", default="base")
+    submit.add_argument("--exe", default=None, help="EFPS executable")
+
+    worker = subparsers.add_parser("worker", help="run cases of the queue")
+    worker.add_argument("queue", help="shared queue folder")
+    worker.add_argument("--workers", type=int, default=1)
+    worker.add_argument("--lease", type=float, default=300.0)
+    worker.add_argument("--max-cases", type=int, default=None)
+    worker.add_argument("--no-harvest", action="store_true")
+    worker.add_argument("--no-watchdog", action="store_true")
+    worker.add_argument(
+        "--wait", action="store_true", help="keep polling an empty queue"
+    )
+
+    status = subparsers.add_parser("status", help="status of a batch")
+    status.add_argument("queue", help="shared queue folder")
+    status.add_argument("batch")
+    args = parser.parse_args(argv)
+
+    if args.command == "submit":
+        import os
+
+        from spyro_framework.cli import find_cases
+        from spyro_framework.spyro import SpyroData
+
+        spyro_cases = []
+        for file_name in find_cases(args.folder, args.cases, extension=".dat"):
+            spyro_data = SpyroData(
+                file_name, args.folder, base_folder=args.base_folder
+            )
+            if args.exe is not None:
+                spyro_data.set_spyro_exe_name(os.path.basename(args.exe))
+                spyro_data.set_spyro_exe_location(
+                    os.path.dirname(os.path.abspath(args.exe))
+                )
+            spyro_cases.append(spyro_data)
+        print(
+            "{} cases in batch {}".format(
+                WorkQueue(args.queue).submit(spyro_cases, args.batch),
+                args.batch,
+            )
+        )
+    elif args.command == "worker":
+        QueueWorker(
+            WorkQueue(args.queue, lease_time=args.lease),
+            max_workers=args.workers,
+            harvest=not args.no_harvest,
+            watchdog=not args.no_watchdog,
+        ).run(
+            max_cases=args.max_cases,
+            stop_when_empty=not args.wait,
+            verbose=True,
+        )
+    elif args.command == "status":
+        print(WorkQueue(args.queue).get_status(args.batch))
+    return 0
+
+
+if __name__ == "__main__":
+    import sys
+
+    sys.exit(main())
@@ -9,14 +9,16 @@ def main():
     from spyro_framework.spyro import (
         EffluentComposition,
         FeedComposition,
+        FeedCompositionBatch,
         SpyroData,
         read_naphtha_spyro_converter,
     )
+    from spyro_framework.samples import LabSampleWorkbook
 
-    feed_comp = pd.read_excel(
+    # Sheets are only parsed when used and cached in processing_files
+    feed_comp = LabSampleWorkbook(
         "Samples Naphtha2.xlsx",
         skiprows=8,
-        sheet_name=None,
         parse_dates=True,
         na_values=["<0.50"],
     )
@@ -24,6 +26,12 @@ def main():
     file_name = "naphtha_converter_TRAlab_Spyro.xlsx"
     naphtha_converter = read_naphtha_spyro_converter(file_name)
 
+    # Transform all lab samples at once and check the PIONA composition
+    feed_batch = FeedCompositionBatch()
+    feed_batch.set_feed_compositions(feed_comp, naphtha_converter)
+    feed_batch.transform_naphtha_feeds()
+    print(feed_batch.piona_processor())
+
     spyro_data = {}
     for i, feed_name in enumerate(feed_comp):
         spyro_data[i] = SpyroData(feed_name, os.getcwd())
@@ -32,11 +40,9 @@ def main():
         spyro_data[i].set_feed_composition(
             feed_pitagor=feed_comp_test, feed_converter=naphtha_converter
         )
-        spyro_data[i].feed_composition.transform_naphtha_feed()
-    #     spyro_data[i].write_spyro()
-
-    #     for spyro_simulation_nr in spyro_data:
-    #         spyro_data[spyro_simulation_nr].run_spyro()
+        spyro_data[i].feed_composition.set_feed_comp_wt(
+            feed_batch.get_feed_comp(feed_name)
+        )
 
     effluent = {}
     general = {}
@@ -48,15 +54,7 @@ def main():
                 spyro_sim.get_file_name()
             )
         )
-        spyro_sim.effluent_composition.read_effluent(
-            spyro_sim.get_folder_location(), spyro_sim.get_file_name()
-        )
-        spyro_sim.general_spyro.read_general(
-            spyro_sim.get_folder_location(), spyro_sim.get_file_name()
-        )
-        spyro_sim.firebox.read_firebox(
-            spyro_sim.get_folder_location(), spyro_sim.get_file_name()
-        )
+        spyro_sim.read_spyro_output()
         effluent[
             spyro_sim.get_file_name()
         ] = spyro_sim.effluent_composition.effluent["wt"]
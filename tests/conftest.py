@@ -0,0 +1,26 @@
+import os
+import shutil
+
+import pytest
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def case_root(tmp_path):
+    """Folder with a copy of base/ (and a Pyrotec.ini) for the cases."""
+    base_folder = tmp_path / "base"
+    shutil.copytree(os.path.join(PACKAGE_ROOT, "base"), base_folder)
+    (base_folder / "Pyrotec.ini").write_text("[Pyrotec]\n")
+    return tmp_path
+
+
+@pytest.fixture
+def standin_exe(case_root):
+    """Stand-in EFPS executable which runs against case_root/base."""
+    from spyro_framework.standin import write_standin_executable
+
+    return write_standin_executable(
+        str(case_root / "bin" / "EFPS68"),
+        base_folder=str(case_root / "base"),
+    )
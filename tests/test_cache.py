@@ -0,0 +1,176 @@
+import os
+
+from spyro_framework.cache import SpyroResultCache
+from spyro_framework.executor import run_spyro_batch
+from spyro_framework.spyro import SpyroData
+from spyro_framework.sweep import SpyroSweep
+
+
+def make_sweep(case_root, standin_exe, levels, prefix="case"):
+    sweep = SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in levels],
+        prefix=prefix,
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    )
+    return list(sweep.create_cases().values())
+
+
+def fresh_case(case_root, standin_exe, file_name):
+    """SpyroData of an existing case folder, not written by this object."""
+    spyro_data = SpyroData(file_name, str(case_root))
+    spyro_data.set_spyro_exe_location(os.path.dirname(standin_exe))
+    spyro_data.set_spyro_exe_name(os.path.basename(standin_exe))
+    return spyro_data
+
+
+def ethylene(spyro_data):
+    return spyro_data.effluent_composition.effluent["wt"]["C2H4"]
+
+
+def run_batch(spyro_cases, cache, write):
+    return {
+        result.get_file_name(): result
+        for result in run_spyro_batch(
+            spyro_cases, max_workers=4, write=write, cache=cache
+        )
+    }
+
+
+def test_written_cases_with_duplicates(case_root, standin_exe):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    spyro_cases = make_sweep(case_root, standin_exe, [50, 60, 50])
+    results = run_batch(spyro_cases, cache, write=True)
+
+    assert len(results) == 3
+    statuses = sorted(result.get_status() for result in results.values())
+    assert statuses == ["cached", "finished", "finished"]
+    first, second, duplicate = spyro_cases
+    assert ethylene(duplicate) == ethylene(first)
+    assert ethylene(second) != ethylene(first)
+
+    # A new batch with the same input is served from the cache
+    results = run_batch(
+        make_sweep(case_root, standin_exe, [50, 60], prefix="again"),
+        cache,
+        write=True,
+    )
+    assert [result.get_status() for result in results.values()] == [
+        "cached",
+        "cached",
+    ]
+
+
+def test_existing_case_folders_are_keyed_by_their_input(
+    case_root, standin_exe
+):
+    from spyro_framework.staging import write_cases
+
+    cache = SpyroResultCache(str(case_root / "cache"))
+    # Different case folders written up front, then run with fresh SpyroData
+    # objects which know nothing about their input
+    assert write_cases(make_sweep(case_root, standin_exe, [50, 60])) == []
+    file_names = ["case_00000", "case_00001"]
+
+    spyro_cases = [
+        fresh_case(case_root, standin_exe, file_name)
+        for file_name in file_names
+    ]
+    results = run_batch(spyro_cases, cache, write=False)
+    assert [results[name].get_status() for name in file_names] == [
+        "finished",
+        "finished",
+    ]
+    assert results["case_00000"].cache_key != results["case_00001"].cache_key
+    values = [ethylene(spyro_data) for spyro_data in spyro_cases]
+    assert values[0] != values[1]
+
+    spyro_cases = [
+        fresh_case(case_root, standin_exe, file_name)
+        for file_name in file_names
+    ]
+    results = run_batch(spyro_cases, cache, write=False)
+    assert [results[name].get_status() for name in file_names] == [
+        "cached",
+        "cached",
+    ]
+    assert [ethylene(spyro_data) for spyro_data in spyro_cases] == values
+
+
+def test_pyrotec_ini_is_part_of_the_key(case_root, standin_exe):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    (spyro_data,) = make_sweep(case_root, standin_exe, [50])
+    key = cache.get_key(spyro_data)
+    (case_root / "base" / "Pyrotec.ini").write_text("[Pyrotec]\nother\n")
+    assert cache.get_key(spyro_data) != key
+
+
+def test_duplicates_of_a_failed_case_are_yielded(case_root, standin_exe):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    # write_spyro fails before run_spyro_case knows the cache key
+    os.remove(case_root / "base" / "Pyrotec.ini")
+    spyro_cases = make_sweep(case_root, standin_exe, [50, 50, 50])
+    results = run_batch(spyro_cases, cache, write=True)
+
+    assert sorted(results) == ["case_00000", "case_00001", "case_00002"]
+    assert all(result.get_status() == "failed" for result in results.values())
+
+
+def test_missing_input_does_not_abort_the_batch(case_root, standin_exe):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    make_sweep(case_root, standin_exe, [50])[0].write_spyro()
+    # No case folder, get_key fails for this case only
+    results = run_batch(
+        [
+            fresh_case(case_root, standin_exe, "case_00000"),
+            fresh_case(case_root, standin_exe, "missing"),
+        ],
+        cache,
+        write=False,
+    )
+
+    assert results["case_00000"].get_status() == "finished"
+    assert results["missing"].get_status() == "failed"
+
+
+def test_hits_do_not_rewrite_the_index(case_root, standin_exe, monkeypatch):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    run_batch(make_sweep(case_root, standin_exe, [50]), cache, write=True)
+    writes = []
+    write_index = cache.write_index
+
+    def counted_write_index():
+        writes.append(True)
+        write_index()
+
+    monkeypatch.setattr(cache, "write_index", counted_write_index)
+    spyro_cases = make_sweep(case_root, standin_exe, [50] * 4, prefix="hit")
+    key = cache.get_key(spyro_cases[0])
+    for spyro_data in spyro_cases:
+        assert cache.materialize(key, spyro_data)
+    assert writes == []
+    cache.write_changes()
+    assert len(writes) == 1
+    assert SpyroResultCache(str(case_root / "cache")).cache_index == (
+        cache.cache_index
+    )
+
+
+def test_failed_output_is_not_cached(case_root, standin_exe):
+    cache = SpyroResultCache(str(case_root / "cache"))
+    (spyro_data,) = make_sweep(case_root, standin_exe, [50])
+    run_batch([spyro_data], cache=None, write=True)
+    key = cache.get_key(spyro_data)
+    # EFPS exits with 0 after a security error, like NI82
+    msg_location = os.path.join(
+        spyro_data.file_name_folder, spyro_data.get_file_name() + ".msg"
+    )
+    with open(msg_location, "w") as msg_file:
+        msg_file.write("0 ERROR SECURITY 2014\n")
+    assert not cache.store(key, spyro_data)
+    assert not cache.contains(key)
+
+    os.remove(msg_location)
+    assert cache.store(key, spyro_data)
+    assert cache.contains(key)
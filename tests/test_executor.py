@@ -0,0 +1,147 @@
+import asyncio
+import os
+import time
+
+from spyro_framework.executor import run_spyro_batch, run_spyro_batch_async
+from spyro_framework.standin import write_standin_executable
+from spyro_framework.sweep import SpyroSweep
+
+
+def make_cases(case_root, levels, **options):
+    exe = write_standin_executable(
+        str(case_root / "bin" / "EFPS68"),
+        base_folder=str(case_root / "base"),
+        **options,
+    )
+    sweep = SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in levels],
+        spyro_exe_location=os.path.dirname(exe),
+        spyro_exe_name=os.path.basename(exe),
+    )
+    return list(sweep.create_cases().values())
+
+
+def test_batch_runs_cases_concurrently(case_root):
+    spyro_cases = make_cases(case_root, [50, 54, 58, 62], sleep_time=1.0)
+    cwd = os.getcwd()
+    start = time.perf_counter()
+    results = list(run_spyro_batch(spyro_cases, max_workers=4, write=True))
+    assert time.perf_counter() - start < 3.0
+    # Every case ran in its own folder without os.chdir
+    assert os.getcwd() == cwd
+    assert sorted(result.get_file_name() for result in results) == sorted(
+        spyro_data.get_file_name() for spyro_data in spyro_cases
+    )
+    assert all(result.get_status() == "finished" for result in results)
+    ethylene = [
+        spyro_data.effluent_composition.effluent["wt"]["C2H4"]
+        for spyro_data in spyro_cases
+    ]
+    assert ethylene == sorted(ethylene)
+
+
+def test_batch_stops_when_the_caller_stops(case_root):
+    spyro_cases = make_cases(case_root, [50, 54, 58, 62], sleep_time=0.5)
+    batch = run_spyro_batch(spyro_cases, max_workers=1, write=True)
+    first = next(batch)
+    batch.close()
+    assert first.get_status() == "finished"
+    # The cases which did not start are never run
+    started = [
+        spyro_data
+        for spyro_data in spyro_cases
+        if os.path.isdir(spyro_data.file_name_folder)
+    ]
+    assert len(started) <= 2
+
+
+def test_async_timeout_kills_hanging_cases(case_root):
+    spyro_cases = make_cases(
+        case_root, [50, 55, 60], failure_rates={"hang": 1.0}, hang_time=60
+    )
+    start = time.perf_counter()
+    results = asyncio.run(
+        run_spyro_batch_async(spyro_cases, timeout=0.5, write=True)
+    )
+    assert time.perf_counter() - start < 20
+    assert [result.get_status() for result in results] == ["failed"] * 3
+    assert all(result.reason == "timeout after 0.5 s" for result in results)
+
+
+def test_cancel_async_batch(case_root):
+    spyro_cases = make_cases(case_root, [50, 55], sleep_time=60)
+    finished = []
+
+    async def cancel_batch():
+        batch = asyncio.ensure_future(
+            run_spyro_batch_async(
+                spyro_cases, write=True, on_result=finished.append
+            )
+        )
+        await asyncio.sleep(1.0)
+        batch.cancel()
+        try:
+            await batch
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    start = time.perf_counter()
+    assert asyncio.run(cancel_batch())
+    assert time.perf_counter() - start < 20
+    assert finished == []
+    time.sleep(0.5)
+    # The killed processes never write their .eof
+    for spyro_data in spyro_cases:
+        assert not os.path.exists(
+            os.path.join(
+                spyro_data.file_name_folder,
+                spyro_data.get_file_name() + ".eof",
+            )
+        )
+
+
+def test_output_is_streamed(case_root):
+    spyro_cases = make_cases(case_root, [50], failure_rates={"crash": 1.0})
+    lines = []
+
+    def on_output(file_name, stream_name, line):
+        lines.append((file_name, stream_name, line))
+
+    (result,) = asyncio.run(
+        run_spyro_batch_async(spyro_cases, on_output=on_output, write=True)
+    )
+    assert result.get_status() == "failed"
+    assert result.returncode == 1
+    assert (
+        spyro_cases[0].get_file_name(),
+        "stdout",
+        "forrtl: severe (157): Program Exception - access violation",
+    ) in lines
+
+
+def test_cache_key_is_hashed_off_the_event_loop(case_root, monkeypatch):
+    import threading
+
+    from spyro_framework.cache import SpyroResultCache
+
+    cache = SpyroResultCache(str(case_root / "cache"))
+    spyro_cases = make_cases(case_root, [50, 50])
+    threads = []
+    get_key = cache.get_key
+
+    def recorded_get_key(*args, **kwargs):
+        threads.append(threading.current_thread())
+        return get_key(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "get_key", recorded_get_key)
+    results = asyncio.run(
+        run_spyro_batch_async(spyro_cases, write=True, cache=cache)
+    )
+    assert sorted(result.get_status() for result in results) == [
+        "cached",
+        "finished",
+    ]
+    assert threads
+    assert threading.main_thread() not in threads
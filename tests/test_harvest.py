@@ -0,0 +1,57 @@
+import os
+import shutil
+
+from conftest import PACKAGE_ROOT
+
+
+def test_missing_firebox_is_reported_once(tmp_path, capsys):
+    from spyro_framework.harvest import harvest_incremental
+    from spyro_framework.store import SpyroResultStore
+
+    folder_location = tmp_path / "cases"
+    for file_name in ["NI01", "NI02", "NI03"]:
+        os.makedirs(folder_location / file_name)
+        shutil.copy(
+            os.path.join(PACKAGE_ROOT, "base", "base.eof"),
+            folder_location / file_name / (file_name + ".eof"),
+        )
+
+    summary = harvest_incremental(
+        str(folder_location), SpyroResultStore(str(tmp_path / "store"))
+    )
+    assert summary["harvested"] == ["NI01", "NI02", "NI03"]
+    assert summary["no_firebox"] == ["NI01", "NI02", "NI03"]
+    assert capsys.readouterr().out.count("[FIREBOX]") == 1
+
+
+def test_marked_failed_case_is_reported_once(tmp_path):
+    from spyro_framework.harvest import harvest_incremental
+    from spyro_framework.store import SpyroResultStore
+    from spyro_framework.watchdog import clear_case_failure, mark_case_failed
+
+    folder_location = tmp_path / "cases"
+    for file_name in ["NI01", "NI02"]:
+        os.makedirs(folder_location / file_name)
+        shutil.copy(
+            os.path.join(PACKAGE_ROOT, "base", "base.eof"),
+            folder_location / file_name / (file_name + ".eof"),
+        )
+    mark_case_failed(str(folder_location), "NI02", "security")
+    result_store = SpyroResultStore(str(tmp_path / "store"))
+
+    summary = harvest_incremental(str(folder_location), result_store)
+    assert summary["harvested"] == ["NI01"]
+    assert summary["failed"] == [("NI02", "marked failed: security")]
+
+    summary = harvest_incremental(str(folder_location), result_store)
+    assert summary["harvested"] == []
+    assert summary["failed"] == []
+    assert summary["unchanged"] == 2
+
+    # A new run of the case writes a new .eof
+    clear_case_failure(str(folder_location), "NI02")
+    with open(folder_location / "NI02" / "NI02.eof", "a") as eof_file:
+        eof_file.write("\n")
+    summary = harvest_incremental(str(folder_location), result_store)
+    assert summary["harvested"] == ["NI02"]
+    assert summary["failed"] == []
@@ -0,0 +1,81 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spyro_framework.optimize import (
+    ConstrainedOptimizer,
+    fit_gaussian_process,
+)
+
+FACTORS = {"CONVAL": (50.0, 65.0), "STEAM": (800.0, 1200.0)}
+
+
+def get_history(design, objective):
+    rows = pd.DataFrame(design)
+    rows["objective"] = objective
+    for name in ["MAXSKIN", "COKRATE", "PRESSDR"]:
+        rows[name] = np.where(np.isnan(objective), np.nan, 0.0)
+    rows["feasible"] = ~np.isnan(objective)
+    rows["round"] = 0
+    rows["file_name"] = ["case_{}".format(i) for i in range(len(rows))]
+    return rows
+
+
+def test_failed_round_proposes_a_new_design(tmp_path):
+    optimizer = ConstrainedOptimizer(str(tmp_path), FACTORS, q=4, seed=1)
+    design = optimizer.propose(4)
+    optimizer.history = get_history(design, [np.nan] * 4)
+    assert optimizer.propose(4) != design
+
+
+def test_failed_cases_are_infeasible_points(tmp_path):
+    unit = np.linspace(0.0, 1.0, 4)
+    design = [
+        {"CONVAL": 50.0 + 15.0 * a, "STEAM": 800.0 + 400.0 * b}
+        for a in unit
+        for b in unit
+    ]
+    objective = np.array([1.0 + a + b for a in unit for b in unit])
+    # The cases of the most promising corner fail
+    failed = np.array([a > 0.5 and b > 0.5 for a in unit for b in unit])
+    objective[failed] = np.nan
+    optimizer = ConstrainedOptimizer(
+        str(tmp_path),
+        FACTORS,
+        q=2,
+        seed=1,
+        history=get_history(design, objective),
+    )
+    proposal = optimizer.propose(2)
+    assert len(proposal) == 2
+    for case in proposal:
+        assert case["CONVAL"] < 58.0 or case["STEAM"] < 1020.0
+
+
+def test_fit_without_positive_definite_kernel():
+    # Two identical inputs without noise give a singular kernel
+    x = np.array([[0.5], [0.5]])
+    with pytest.raises(ValueError):
+        fit_gaussian_process(x, np.array([1.0, 2.0]), noises=[0.0])
+
+
+def test_default_constraints_on_the_standin(case_root, standin_exe, capsys):
+    optimizer = ConstrainedOptimizer(
+        str(case_root),
+        {"CONVAL": (50.0, 65.0)},
+        q=2,
+        budget=6,
+        seed=1,
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    )
+    assert optimizer.run() is not None
+    history = optimizer.get_history()
+    # base.eof has none of the default limits in [SPYROGENERAL], they are
+    # derived from the coil profile
+    assert history[["MAXSKIN", "COKRATE", "PRESSDR"]].notna().all().all()
+    assert history["feasible"].astype(bool).all()
+    assert optimizer.get_best() is not None
+    assert "Warning: constraint" not in capsys.readouterr().out
@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import PACKAGE_ROOT
+
+from spyro_framework.spyro import (
+    CoilProfileData,
+    EffluentComposition,
+    EofDocument,
+    EofSectionReader,
+)
+
+
+def write_two_day_case(folder):
+    """base.eof with an extra, shorter first day in front of the last."""
+    with open(os.path.join(PACKAGE_ROOT, "base", "base.eof")) as eof_file:
+        lines = eof_file.read().split("\n")
+    start = lines.index("[SPYRO]")
+    end = lines.index("[SPYRO END]")
+    day = lines[start : end + 1]
+    # Day 1 only has the first two tube records and no effluent
+    first_tube_end = [i for i, line in enumerate(day) if line == "[TUBE END]"]
+    first_day = (
+        day[: first_tube_end[1] + 1]
+        + ["[EFFLUENT]", " WC2H4 1.0", "[EFFLUENT END]"]
+        + ["[SPYRO END]"]
+    )
+    lines = lines[:start] + first_day + lines[start:]
+    os.makedirs(folder / "two_days")
+    with open(folder / "two_days" / "two_days.eof", "w") as eof_file:
+        eof_file.write("\n".join(lines))
+
+
+def test_profiles_are_read_from_the_last_day(tmp_path):
+    write_two_day_case(tmp_path)
+    single_day = CoilProfileData()
+    single_day.read_profiles(PACKAGE_ROOT, "base")
+    two_days = CoilProfileData()
+    two_days.read_profiles(str(tmp_path), "two_days")
+
+    for section in two_days.profile_sections:
+        np.testing.assert_array_equal(
+            two_days.profiles[section], single_day.profiles[section]
+        )
+    effluent = EffluentComposition()
+    effluent.read_effluent(str(tmp_path), "two_days")
+    assert effluent.effluent["wt"]["C2H4"] != 1.0
+
+
+def test_section_reader_matches_document(tmp_path):
+    write_two_day_case(tmp_path)
+    for folder, file_name in [(PACKAGE_ROOT, "base"), (tmp_path, "two_days")]:
+        eof_document = EofDocument(str(folder), file_name)
+        with EofSectionReader(str(folder), file_name) as eof_reader:
+            for name in eof_document.get_section_names():
+                for occurrence in [0, -1]:
+                    assert eof_reader.get_section(
+                        name, occurrence
+                    ) == eof_document.get_section(name, occurrence)
+
+
+def test_missing_effluent_section(tmp_path):
+    with open(os.path.join(PACKAGE_ROOT, "base", "base.eof")) as eof_file:
+        text = eof_file.read()
+    start = text.index("[EFFLUENT]")
+    end = text.index("[EFFLUENT END]") + len("[EFFLUENT END]")
+    os.makedirs(tmp_path / "no_effluent")
+    with open(tmp_path / "no_effluent" / "no_effluent.eof", "w") as eof_file:
+        eof_file.write(text[:start] + text[end:])
+
+    with pytest.raises(ValueError, match=r"\[EFFLUENT\] section not found"):
+        EffluentComposition().read_effluent(str(tmp_path), "no_effluent")
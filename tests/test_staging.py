@@ -0,0 +1,78 @@
+import os
+
+from spyro_framework.executor import run_spyro_batch
+from spyro_framework.staging import ScratchStaging
+from spyro_framework.sweep import SpyroSweep
+
+
+def make_cases(case_root, standin_exe, levels, prefix="case"):
+    sweep = SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in levels],
+        prefix=prefix,
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    )
+    return list(sweep.create_cases().values())
+
+
+def test_staged_batch_is_copied_back(case_root, standin_exe, tmp_path):
+    spyro_cases = make_cases(case_root, standin_exe, [50, 60])
+    with ScratchStaging(str(tmp_path), link_mode="hardlink") as staging:
+        scratch_folder = staging.get_scratch_folder()
+        results = list(
+            run_spyro_batch(spyro_cases, write=True, staging=staging)
+        )
+        assert staging.get_staged() == []
+
+    assert [result.get_status() for result in results] == [
+        "finished",
+        "finished",
+    ]
+    assert not os.path.exists(scratch_folder)
+    for spyro_data in spyro_cases:
+        assert spyro_data.get_folder_location() == str(case_root)
+        # The mode of the caller is restored after the staged run
+        assert spyro_data.get_asset_link_mode() == "copy"
+        case_folder = case_root / spyro_data.get_file_name()
+        assert (case_folder / (spyro_data.get_file_name() + ".eof")).is_file()
+        assert os.stat(case_folder / "Pyrotec.ini").st_nlink > 1
+
+
+def test_sync_only_the_given_cases(case_root, standin_exe, tmp_path):
+    first, second = make_cases(case_root, standin_exe, [50, 60])
+    with ScratchStaging(str(tmp_path)) as staging:
+        staging.stage(first)
+        staging.stage(second)
+        assert staging.sync([first]) == []
+        assert staging.get_staged() == [second]
+        assert first.get_folder_location() == str(case_root)
+        assert second.get_folder_location() != str(case_root)
+    assert second.get_folder_location() == str(case_root)
+
+
+def test_scratch_is_kept_when_sync_fails(
+    case_root, standin_exe, tmp_path, monkeypatch, capsys
+):
+    def sync_case(self, key):
+        raise OSError("share unavailable")
+
+    spyro_cases = make_cases(case_root, standin_exe, [50])
+    monkeypatch.setattr(ScratchStaging, "sync_case", sync_case)
+    with ScratchStaging(str(tmp_path)) as staging:
+        list(run_spyro_batch(spyro_cases, write=True, staging=staging))
+
+    scratch_folder = staging.get_scratch_folder()
+    assert scratch_folder in capsys.readouterr().out
+    assert staging.get_staged() == spyro_cases
+    file_name = spyro_cases[0].get_file_name()
+    assert os.path.isfile(
+        os.path.join(
+            spyro_cases[0].get_folder_location(),
+            file_name,
+            file_name + ".eof",
+        )
+    )
+    monkeypatch.undo()
+    staging.cleanup()
+    assert not os.path.exists(scratch_folder)
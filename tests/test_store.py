@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from spyro_framework.store import SpyroResultStore
+from spyro_framework.sweep import SpyroSweep
+
+
+@pytest.fixture
+def result_store(case_root, standin_exe):
+    result_store = SpyroResultStore(str(case_root / "store"))
+    SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in [50, 57, 64]],
+        prefix="sweep",
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    ).run(result_store=result_store)
+    return result_store
+
+
+def test_query_with_filters(result_store):
+    effluent = result_store.query("effluent", columns=["file_name", "WC2H4"])
+    assert len(effluent) == 3
+    threshold = effluent["WC2H4"].median()
+    expected = sorted(effluent["file_name"][effluent["WC2H4"] > threshold])
+
+    frame = result_store.query(
+        "effluent",
+        [("WC2H4", ">", threshold)],
+        columns=["file_name", "WC2H4"],
+        batches=["sweep"],
+    )
+    assert sorted(frame["file_name"]) == expected
+    assert (frame["WC2H4"] > threshold).all()
+    assert result_store.query(
+        "effluent", [("WC2H4", ">", threshold)], batches=["other"]
+    ).empty
+
+
+def test_query_columns_which_were_never_written(result_store):
+    # base.eof does not report MAXSKIN in [SPYROGENERAL]
+    frame = result_store.query(
+        "general",
+        [("MAXSKIN", ">", 1050)],
+        columns=["file_name", "MAXSKIN"],
+    )
+    assert frame.empty
+    assert list(frame.columns) == ["file_name", "MAXSKIN"]
+
+    frame = result_store.query(
+        "general", columns=["file_name", "MAXSKIN"], latest=True
+    )
+    assert len(frame) == 3
+    assert list(frame.columns) == ["file_name", "MAXSKIN"]
+    assert frame["MAXSKIN"].isna().all()
+
+
+def test_interrupted_sweep_keeps_buffered_cases(
+    case_root, standin_exe, monkeypatch
+):
+    import spyro_framework.executor
+
+    run_spyro_batch = spyro_framework.executor.run_spyro_batch
+
+    def interrupted_batch(*args, **kwargs):
+        for i, result in enumerate(run_spyro_batch(*args, **kwargs)):
+            if i == 2:
+                raise KeyboardInterrupt
+            yield result
+
+    monkeypatch.setattr(
+        spyro_framework.executor, "run_spyro_batch", interrupted_batch
+    )
+    result_store = SpyroResultStore(str(case_root / "store"))
+    sweep = SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in [50, 57, 64]],
+        prefix="sweep",
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    )
+    with pytest.raises(KeyboardInterrupt):
+        sweep.run(max_workers=1, result_store=result_store)
+    assert len(result_store.query("effluent", columns=["file_name"])) == 2
@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from spyro_framework.target import TargetMatch
+
+
+@pytest.mark.parametrize("target_value", [38.2, 41.0, 44.7])
+def test_match_ethylene_yield(case_root, standin_exe, target_value):
+    target_match = TargetMatch(
+        str(case_root),
+        "CONVAL",
+        "C2H4",
+        target_value,
+        (45, 65),
+        tolerance=0.05,
+        max_rounds=5,
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    )
+    spyro_data = target_match.run()
+    assert target_match.converged
+    ethylene = spyro_data.effluent_composition.effluent["wt"]["C2H4"]
+    assert abs(ethylene - target_value) <= 0.05
+    # Bracket in the first round, then regula falsi
+    assert target_match.get_history()["round"].max() <= 3
+
+
+def test_standin_yield_is_smooth_in_conval(case_root, standin_exe):
+    from spyro_framework.sweep import SpyroSweep
+
+    levels = [54.0, 54.5, 55.0, 55.5, 56.0]
+    results = SpyroSweep(
+        str(case_root),
+        [{"CONVAL": level} for level in levels],
+        spyro_exe_location=os.path.dirname(standin_exe),
+        spyro_exe_name=os.path.basename(standin_exe),
+    ).run()
+    ethylene = results[("effluent", "C2H4")].to_numpy()
+    steps = ethylene[1:] - ethylene[:-1]
+    assert (steps > 0).all()
+    assert steps.max() - steps.min() < 0.05 * steps.mean()
@@ -0,0 +1,62 @@
+import os
+import re
+
+import pandas as pd
+import pytest
+
+from conftest import PACKAGE_ROOT
+
+from spyro_framework.spyro import SpyroData
+from spyro_framework.template import SpyroDatTemplate
+
+BASE_DAT = os.path.join(PACKAGE_ROOT, "base", "base.dat")
+
+
+def render_with_regex(spyro_data):
+    """The .dat of a case as written by the former regex passes."""
+    with open(BASE_DAT, "r") as base_file:
+        text = base_file.read()
+    text = re.sub(
+        r"KEYW=&NAME\n[\s\S]*, END", spyro_data.create_naphtha_line(), text
+    )
+    convergence = spyro_data.convergence
+    keyword = convergence.target_value_keyword[convergence.target]
+    text = re.sub(r"CONOP=[0-9]", "CONOP={}".format(convergence.target), text)
+    return re.sub(
+        "{}=[^,]*".format(keyword),
+        "{}={}".format(keyword, convergence.target_value),
+        text,
+    )
+
+
+def test_render_without_changes_is_the_base_file():
+    with open(BASE_DAT, "r") as base_file:
+        assert SpyroDatTemplate(BASE_DAT).render() == base_file.read()
+
+
+@pytest.mark.parametrize("target, target_value", [(5, 62.5), (1, 840)])
+def test_render_matches_the_regex_passes(target, target_value):
+    spyro_data = SpyroData("case", PACKAGE_ROOT)
+    spyro_data.convergence.target = target
+    spyro_data.convergence.target_value = target_value
+    # Enough components for continuation lines in the NAME block
+    spyro_data.feed_composition.set_feed_comp_wt(
+        pd.Series(
+            {
+                "C2H4": 0.5,
+                "C2H6": 90.25,
+                "C3H6": 1.5,
+                "C3H8": 2.0,
+                "C3H4": 0.01,
+                "NBUTA": 1.2,
+                "IBUTA": 0.8,
+                "B1": 0.4,
+                "BUTAD": 0.3,
+                "NC5": 1.0,
+                "IC5": 0.9,
+                "NC6": 0.6,
+                "BENZ": 0.54,
+            }
+        )
+    )
+    assert spyro_data.render_spyro() == render_with_regex(spyro_data)
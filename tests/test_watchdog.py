@@ -0,0 +1,32 @@
+import os
+
+
+def test_rewritten_output_of_the_same_size_is_read(tmp_path):
+    from spyro_framework.watchdog import RunWatchdog
+
+    case_folder = tmp_path / "NI01"
+    case_folder.mkdir()
+    location = case_folder / "NI01.msg"
+    old_output = "RUN FINISHED NORMALLY  \n"
+    new_output = "CONVERGENCE NOT REACHED\n"
+    assert len(old_output) == len(new_output)
+    location.write_text(old_output)
+    stat = os.stat(location)
+
+    watchdog = RunWatchdog(str(tmp_path), "NI01")
+    # The new run rewrites the file in place within the mtime granularity
+    with open(location, "w") as msg_file:
+        msg_file.write(new_output)
+    os.utime(location, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert watchdog.poll(final=True) == "nonconvergence"
+
+
+def test_output_of_an_earlier_run_is_ignored(tmp_path):
+    from spyro_framework.watchdog import RunWatchdog
+
+    case_folder = tmp_path / "NI01"
+    case_folder.mkdir()
+    (case_folder / "NI01.OUT").write_text("PROGRAM HAS BEEN TERMINATED\n")
+
+    watchdog = RunWatchdog(str(tmp_path), "NI01")
+    assert watchdog.poll(final=True) is None
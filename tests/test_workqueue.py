@@ -0,0 +1,139 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from conftest import PACKAGE_ROOT
+
+from spyro_framework.workqueue import QueueWorker, WorkQueue
+
+
+def write_lease(location, worker, expires):
+    with open(location, "w") as lease_file:
+        json.dump(
+            {"worker": worker, "attempt": 1, "expires": expires}, lease_file
+        )
+
+
+def test_restore_never_replaces_a_new_lease(tmp_path, monkeypatch):
+    work_queue = WorkQueue(str(tmp_path / "queue"), lease_time=60)
+    os.makedirs(tmp_path / "queue" / "leases" / "batch")
+    lease_location = work_queue.get_lease_location("batch", "case")
+    write_lease(lease_location, "a", time.time() - 1)
+    read_json = WorkQueue.read_json
+
+    def racing_read_json(location):
+        if location.endswith(".broken"):
+            # Worker a renewed its lease and worker c created a new lease
+            # while the lease of a was renamed away
+            write_lease(lease_location, "c", time.time() + 60)
+            return {"worker": "a", "attempt": 1, "expires": time.time() + 60}
+        return read_json(location)
+
+    monkeypatch.setattr(WorkQueue, "read_json", staticmethod(racing_read_json))
+    assert work_queue.claim("batch", "case", "b") is None
+    monkeypatch.undo()
+
+    assert work_queue.read_json(lease_location)["worker"] == "c"
+    assert os.listdir(os.path.dirname(lease_location)) == ["case.lease"]
+
+
+def test_failing_case_does_not_stop_the_worker(
+    case_root, standin_exe, monkeypatch
+):
+    from spyro_framework.cli import render_cases
+    from spyro_framework.spyro import SpyroData
+
+    file_names = ["case_00", "case_01", "case_02"]
+    render_cases(str(case_root), file_names)
+    spyro_cases = []
+    for file_name in file_names:
+        spyro_data = SpyroData(file_name, str(case_root))
+        spyro_data.set_spyro_exe_location(os.path.dirname(standin_exe))
+        spyro_data.set_spyro_exe_name(os.path.basename(standin_exe))
+        spyro_cases.append(spyro_data)
+    work_queue = WorkQueue(str(case_root / "queue"))
+    work_queue.submit(spyro_cases, "batch")
+    create_case = WorkQueue.create_case
+
+    def failing_create_case(case):
+        if case["file_name"] == "case_01":
+            raise FileNotFoundError("case_01.dat")
+        return create_case(case)
+
+    monkeypatch.setattr(
+        WorkQueue, "create_case", staticmethod(failing_create_case)
+    )
+    assert QueueWorker(work_queue, watchdog=False).run() == 3
+
+    status = work_queue.get_status("batch")
+    assert status["finished"] == 2
+    assert status["failed"] == 1
+    results = work_queue.get_results("batch")
+    assert results.loc["case_01", ("run", "reason")] == (
+        "FileNotFoundError: case_01.dat"
+    )
+    assert os.listdir(case_root / "queue" / "leases" / "batch") == []
+
+
+def test_workers_in_separate_processes(case_root):
+    from spyro_framework.cli import render_cases
+    from spyro_framework.standin import write_standin_executable
+    from spyro_framework.spyro import SpyroData
+
+    exe = write_standin_executable(
+        str(case_root / "bin" / "EFPS68"),
+        base_folder=str(case_root / "base"),
+        sleep_time=0.2,
+    )
+    file_names = ["case_{:02d}".format(i) for i in range(12)]
+    render_cases(str(case_root), file_names)
+    spyro_cases = []
+    for file_name in file_names:
+        spyro_data = SpyroData(file_name, str(case_root))
+        spyro_data.set_spyro_exe_location(os.path.dirname(exe))
+        spyro_data.set_spyro_exe_name(os.path.basename(exe))
+        spyro_cases.append(spyro_data)
+    queue_folder = str(case_root / "queue")
+    work_queue = WorkQueue(queue_folder)
+    assert work_queue.submit(spyro_cases, "batch") == 12
+
+    environment = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(
+            [PACKAGE_ROOT, os.environ.get("PYTHONPATH", "")]
+        ),
+    )
+    workers = [
+        subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "spyro_framework.workqueue",
+                "worker",
+                queue_folder,
+                "--lease",
+                "5",
+            ],
+            cwd=str(case_root),
+            env=environment,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        for _ in range(3)
+    ]
+    for worker in workers:
+        assert worker.wait(timeout=120) == 0
+
+    status = work_queue.get_status("batch")
+    assert status["finished"] == 12
+    results = work_queue.get_results("batch")
+    assert len(results) == 12
+    # Every case was run once, and by more than one worker in total
+    assert (results[("run", "attempt")] == 1).all()
+    assert results[("run", "worker")].nunique() > 1
+    assert all(
+        os.path.isfile(case_root / file_name / (file_name + ".eof"))
+        for file_name in file_names
+    )